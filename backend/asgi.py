@@ -0,0 +1,288 @@
+"""
+asgi.py — Async (ASGI) API Server
+──────────────────────────────────
+Production serving mode. The hot routes are native async handlers on one
+event loop:
+  - /api/predict               same drift tracking, prediction cache and shadow
+                               scoring as main.py; cache misses are scored in a
+                               process pool (services/scoring_pool.py) instead of
+                               the coalescer. Compact formats skip the cache, as
+                               they do under Flask.
+  - /api/miqyas/deep-analyze   awaits the shared LLM gateway
+  - /api/mujaz/process         awaits the transcription job without holding a thread
+Every other route is served by the Flask app in main.py, unchanged.
+
+Backpressure: past ASGI_MAX_INFLIGHT concurrent requests, or when the scoring
+or Mujaz queues are full, requests get 503 with a Retry-After header instead of
+queueing without bound. On SIGTERM uvicorn stops accepting connections, lets
+in-flight requests finish (up to ASGI_SHUTDOWN_TIMEOUT seconds), then the
+lifespan hook drains the scoring pool and the job queue.
+
+Run with: python asgi.py [--port 5001]
+     or:  uvicorn asgi:app --port 5001 --timeout-graceful-shutdown 30
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import time
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import main
+from main import dashboard_service, miqyas_service, mujaz_jobs, mujaz_uploads, record_on_dashboard
+from services.instrumentation import METRICS
+from services.miqyas_encoding import JSON, NDJSON, encode, negotiate
+from services.mujaz_jobs import QueueFullError
+from services.mujaz_uploads import UploadTooLargeError
+from services.scoring_pool import ScoringPool, ScoringQueueFull
+
+MAX_INFLIGHT = int(os.getenv('ASGI_MAX_INFLIGHT', '256'))
+MAX_SCORING_QUEUE = int(os.getenv('ASGI_MAX_SCORING_QUEUE', '128'))
+SCORING_WORKERS = int(os.getenv('ASGI_SCORING_WORKERS', '0')) or None
+RETRY_AFTER_SECONDS = os.getenv('ASGI_RETRY_AFTER', '1')
+SHUTDOWN_TIMEOUT = int(os.getenv('ASGI_SHUTDOWN_TIMEOUT', '30'))
+# Multipart boundaries and part headers on top of the recording itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Health and metrics stay reachable while the server is saturated.
+EXEMPT_PATHS = {'/api/status', '/api/ready', '/api/metrics'}
+
+scoring_pool = None
+
+
+def overloaded(message):
+    return JSONResponse({'error': message}, status_code=503, headers={'Retry-After': RETRY_AFTER_SECONDS})
+
+
+def timed(handler):
+    """Record native routes in the same histogram Flask's after_request feeds."""
+    async def wrapped(request):
+        start = time.perf_counter()
+        response = await handler(request)
+        METRICS.observe('http_request_duration_seconds', time.perf_counter() - start,
+                        method=request.method, route=request.url.path, status=response.status_code)
+        return response
+    return wrapped
+
+
+# ── Miqyas ─────────────────────────────────────────────────
+async def score_in_pool(model, records):
+    return await scoring_pool.score(model.model_dir, model.fingerprint, records)
+
+
+@timed
+async def predict(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not data:
+        return JSONResponse({'error': 'No data provided'}, status_code=400)
+    if not miqyas_service.model_loaded:
+        return JSONResponse([{'decision': 'Error: Model not loaded', 'confidence': 0.0, 'all_probabilities': {}}])
+    try:
+        response_type = negotiate(request.headers.get('accept'), request.query_params.get('format'))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=406)
+    records = [data] if isinstance(data, dict) else list(data)
+    dense = response_type != JSON
+    try:
+        if dense:
+            miqyas_service.observe_drift(records)  # scored in the pool, so track drift here
+            scored = await scoring_pool.score(miqyas_service.active_model_dir, miqyas_service.model_fingerprint,
+                                              records, dense=True)
+        else:
+            scored = await miqyas_service.apredict(records, score_in_pool)
+    except ScoringQueueFull as e:
+        return overloaded(str(e))
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+    if not dense:
+        record_on_dashboard('record_predictions', records, scored)
+        return JSONResponse(scored)
+
+    labels, probabilities = scored
+    record_on_dashboard('record_scores', records, labels, probabilities)
+    try:
+        body = encode(response_type, labels, probabilities)
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=406)
+    if response_type == NDJSON:
+        return StreamingResponse(body, media_type=response_type)
+    return Response(body, media_type=response_type)
+
+
+@timed
+async def deep_analyze(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not data:
+        return JSONResponse({'error': 'No data provided'}, status_code=400)
+    return JSONResponse(await miqyas_service.adeep_analyze(data))
+
+
+# ── Mujaz ──────────────────────────────────────────────────
+def _limit_body(request, limit, max_bytes):
+    """`request` with a body that raises UploadTooLargeError once more than `limit` bytes have arrived."""
+    received = 0
+
+    async def receive():
+        nonlocal received
+        message = await request.receive()
+        received += len(message.get('body', b''))
+        if received > limit:
+            raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+        return message
+
+    return Request(request.scope, receive)
+
+
+async def _spool_audio(request):
+    """
+    Multipart 'file' or a raw body → SpooledFile; disk writes run off the loop.
+    Oversized uploads are refused on Content-Length, or as soon as the bytes
+    read pass the limit, never after the whole body has been written.
+    """
+    max_bytes = (await run_in_threadpool(mujaz_uploads.instance)).max_bytes
+    multipart = request.headers.get('content-type', '').startswith('multipart/form-data')
+    limit = max_bytes + MULTIPART_OVERHEAD_BYTES if multipart else max_bytes
+    length = request.headers.get('content-length', '')
+    if length.isdigit() and int(length) > limit:
+        raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+
+    if multipart:
+        form = await _limit_body(request, limit, max_bytes).form()
+        upload = form.get('file')
+        if upload is None or not getattr(upload, 'filename', None):
+            return None
+        return await run_in_threadpool(mujaz_uploads.ingest, upload.file, upload.filename)
+
+    writer = await run_in_threadpool(mujaz_uploads.open_upload, request.query_params.get('filename', 'recording'))
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                await run_in_threadpool(writer.write, chunk)
+    except BaseException:
+        await run_in_threadpool(writer.abort)
+        raise
+    if not writer.size:
+        await run_in_threadpool(writer.abort)
+        return None
+    return await run_in_threadpool(writer.finish)
+
+
+@timed
+async def mujaz_process(request):
+    try:
+        spooled = await _spool_audio(request)
+        if spooled is None:
+            return JSONResponse({'status': 'error', 'error': 'No file provided'}, status_code=400)
+        job = await run_in_threadpool(main._submit_spooled, spooled)
+    except UploadTooLargeError as e:
+        return JSONResponse({'status': 'error', 'error': str(e)}, status_code=413)
+    except QueueFullError as e:
+        return overloaded(str(e))
+
+    if job['status'] != 'done':
+        job = await asyncio.wrap_future(mujaz_jobs.watch(job['job_id']))
+    if job['status'] != 'done':
+        return JSONResponse({'status': 'error', 'message': job.get('error') or 'Processing failed'})
+    return JSONResponse(job['result'])
+
+
+# ── Backpressure ───────────────────────────────────────────
+class Backpressure:
+    """Reject requests with 503 + Retry-After once `max_inflight` are already running."""
+
+    def __init__(self, app, max_inflight):
+        self.app = app
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self.rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] in EXEMPT_PATHS:
+            return await self.app(scope, receive, send)
+        if self.inflight >= self.max_inflight:
+            self.rejected += 1
+            response = overloaded(f"Server busy ({self.inflight} requests in flight)")
+            return await response(scope, receive, send)
+        self.inflight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.inflight -= 1
+
+
+# ── Lifecycle ──────────────────────────────────────────────
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global scoring_pool
+    service = await run_in_threadpool(miqyas_service.instance)
+    loaded = service.model_loaded
+    scoring_pool = ScoringPool(SCORING_WORKERS, MAX_SCORING_QUEUE, use_compiled=service.use_compiled,
+                               model_dir=service.active_model_dir if loaded else None,
+                               fingerprint=service.model_fingerprint if loaded else None)
+    await run_in_threadpool(scoring_pool.warm_up)
+    yield
+    # uvicorn has stopped accepting and drained in-flight requests by now
+    print("[ASGI] Shutting down: draining scoring pool and Mujaz queue ...")
+    await run_in_threadpool(scoring_pool.shutdown)
+    if main.SERVICES['mujaz_jobs'].lazy_status()['state'] == 'ready':
+        # Queued jobs stay queued in SQLite and resume on the next start
+        await run_in_threadpool(mujaz_jobs.shutdown, True, True)
+    if main.SERVICES['tamkeen'].lazy_status()['state'] == 'ready':
+        await run_in_threadpool(main.tamkeen_service.ingestor.shutdown)
+    if main.SERVICES['dashboard'].lazy_status()['state'] == 'ready':
+        await run_in_threadpool(dashboard_service.flush)
+    if main.SERVICES['mudaqqiq'].lazy_status()['state'] == 'ready':
+        # Persist the LSH delta so the next start need not re-band it
+        await run_in_threadpool(main.mudaqqiq_service.index.flush)
+    if main.SERVICES['llm'].lazy_status()['state'] == 'ready':
+        await run_in_threadpool(main.llm_gateway.close)
+    print("[ASGI] Shutdown complete.")
+
+
+async def asgi_status(request):
+    return JSONResponse({
+        'inflight': backpressure.inflight,
+        'max_inflight': backpressure.max_inflight,
+        'rejected': backpressure.rejected,
+        'scoring': scoring_pool.stats() if scoring_pool else None,
+    })
+
+
+routes = [
+    Route('/api/predict', predict, methods=['POST']),
+    Route('/api/miqyas/deep-analyze', deep_analyze, methods=['POST']),
+    Route('/api/mujaz/process', mujaz_process, methods=['POST']),
+    Route('/api/asgi/status', asgi_status, methods=['GET']),
+    Mount('/', app=WSGIMiddleware(main.app)),
+]
+
+# Same open CORS policy as main.py's Flask-CORS, for the native routes too
+middleware = [Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])]
+backpressure = Backpressure(Starlette(routes=routes, middleware=middleware, lifespan=lifespan), MAX_INFLIGHT)
+app = backpressure
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, timeout_graceful_shutdown=SHUTDOWN_TIMEOUT,
+                access_log=False)
@@ -0,0 +1,137 @@
+"""
+bench_asgi.py — Threaded Flask vs ASGI Serving
+───────────────────────────────────────────────
+Starts each server as its own process on the same synthetic model, then
+drives it with concurrent keep-alive clients:
+
+  - threaded: main.app.run(threaded=True), the current way of serving
+  - asgi:     asgi.py under uvicorn (process-pool scoring, async Mujaz waits)
+
+Scenarios: single-row /api/predict, 100-row /api/predict, /api/mujaz/process
+with a fake transcriber, and an overload run above ASGI_MAX_INFLIGHT where
+the ASGI server should shed load with 503s instead of queueing.
+
+Run from backend/:
+  python -m benchmarks.bench_asgi
+  python -m benchmarks.bench_asgi --concurrency 64 --requests 4000 --workers 4
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from benchmarks.suite import json_rows, multipart, run_load
+from benchmarks.synthetic import train_synthetic_model
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'threaded': lambda port: [sys.executable, '-c',
+                              f"import main; main.app.run(host='127.0.0.1', port={port}, threaded=True)"],
+    'asgi': lambda port: [sys.executable, 'asgi.py', '--host', '127.0.0.1', '--port', str(port)],
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start(name, env, timeout=120):
+    port = free_port()
+    proc = subprocess.Popen(SERVERS[name](port), cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'{base_url}/api/ready', timeout=2) as response:
+                if json.load(response).get('ready'):
+                    return proc, base_url
+        except OSError:
+            pass
+        time.sleep(0.25)
+    proc.kill()
+    raise RuntimeError(f"{name} server did not become ready")
+
+
+def scenarios(args):
+    single = json_rows(200, seed=5)
+    batch = json.dumps(json_rows(100, seed=6)).encode()
+
+    def mujaz(i):
+        body, content_type = multipart('file', f'bench-{i}.wav', os.urandom(64 * 1024))
+        return 'POST', '/api/mujaz/process', body, content_type
+
+    return [
+        ('predict x1', lambda i: ('POST', '/api/predict', json.dumps(single[i % 200]).encode(), 'application/json'),
+         args.requests, args.concurrency),
+        ('predict x100', lambda i: ('POST', '/api/predict', batch, 'application/json'),
+         args.requests // 4, args.concurrency),
+        ('mujaz process', mujaz, args.requests // 10, args.concurrency),
+        ('overload x1', lambda i: ('POST', '/api/predict', json.dumps(single[i % 200]).encode(), 'application/json'),
+         args.requests, args.max_inflight * 4),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--model-dir', help='Directory with loan_risk_model.joblib (default: synthetic)')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=0, help='ASGI scoring processes (default: min(4, CPUs))')
+    parser.add_argument('--max-inflight', type=int, default=64)
+    parser.add_argument('--transcribe-ms', type=float, default=200, help='Fake transcription delay')
+    args = parser.parse_args()
+
+    model_dir = args.model_dir or tempfile.mkdtemp(prefix='miqyas-asgi-')
+    if not args.model_dir:
+        print(f"Training synthetic model in {model_dir} ...")
+        train_synthetic_model(model_dir)
+
+    env = {
+        **os.environ,
+        'MIQYAS_MODEL_DIR': model_dir,
+        'MUJAZ_TRANSCRIBER': 'fake',
+        'MUJAZ_FAKE_DELAY': str(args.transcribe_ms / 1000),
+        'WARMUP_SERVICES': 'miqyas,mujaz_jobs,dashboard',
+        'ASGI_SCORING_WORKERS': str(args.workers),
+        'ASGI_MAX_INFLIGHT': str(args.max_inflight),
+    }
+
+    results = {}
+    for name in SERVERS:
+        print(f"Starting {name} server ...")
+        proc, base_url = start(name, env)
+        try:
+            for scenario, factory, total, concurrency in scenarios(args):
+                run_load(base_url, factory, min(total, 50), min(concurrency, 8))  # warm-up
+                results[name, scenario] = run_load(base_url, factory, total, concurrency)
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=60)
+
+    print(f"\n{'scenario':<15} {'server':<9} {'clients':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'req/s':>8} {'errors':>7}")
+    for scenario, _, _, concurrency in scenarios(args):
+        for name in SERVERS:
+            r = results[name, scenario]
+            if not r.get('count'):
+                print(f"{scenario:<15} {name:<9} {concurrency:>7} {'all failed':>9} {'':>9} {'':>9} {'':>8} "
+                      f"{r['errors']:>7}")
+                continue
+            print(f"{scenario:<15} {name:<9} {concurrency:>7} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+                  f"{r['p99_ms']:>9.2f} {r['throughput_per_s']:>8,.0f} {r['errors']:>7}")
+    print("\nerrors in the overload run are 503 + Retry-After rejections on the ASGI server.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+bench_cashflow_engine.py — Tamkeen Cash-Flow Engine over a Portfolio
+─────────────────────────────────────────────────────────────────────
+Generates N synthetic contracts (value, duration, advance, retention,
+payment cycle, facility percentages; some terms missing) and times:
+
+  - vectorised:   cashflow_engine.evaluate over the whole portfolio
+  - per contract: the same engine called one contract at a time (what a
+                  loop over cases would cost), on a sample, extrapolated
+  - report:       portfolio_report, i.e. including JSON-ready records
+
+and checks the per-contract results match the vectorised ones.
+
+Run from backend/:
+  python -m benchmarks.bench_cashflow_engine
+  python -m benchmarks.bench_cashflow_engine --contracts 1000000 --sample 500
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from services.cashflow_engine import STATUS_LABELS, TERM_COLUMNS, evaluate, portfolio_report
+
+
+def synthetic_portfolio(n, seed=0):
+    rng = np.random.default_rng(seed)
+
+    def sometimes_missing(values, rate):
+        return np.where(rng.random(n) < rate, np.nan, values)
+
+    portfolio = {
+        "contract_value": sometimes_missing(np.round(rng.lognormal(17.5, 1.2, n), -3), 0.01),
+        "duration_months": sometimes_missing(rng.integers(6, 61, n).astype(float), 0.01),
+        "advance_payment_pct": sometimes_missing(rng.choice([0, 5, 10, 15, 20], n).astype(float), 0.2),
+        "retention_pct": sometimes_missing(rng.choice([0, 5, 10, 15], n, p=[.1, .5, .35, .05]).astype(float), 0.1),
+        "payment_cycle_days": sometimes_missing(rng.choice([30, 45, 60, 90, 120], n).astype(float), 0.2),
+        "performance_bond_pct": sometimes_missing(rng.choice([2.5, 5, 10, 20], n, p=[.1, .4, .4, .1]).astype(float),
+                                                  0.2),
+        "lc_pct": sometimes_missing(rng.choice([0, 5, 10, 20], n).astype(float), 0.4),
+        "receivables_pct": sometimes_missing(rng.choice([0, 5, 10, 30], n).astype(float), 0.4),
+        "ld_cap_pct": sometimes_missing(rng.choice([5, 10, 15], n).astype(float), 0.3),
+        "cost_ratio": sometimes_missing(rng.uniform(0.8, 0.97, n), 0.5),
+    }
+    # The APG usually matches the advance, sometimes falls short or is missing
+    portfolio["apg_pct"] = sometimes_missing(
+        portfolio["advance_payment_pct"] * rng.choice([1.0, 0.5], n, p=[.9, .1]), 0.15)
+    return {column: portfolio[column] for column in TERM_COLUMNS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--contracts', type=int, default=100_000)
+    parser.add_argument('--sample', type=int, default=2000, help='Contracts timed one at a time')
+    args = parser.parse_args()
+
+    portfolio = synthetic_portfolio(args.contracts)
+    evaluate({k: v[:100] for k, v in portfolio.items()})  # warm-up
+
+    start = time.perf_counter()
+    result = evaluate(portfolio)
+    vectorised = time.perf_counter() - start
+
+    sample = min(args.sample, args.contracts)
+    start = time.perf_counter()
+    single = [evaluate({k: v[i:i + 1] for k, v in portfolio.items()}) for i in range(sample)]
+    per_contract = (time.perf_counter() - start) / sample
+
+    for key in ("status", "peak_deficit", "funding_gap"):
+        expected = result[key][:sample]
+        got = np.concatenate([s[key] for s in single])
+        assert np.allclose(got, expected, equal_nan=True), f"per-contract {key} differs from vectorised"
+
+    terms = [dict(zip(TERM_COLUMNS, row)) for row in zip(*(portfolio[c].tolist() for c in TERM_COLUMNS))]
+    start = time.perf_counter()
+    report = portfolio_report(terms)
+    reported = time.perf_counter() - start
+
+    print(f"{args.contracts:,} contracts")
+    print(f"vectorised evaluate   {vectorised * 1000:>10.0f} ms   {vectorised / args.contracts * 1e6:>8.2f} µs/contract")
+    print(f"one at a time         {per_contract * args.contracts * 1000:>10.0f} ms   {per_contract * 1e6:>8.2f} µs/contract "
+          f"(extrapolated from {sample:,})")
+    print(f"portfolio_report      {reported * 1000:>10.0f} ms   (terms dicts in, JSON-ready records out)")
+    print(f"speed-up              {per_contract * args.contracts / vectorised:>10.1f}x")
+    summary = report["summary"]
+    print("status: " + ", ".join(f"{label} {summary[label]:,}" for label in STATUS_LABELS + ("unknown",)))
+    valid = result["valid"]
+    print(f"median peak deficit {np.median(result['peak_deficit'][valid]):,.0f} SAR; "
+          f"funding gap > 0 in {(result['funding_gap'][valid] > 0).mean():.1%} of contracts")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+bench_compiled_model.py — Compiled vs sklearn Miqyas Inference
+───────────────────────────────────────────────────────────────
+Checks that the compiled engine matches the sklearn pipeline, then compares
+single-row latency through RiskModelService.predict.
+
+Run from backend/:
+  python -m benchmarks.bench_compiled_model                  # synthetic model
+  python -m benchmarks.bench_compiled_model --model-dir models
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+
+from benchmarks.synthetic import make_frame, train_synthetic_model
+from services.compiled_model import COMPILED_MODEL_FILE, CompiledRiskModel, export_compiled_model
+from services.miqyas import RiskModelService
+
+
+def check_parity(pipeline, compiled, features_info, n_rows):
+    df = make_frame(n_rows, features_info, seed=7, missing_rate=0.2)
+    # Unseen categories and explicit nulls must behave exactly like the pipeline
+    for name in features_info['categorical_features'][:1]:
+        df.loc[df.index[::11], name] = 'never-seen'
+        df.loc[df.index[::13], name] = None
+
+    expected = pipeline.predict_proba(df)
+    actual = compiled.predict_proba(df)
+    max_diff = float(np.abs(expected - actual).max())
+    agree = float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean())
+    return max_diff, agree
+
+
+def time_single_row(service, rows, repeat):
+    latencies = []
+    for i in range(repeat):
+        row = rows[i % len(rows)]
+        start = time.perf_counter()
+        service.predict(row)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, [50, 99])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--model-dir', help='Directory with loan_risk_model.joblib (default: synthetic)')
+    parser.add_argument('--parity-rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=300)
+    args = parser.parse_args()
+
+    model_dir = args.model_dir or tempfile.mkdtemp(prefix='miqyas-bench-')
+    if not args.model_dir:
+        print(f"Training synthetic model in {model_dir} ...")
+        train_synthetic_model(model_dir)
+
+    pipeline = joblib.load(os.path.join(model_dir, 'loan_risk_model.joblib'))
+    features_info = joblib.load(os.path.join(model_dir, 'features_info.joblib'))
+    compiled_path = export_compiled_model(pipeline, features_info, os.path.join(model_dir, COMPILED_MODEL_FILE))
+    compiled = CompiledRiskModel.load(compiled_path)
+
+    max_diff, agree = check_parity(pipeline, compiled, features_info, args.parity_rows)
+    print(f"Parity on {args.parity_rows} rows: max |Δp| = {max_diff:.2e}, decision agreement = {agree:.2%}")
+
+    rows = make_frame(100, features_info, seed=3).astype(object).where(lambda d: d.notna(), None)
+    rows = [{k: v for k, v in r.items() if v is not None} for r in rows.to_dict('records')]
+
+    for engine, use_compiled in (('sklearn', False), ('compiled', True)):
+        service = RiskModelService(model_dir=model_dir, use_compiled=use_compiled)
+        service.predict(rows[0])  # warm-up
+        p50, p99 = time_single_row(service, rows, args.repeat)
+        print(f"{engine:>8}: single-row p50 = {p50:.3f} ms, p99 = {p99:.3f} ms")
+
+    if max_diff > 1e-9 or agree < 1.0:
+        print("Parity check FAILED")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""
+bench_contract_ingest.py — Tamkeen Case Folder Ingestion
+─────────────────────────────────────────────────────────
+Builds a synthetic case folder (a main contract and N annexes, as PDF and
+DOCX) and times DocumentIngestor on it:
+
+  - cold, sequential:   empty cache, one process
+  - cold, pool:         empty cache, process pool
+  - reopen (restart):   new ingestor on the same cache — stat + SQLite only
+  - reopen (memory):    same ingestor, unchanged folder
+  - one file changed:   only that annex is re-parsed
+
+PDFs are written by a minimal built-in writer, so only pypdf (which the
+ingestor itself needs for PDFs) is required.
+
+Run from backend/:
+  python -m benchmarks.bench_contract_ingest
+  python -m benchmarks.bench_contract_ingest --annexes 50 --pages 20 --workers 4
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import zipfile
+
+from services.document_ingest import DocumentIngestor
+
+CONTRACT_HEADER = """Project Name: Riyadh Metro Depot Expansion
+Employer: Royal Commission for Riyadh City
+Main Contractor: Saudi Construction Ltd
+Sub-contractor: Gulf MEP Services
+Project Location: Riyadh, Saudi Arabia
+Contract Value: 184,500,000 SAR
+Scope of Work: Civil, structural and MEP works for two maintenance halls.
+Duration: 30 Months
+Commencement Date: 2025-01-15
+Completion Date: 2027-07-14
+Payment Terms: Monthly progress payments within 60 days of certification, 10% advance payment.
+"""
+CLAUSES = [
+    "The Contractor shall provide a performance bond of 10% of the Contract Value within 28 days.",
+    "An advance payment guarantee equal to the advance payment of 10% shall be issued by a local bank.",
+    "Retention of 5% shall be deducted from each interim payment and released on taking over.",
+    "Liquidated damages for delay shall be SAR 150,000 per day, capped at 10% of the Contract Value.",
+    "The Contractor shall maintain contractors all risk insurance for the full replacement value.",
+    "The Contractor undertakes to maintain a current ratio of not less than 1.2 throughout the works.",
+    "Progress reports shall be submitted monthly together with an updated programme of works.",
+    "All materials shall comply with the Saudi Building Code and the approved specifications.",
+]
+
+
+def _pdf_escape(line):
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_pdf(path, pages):
+    """A minimal text PDF: one Helvetica content stream per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        body = "BT /F1 10 Tf 50 780 Td 12 TL " + " ".join(f"({_pdf_escape(l)}) '" for l in lines) + " ET"
+        objects.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode('latin-1')
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def write_docx(path, paragraphs):
+    ns = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+    body = "".join(f"<w:p><w:r><w:t xml:space=\"preserve\">{p.replace('&', '&amp;').replace('<', '&lt;')}</w:t></w:r></w:p>"
+                   for p in paragraphs)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml',
+                         '<?xml version="1.0"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                         '<Default Extension="xml" ContentType="application/xml"/>'
+                         '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-'
+                         'officedocument.wordprocessingml.document.main+xml"/></Types>')
+        archive.writestr('word/document.xml', f'<?xml version="1.0"?><w:document xmlns:w="{ns}"><w:body>{body}'
+                                              f'</w:body></w:document>')
+
+
+def annex_lines(rng, n):
+    return [rng.choice(CLAUSES) for _ in range(n)]
+
+
+def build_case(folder, annexes, pages, seed=0):
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    write_pdf(os.path.join(folder, 'main_contract.pdf'),
+              [CONTRACT_HEADER.splitlines() + annex_lines(rng, 40)] + [annex_lines(rng, 55) for _ in range(pages - 1)])
+    for i in range(annexes):
+        path = os.path.join(folder, f'annex_{i:02d}.' + ('pdf' if i % 2 else 'docx'))
+        if i % 2:
+            write_pdf(path, [annex_lines(rng, 55) for _ in range(pages)])
+        else:
+            write_docx(path, annex_lines(rng, 55 * pages))
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    stats = result["stats"]
+    print(f"{label:<22} {elapsed:>10.1f} ms   parsed {stats['parsed']:>3}  cached {stats['cached']:>3}  "
+          f"errors {stats['errors']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--annexes', type=int, default=49)
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=0, help='Pool size (default: min(4, CPUs))')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='tamkeen-bench-')
+    try:
+        folder = os.path.join(root, 'case')
+        build_case(folder, args.annexes, args.pages)
+        size = sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder))
+        print(f"Case folder: {args.annexes + 1} files, {args.pages} pages each, {size / 1e6:.1f} MB\n")
+
+        sequential = DocumentIngestor(os.path.join(root, 'sequential.sqlite'), max_workers=1)
+        timed("cold, sequential", lambda: sequential.ingest_folder(folder))
+
+        db_path = os.path.join(root, 'ingest.sqlite')
+        pooled = DocumentIngestor(db_path, max_workers=args.workers or None)
+        pooled._executor().submit(int).result()  # spawn workers outside the timing
+        result = timed(f"cold, pool x{pooled.max_workers}", lambda: pooled.ingest_folder(folder))
+        pooled.shutdown()
+
+        restarted = DocumentIngestor(db_path)
+        timed("reopen (restart)", lambda: restarted.ingest_folder(folder))
+        timed("reopen (memory)", lambda: restarted.ingest_folder(folder))
+
+        rng = random.Random(1)
+        write_docx(os.path.join(folder, 'annex_00.docx'), annex_lines(rng, 55 * args.pages))
+        timed("one file changed", lambda: restarted.ingest_folder(folder))
+
+        print(f"\nDetails: {result['details'].get('projectName')} / {result['details'].get('value')}; "
+              f"{len(result['obligations'])} obligations; cash-flow terms {result['cashflow_terms']}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+bench_dashboard.py — Dashboard Store at Scale
+──────────────────────────────────────────────
+Records N synthetic case decisions through DashboardService, then times
+get_stats() (aggregate tables) against the equivalent full-history scan, and
+the first, a deep and a filtered page of the cases table.
+
+Run from backend/:
+  python -m benchmarks.bench_dashboard                 # 1M cases
+  python -m benchmarks.bench_dashboard --cases 100000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from services.dashboard import DashboardService
+
+INDUSTRIES = ['Retail', 'Construction', 'Healthcare', 'Logistics', 'Manufacturing', 'Hospitality']
+
+
+def time_ms(fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return result, np.percentile(latencies, [50, 99])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cases', type=int, default=1_000_000)
+    parser.add_argument('--rms', type=int, default=250)
+    parser.add_argument('--batch', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='dashboard-bench-')
+    try:
+        service = DashboardService(os.path.join(workdir, 'dashboard.sqlite'))
+        rng = np.random.default_rng(0)
+        p_approved = rng.beta(2, 2, args.cases)
+
+        start = time.perf_counter()
+        for offset in range(0, args.cases, args.batch):
+            n = min(args.batch, args.cases - offset)
+            records = [{"case_id": f"C{offset + i:07d}", "client": f"Client {offset + i}",
+                        "industry": INDUSTRIES[(offset + i) % len(INDUSTRIES)],
+                        "rm": f"rm{(offset + i) % args.rms:03d}", "ews": (offset + i) % 21} for i in range(n)]
+            results = [{"decision": "Approved" if p > 0.5 else "Rejected", "confidence": max(p, 1 - p),
+                        "all_probabilities": {"Approved": p, "Rejected": 1 - p}}
+                       for p in p_approved[offset:offset + n].tolist()]
+            service.record_predictions(records, results)
+        service.flush()
+        elapsed = time.perf_counter() - start
+        print(f"Recorded {args.cases} cases in {elapsed:.1f}s ({args.cases / elapsed:,.0f} cases/s)")
+
+        stats, (p50, p99) = time_ms(service.get_stats, args.repeat)
+        print(f"get_stats (aggregates):      p50 = {p50:.3f} ms, p99 = {p99:.3f} ms  "
+              f"(total={stats['total_cases']}, high={stats['high_risk_count']}, rms={stats['active_rms']})")
+
+        def scan():
+            return service._db.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT rm), SUM(risk = 'High'), AVG(ews) FROM cases").fetchone()
+        _, (p50, p99) = time_ms(scan, max(3, args.repeat // 50))
+        print(f"equivalent full scan:        p50 = {p50:.3f} ms, p99 = {p99:.3f} ms")
+
+        first, (p50, p99) = time_ms(lambda: service.list_cases(limit=50), args.repeat)
+        print(f"cases page 1:                p50 = {p50:.3f} ms, p99 = {p99:.3f} ms")
+
+        page = first
+        for _ in range(200):
+            page = service.list_cases(limit=50, cursor=page["next_cursor"])
+        _, (p50, p99) = time_ms(lambda: service.list_cases(limit=50, cursor=page["next_cursor"]), args.repeat)
+        print(f"cases page 201 (cursor):     p50 = {p50:.3f} ms, p99 = {p99:.3f} ms")
+
+        _, (p50, p99) = time_ms(lambda: service.list_cases(limit=50, risk='High', rm='rm007'), args.repeat)
+        print(f"cases filtered (risk + rm):  p50 = {p50:.3f} ms, p99 = {p99:.3f} ms")
+
+        plan = service._db.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM cases WHERE risk = ? AND (updated_at, id) < (?, ?) "
+            "ORDER BY updated_at DESC, id DESC LIMIT 50", ('High', 1e12, 'z')).fetchall()
+        print("filtered page plan:", '; '.join(row[-1] for row in plan))
+        print(f"database size: {os.path.getsize(os.path.join(workdir, 'dashboard.sqlite')) / 1e6:.0f} MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
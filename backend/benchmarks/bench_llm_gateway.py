@@ -0,0 +1,92 @@
+"""
+bench_llm_gateway.py — LLM Gateway vs Per-Call Client
+──────────────────────────────────────────────────────
+Runs deep-analysis style requests against the local mock server and compares:
+  - the old path: a new OpenAI client per call, pretty-printed JSON prompt
+  - the gateway: pooled client, compact prompt, sequential and fanned out
+  - repeated inputs served from the response cache
+  - a flaky upstream (20% 429/503) absorbed by retries
+
+Run from backend/:
+  python -m benchmarks.bench_llm_gateway
+  python -m benchmarks.bench_llm_gateway --requests 64 --latency-ms 300
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.mock_llm_server import start_mock_server
+from benchmarks.synthetic import make_frame, FEATURES_INFO
+from services.llm_gateway import LLMGateway, compact_payload
+from services.miqyas import DEEP_ANALYSIS_PROMPT, DEEP_ANALYSIS_PROMPT_VERSION
+
+
+def applications(n):
+    frame = make_frame(n, FEATURES_INFO, seed=5, missing_rate=0.2).astype(object)
+    records = frame.where(frame.notna(), None).to_dict('records')
+    return [{"applicant_id": f"APP-{i:05d}", "application": r, "notes": ""} for i, r in enumerate(records)]
+
+
+def per_call_client(base_url, apps):
+    from openai import OpenAI
+    for app in apps:
+        client = OpenAI(api_key='unused', base_url=base_url)
+        client.chat.completions.create(
+            model="gpt-5.2",
+            messages=[{"role": "system", "content": DEEP_ANALYSIS_PROMPT},
+                      {"role": "user", "content": json.dumps(app, indent=2)}],
+            temperature=0.3,
+        )
+        client.close()
+
+
+def timed(label, fn, n):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:>7.2f}s  {n / elapsed:>7.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=32)
+    parser.add_argument('--latency-ms', type=float, default=100)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    apps = applications(args.requests)
+    pretty = sum(len(json.dumps(a, indent=2)) for a in apps)
+    compact = sum(len(compact_payload(a)) for a in apps)
+    print(f"Prompt payload: {pretty} chars pretty-printed → {compact} compact ({1 - compact / pretty:.0%} smaller)\n")
+
+    server, base_url = start_mock_server(latency_ms=args.latency_ms)
+    requests = [{"system_prompt": DEEP_ANALYSIS_PROMPT, "payload": a,
+                 "prompt_version": DEEP_ANALYSIS_PROMPT_VERSION} for a in apps]
+
+    timed("per-call client, sequential", lambda: per_call_client(base_url, apps), len(apps))
+
+    gateway = LLMGateway(base_url=base_url, max_concurrency=args.concurrency, cache_size=0)
+    timed("gateway, sequential", lambda: [gateway.complete(**r) for r in requests], len(apps))
+    timed(f"gateway, fan-out x{args.concurrency}", lambda: gateway.complete_many(requests), len(apps))
+    gateway.close()
+
+    cached = LLMGateway(base_url=base_url, max_concurrency=args.concurrency)
+    cached.complete_many(requests)
+    timed("gateway, repeated inputs (cache)", lambda: cached.complete_many(requests), len(apps))
+    cached.close()
+
+    server.failure_rate = 0.2
+    flaky = LLMGateway(base_url=base_url, max_concurrency=args.concurrency, cache_size=0, backoff_seconds=0.05)
+    results = []
+    timed("gateway, 20% upstream failures", lambda: results.extend(flaky.complete_many(requests)), len(apps))
+    failed = sum(1 for r in results if "error" in r)
+    print(f"  retries = {flaky.stats()['retries']}, failed after retries = {failed}")
+    flaky.close()
+
+    print(f"\nMock server saw {server.requests} requests over {len(server.connections)} client connections")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+bench_model_memory.py — Per-Worker Model Memory
+────────────────────────────────────────────────
+Starts N worker processes that each load RiskModelService and score some
+traffic — 50-row requests, then frames of --large-batch rows (the size of a
+predict-batch chunk) — then reports per-worker and total memory for each
+model format:
+
+  sklearn   loan_risk_model.joblib, unpickled into every worker
+  npz       compiled .npz, read into every worker
+  mmap      compiled .npy bundle, mapped read-only and shared via page cache
+
+RSS counts shared pages in every worker; PSS splits them between the workers
+sharing them, so the PSS total is the real host-wide cost. Linux only.
+
+Run from backend/:
+  python -m benchmarks.bench_model_memory --workers 4
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import tempfile
+
+
+def _memory_kb():
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:'):
+                fields[parts[0][:-1].lower()] = int(parts[1])
+    return fields
+
+
+def _worker(model_dir, use_compiled, n_rows, large_batch, results, release):
+    from benchmarks.synthetic import make_frame
+    from services.miqyas import RiskModelService
+
+    rows = make_frame(max(n_rows, large_batch), seed=os.getpid()).to_dict('records')
+    before = _memory_kb()
+    service = RiskModelService(model_dir=model_dir, use_compiled=use_compiled)
+    for start in range(0, n_rows, 50):
+        service.predict(rows[start:start + 50])
+    # Large frames must stay on the same engine, not load a private pipeline
+    for start in range(0, len(rows), large_batch):
+        service.predict(rows[start:start + large_batch])
+    after = _memory_kb()
+    results.put({key: after[key] - before[key] for key in after} | {'engine': service.engine})
+    release.wait()
+
+
+def _measure(model_dir, use_compiled, workers, n_rows, large_batch):
+    ctx = mp.get_context('spawn')
+    results, release = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=_worker, args=(model_dir, use_compiled, n_rows, large_batch, results, release))
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+    # Every worker stays alive until all have reported, so PSS sees the sharing
+    samples = [results.get() for _ in procs]
+    release.set()
+    for p in procs:
+        p.join()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=2000, help='Rows scored by each worker in 50-row requests')
+    parser.add_argument('--large-batch', type=int, default=5000, help='Rows per large batch')
+    parser.add_argument('--model-dir', help='Directory with loan_risk_model.joblib (default: synthetic)')
+    args = parser.parse_args()
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        sys.exit("This benchmark reads /proc/self/smaps_rollup and needs Linux.")
+
+    import joblib
+    from benchmarks.synthetic import train_synthetic_model
+    from services.compiled_model import COMPILED_BUNDLE_DIR, COMPILED_MODEL_FILE, export_compiled_model
+
+    work_dir = tempfile.mkdtemp(prefix='miqyas-mem-')
+    source = args.model_dir or os.path.join(work_dir, 'source')
+    if not args.model_dir:
+        print(f"Training synthetic model in {source} ...")
+        train_synthetic_model(source)
+    pipeline = joblib.load(os.path.join(source, 'loan_risk_model.joblib'))
+    features_info = joblib.load(os.path.join(source, 'features_info.joblib'))
+
+    layouts = {}
+    for name, export in (('sklearn', None), ('npz', COMPILED_MODEL_FILE), ('mmap', COMPILED_BUNDLE_DIR)):
+        layouts[name] = os.path.join(work_dir, name)
+        os.makedirs(layouts[name])
+        for f in ('loan_risk_model.joblib', 'features_info.joblib'):
+            shutil.copy(os.path.join(source, f), layouts[name])
+        if export:
+            export_compiled_model(pipeline, features_info, os.path.join(layouts[name], export))
+
+    print(f"\n{'format':<8} {'engine':<9} {'RSS/worker':>12} {'PSS/worker':>12} {'PSS total':>12}")
+    for name, model_dir in layouts.items():
+        samples = _measure(model_dir, name != 'sklearn', args.workers, args.rows, args.large_batch)
+        rss = sum(s['rss'] for s in samples) / len(samples) / 1024
+        pss = sum(s['pss'] for s in samples) / 1024
+        print(f"{name:<8} {samples[0]['engine']:<9} {rss:10.1f}MB {pss / len(samples):10.1f}MB {pss:10.1f}MB")
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
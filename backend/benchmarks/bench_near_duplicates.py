@@ -0,0 +1,164 @@
+"""
+bench_near_duplicates.py — MudaQQiQ Near-Duplicate Index at Scale
+──────────────────────────────────────────────────────────────────
+Builds a NearDuplicateIndex over N synthetic supporting documents (a shared
+letter-head template plus a random body, ~100 words each). Every
+--plant-every-th document is an altered copy of an earlier one (a share of its
+words replaced, as when amounts, names or dates are edited). Reports:
+
+  - ingest:   documents/s for fingerprinting + indexing, per checkpoint
+  - reopen:   time to open the persisted index in a new process state
+  - query:    p50 / p95 latency of top-10 lookups for altered copies and for
+              fresh documents, recall of the planted source, and a brute-force
+              scan over every signature for comparison
+
+Documents are generated from their index, so none are held in memory.
+
+Run from backend/:
+  python -m benchmarks.bench_near_duplicates
+  python -m benchmarks.bench_near_duplicates --documents 100000 --queries 200
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from services.near_duplicates import NearDuplicateIndex
+
+VOCABULARY = np.array([f"w{i:05d}" for i in range(30000)])
+TEMPLATES = 50
+HEADER_WORDS = 25
+C1, C2 = np.uint64(0x9E3779B97F4A7C15), np.uint64(0xD6E8FEB86659FD93)
+
+
+def _hash(x):
+    with np.errstate(over='ignore'):
+        x = (x ^ (x >> np.uint64(31))) * C1
+        x = (x ^ (x >> np.uint64(29))) * C2
+        return x ^ (x >> np.uint64(32))
+
+
+def _words(ids, salt, count):
+    """(len(ids) × count) vocabulary indices, a pure function of (id, position, salt)."""
+    with np.errstate(over='ignore'):
+        keys = ids.astype(np.uint64)[:, None] * np.uint64(1 << 20) + np.arange(count, dtype=np.uint64)[None, :]
+        return (_hash(keys * np.uint64(7) + np.uint64(salt)) % np.uint64(len(VOCABULARY))).astype(np.int64)
+
+
+def base_documents(ids):
+    """Template header + random body of 60–100 words."""
+    ids = np.asarray(ids, dtype=np.int64)
+    headers = _words(ids % TEMPLATES, 1, HEADER_WORDS)
+    bodies = _words(ids + TEMPLATES, 2, 100)
+    lengths = 60 + (_hash(ids.astype(np.uint64) + np.uint64(3)) % np.uint64(41)).astype(np.int64)
+    return [np.concatenate([h, b[:n]]) for h, b, n in zip(headers, bodies, lengths)]
+
+
+def source_of(i, plant_every):
+    """The earlier document an altered copy is made from, or -1."""
+    if i < plant_every or i % plant_every:
+        return -1
+    return int(_hash(np.uint64(i) + np.uint64(5)) % np.uint64(i))
+
+
+def documents(ids, plant_every, edit_share):
+    words = base_documents(ids)
+    for n, i in enumerate(ids):
+        source = source_of(int(i), plant_every)
+        if source >= 0:
+            # An altered copy: the source's words with a share of them replaced
+            copy = base_documents([source])[0].copy()
+            positions = _words(np.array([i]), 4, len(copy))[0] % len(copy)
+            positions = positions[:max(1, int(edit_share * len(copy)))]
+            copy[positions] = _words(np.array([i]), 6, len(positions))[0]
+            words[n] = copy
+    return [" ".join(VOCABULARY[w]) for w in words]
+
+
+def ingest(index, total, batch, plant_every, edit_share, checkpoints):
+    start, last, last_n = time.perf_counter(), time.perf_counter(), 0
+    for lo in range(0, total, batch):
+        ids = np.arange(lo, min(lo + batch, total))
+        texts = documents(ids, plant_every, edit_share)
+        index.add([{"doc_id": f"doc-{i}", "text": t, "application_id": f"app-{i // 5}"} for i, t in zip(ids, texts)])
+        done = ids[-1] + 1
+        if done in checkpoints or done == total:
+            now = time.perf_counter()
+            print(f"  {done:>10,} documents   {(done - last_n) / (now - last):>8,.0f} docs/s   "
+                  f"(overall {done / (now - start):,.0f} docs/s)")
+            last, last_n = now, done
+    index.flush()
+    return time.perf_counter() - start
+
+
+def percentiles(values):
+    p50, p95 = np.percentile(values, [50, 95])
+    return f"p50 {p50:6.2f} ms   p95 {p95:6.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--documents', type=int, default=1_000_000)
+    parser.add_argument('--batch', type=int, default=10_000)
+    parser.add_argument('--plant-every', type=int, default=1000)
+    parser.add_argument('--edit-share', type=float, default=0.1, help='Share of words replaced in altered copies')
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--brute-force', type=int, default=20, help='Queries timed as a full signature scan')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='mudaqqiq-bench-')
+    try:
+        index_dir = os.path.join(root, 'index')
+        index = NearDuplicateIndex(index_dir)
+        checkpoints = {n for n in (10_000, 100_000, 250_000, 500_000, 750_000)}
+        print(f"Ingesting {args.documents:,} documents in batches of {args.batch:,}")
+        elapsed = ingest(index, args.documents, args.batch, args.plant_every, args.edit_share, checkpoints)
+        size = sum(os.path.getsize(os.path.join(index_dir, f)) for f in os.listdir(index_dir))
+        print(f"Ingest: {elapsed:.1f} s, {args.documents / elapsed:,.0f} docs/s; index {size / 1e6:,.0f} MB on disk")
+        del index
+
+        start = time.perf_counter()
+        index = NearDuplicateIndex(index_dir)
+        print(f"Reopen: {(time.perf_counter() - start) * 1000:,.0f} ms   {index.stats()}\n")
+
+        planted = [i for i in range(args.plant_every, args.documents, args.plant_every)][:args.queries]
+        fresh = list(range(args.documents, args.documents + args.queries))
+        fingerprinter = index.fingerprinter
+        for label, ids in (("altered copies", planted), ("fresh documents", fresh)):
+            if not ids:
+                continue
+            fingerprints = fingerprinter.fingerprint(documents(np.array(ids), args.plant_every, args.edit_share))
+            latencies, found, candidates = [], 0, []
+            for n, i in enumerate(ids):
+                start = time.perf_counter()
+                matches = index.similar(fingerprints["minhash"][n], fingerprints["simhash"][n],
+                                        fingerprints["content_hash"][n], fingerprints["normalized_hash"][n], k=10)
+                latencies.append((time.perf_counter() - start) * 1000)
+                source = source_of(i, args.plant_every)
+                found += any(m["doc_id"] == f"doc-{source}" for m in matches)
+                candidates.append(len(matches))
+            recall = f"   recall of source {found / len(ids):.1%}" if label == "altered copies" else ""
+            print(f"{label:<16} {percentiles(latencies)}   matches/query {np.mean(candidates):.1f}{recall}")
+
+        fingerprints = fingerprinter.fingerprint(documents(np.array(planted[:args.brute_force]), args.plant_every,
+                                                           args.edit_share))
+        latencies = []
+        for signature in fingerprints["minhash"]:
+            start = time.perf_counter()
+            similarity = np.zeros(index._n_rows)
+            for lo in range(0, index._n_rows, 65536):
+                similarity[lo:lo + 65536] = (index._minhash[lo:lo + 65536] == signature).mean(axis=1)
+            np.argpartition(-similarity, 10)[:10]
+            latencies.append((time.perf_counter() - start) * 1000)
+        if latencies:
+            print(f"{'brute-force scan':<16} {percentiles(latencies)}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
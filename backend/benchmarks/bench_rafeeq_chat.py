@@ -0,0 +1,163 @@
+"""
+bench_rafeeq_chat.py — RafeeQ Chat: Blocking vs Streaming
+──────────────────────────────────────────────────────────
+Plays multi-turn conversations against the Flask app in this process and
+compares the two ways of chatting:
+
+  - blocking:   POST /api/rafeeq/chat with the whole history as `context`
+                (what useChat.js used to do); nothing is visible until the
+                full reply arrives
+  - streaming:  POST /api/rafeeq/chat/stream with only the new message and a
+                session_id; tokens arrive as NDJSON lines
+
+Reports time to first token (for blocking: time to the whole reply), total
+time, and request size on the first and last turn. The answer backend is the
+fake one (simulated first-token delay and per-word delay), or the LLM gateway
+against benchmarks/mock_llm_server.py with --backend llm.
+
+Run from backend/:
+  python -m benchmarks.bench_rafeeq_chat
+  python -m benchmarks.bench_rafeeq_chat --backend llm --turns 20 --first-token-ms 400 --token-ms 20
+"""
+
+import argparse
+import http.client
+import json
+import os
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+
+DOCUMENTS = [
+    ("bench-salary", "Salary certificate",
+     "The applicant's monthly salary is 25,000 SAR, paid by transfer from Saudi Aramco. "
+     "Employment started in March 2016 and the position is permanent."),
+    ("bench-bureau", "Credit bureau report",
+     "SIMAH shows two active facilities: an auto loan with 14 instalments left and a credit card "
+     "with a 30,000 SAR limit. No defaults or late payments in the last 24 months."),
+    ("bench-property", "Valuation report",
+     "The villa in Al Nakheel, Riyadh is valued at 2.4 million SAR. The requested financing is "
+     "1.8 million SAR, a loan-to-value ratio of 75 percent."),
+]
+QUESTIONS = [
+    "What is the applicant's salary?", "Who is the employer?", "Are there any defaults on the bureau report?",
+    "What is the loan-to-value ratio?", "How many instalments are left on the auto loan?",
+    "What is the credit card limit?", "Where is the property?", "Is the employment permanent?",
+]
+
+
+def start_app_server():
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    import main
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, main.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def post(conn, path, payload, accept='application/json'):
+    body = json.dumps(payload).encode()
+    conn.request('POST', path, body=body, headers={'Content-Type': 'application/json', 'Accept': accept})
+    return conn.getresponse(), len(body)
+
+
+def blocking_turn(conn, history, message):
+    start = time.perf_counter()
+    response, sent = post(conn, '/api/rafeeq/chat', {'message': message, 'context': history})
+    reply = json.loads(response.read())['reply']
+    elapsed = (time.perf_counter() - start) * 1000
+    return reply, elapsed, elapsed, sent
+
+
+def streaming_turn(conn, session_id, message):
+    start = time.perf_counter()
+    response, sent = post(conn, '/api/rafeeq/chat/stream', {'message': message, 'session_id': session_id},
+                          accept='application/x-ndjson')
+    first_token_ms, reply = None, None
+    while True:
+        line = response.readline()
+        if not line:
+            break
+        event = json.loads(line)
+        if event['event'] == 'token' and first_token_ms is None:
+            first_token_ms = (time.perf_counter() - start) * 1000
+        elif event['event'] in ('done', 'error'):
+            reply = event.get('reply', '')
+    response.read()
+    return reply, first_token_ms, (time.perf_counter() - start) * 1000, sent
+
+
+def run(base_url, mode, conversations, turns):
+    parsed = urllib.parse.urlparse(base_url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=120)
+    first_token, total, sent_first, sent_last = [], [], [], []
+    for c in range(conversations):
+        history, session_id = [], f"bench-{mode}-{c}-{time.time_ns()}"
+        for t in range(turns):
+            message = QUESTIONS[(c + t) % len(QUESTIONS)]
+            if mode == 'blocking':
+                reply, ttft, elapsed, sent = blocking_turn(conn, history, message)
+            else:
+                reply, ttft, elapsed, sent = streaming_turn(conn, session_id, message)
+            history += [{'role': 'user', 'content': message}, {'role': 'assistant', 'content': reply}]
+            first_token.append(ttft)
+            total.append(elapsed)
+            if t == 0:
+                sent_first.append(sent)
+            if t == turns - 1:
+                sent_last.append(sent)
+    conn.close()
+    return {
+        'ttft_p50': np.percentile(first_token, 50), 'ttft_p95': np.percentile(first_token, 95),
+        'total_p50': np.percentile(total, 50), 'total_p95': np.percentile(total, 95),
+        'bytes_first': np.mean(sent_first), 'bytes_last': np.mean(sent_last),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--backend', choices=('fake', 'llm'), default='fake')
+    parser.add_argument('--conversations', type=int, default=5)
+    parser.add_argument('--turns', type=int, default=12)
+    parser.add_argument('--first-token-ms', type=float, default=300)
+    parser.add_argument('--token-ms', type=float, default=15)
+    args = parser.parse_args()
+
+    os.environ['RAFEEQ_LLM'] = args.backend
+    if args.backend == 'llm':
+        from benchmarks.mock_llm_server import start_mock_server
+        _, mock_url = start_mock_server(latency_ms=args.first_token_ms, token_ms=args.token_ms)
+        os.environ['OPENAI_BASE_URL'] = mock_url
+    else:
+        os.environ['RAFEEQ_FAKE_FIRST_TOKEN_MS'] = str(args.first_token_ms)
+        os.environ['RAFEEQ_FAKE_TOKEN_MS'] = str(args.token_ms)
+
+    server, base_url = start_app_server()
+    import main as app_main
+    for doc_id, title, text in DOCUMENTS:
+        app_main.rafeeq_service.add_document(doc_id, text, title)
+    try:
+        results = {mode: run(base_url, mode, args.conversations, args.turns) for mode in ('blocking', 'streaming')}
+    finally:
+        for doc_id, _, _ in DOCUMENTS:
+            app_main.rafeeq_service.delete_document(doc_id)
+        server.shutdown()
+
+    print(f"\n{args.backend} backend, {args.conversations} conversations x {args.turns} turns "
+          f"(first token {args.first_token_ms:.0f} ms, {args.token_ms:.0f} ms/word)")
+    print(f"{'mode':<10} {'TTFT p50':>9} {'TTFT p95':>9} {'total p50':>10} {'total p95':>10} "
+          f"{'req B turn 1':>13} {f'req B turn {args.turns}':>13}")
+    for mode, r in results.items():
+        print(f"{mode:<10} {r['ttft_p50']:>7.0f}ms {r['ttft_p95']:>7.0f}ms {r['total_p50']:>8.0f}ms "
+              f"{r['total_p95']:>8.0f}ms {r['bytes_first']:>13,.0f} {r['bytes_last']:>13,.0f}")
+    print("\nblocking TTFT is the full reply time: nothing renders until the response is complete.")
+
+
+if __name__ == '__main__':
+    main()
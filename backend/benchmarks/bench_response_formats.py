@@ -0,0 +1,66 @@
+"""
+bench_response_formats.py — /api/predict Response Encodings
+────────────────────────────────────────────────────────────
+Times scoring + serialising one batch through RiskModelService in each
+response format: predict() + JSON for the default per-row dicts, and
+predict_matrix() + the dense encoder for the rest. Reports body sizes too.
+
+Run from backend/:
+  python -m benchmarks.bench_response_formats                # 10k rows
+  python -m benchmarks.bench_response_formats --rows 100000
+"""
+
+import argparse
+import json
+import tempfile
+import time
+
+from benchmarks.suite import json_rows
+from benchmarks.synthetic import train_synthetic_model
+from services.miqyas import RiskModelService
+from services.miqyas_encoding import ARROW_STREAM, COMPACT_JSON, MSGPACK, NDJSON, encode
+
+
+def best_of(fn, repeat):
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--model-dir', help='Directory with loan_risk_model.joblib (default: synthetic)')
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    model_dir = args.model_dir or tempfile.mkdtemp(prefix='miqyas-formats-')
+    if not args.model_dir:
+        print(f"Training synthetic model in {model_dir} ...")
+        train_synthetic_model(model_dir)
+    service = RiskModelService(model_dir=model_dir)
+    rows = json_rows(args.rows, seed=4)
+
+    score_ms, (labels, probabilities) = best_of(lambda: service.predict_matrix(rows), args.repeat)
+    print(f"\n{args.rows:,} rows; predict_matrix() alone: {score_ms:.1f} ms\n")
+    print(f"{'format':<40} {'total ms':>10} {'encode ms':>10} {'bytes':>12}")
+
+    total_ms, body = best_of(lambda: json.dumps(service.predict(rows)).encode(), args.repeat)
+    print(f"{'application/json (default dicts)':<40} {total_ms:>10.1f} {total_ms - score_ms:>10.1f} "
+          f"{len(body):>12,}")
+
+    for mimetype in (COMPACT_JSON, NDJSON, MSGPACK, ARROW_STREAM):
+        def run():
+            # NDJSON is a generator; joining it measures the full serialisation cost
+            body = encode(mimetype, *service.predict_matrix(rows))
+            return body if isinstance(body, bytes) else ''.join(body).encode()
+        total_ms, body = best_of(run, args.repeat)
+        print(f"{mimetype:<40} {total_ms:>10.1f} {total_ms - score_ms:>10.1f} {len(body):>12,}")
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+bench_startup.py — Cold-Start Breakdown
+────────────────────────────────────────
+Measures, each in a fresh interpreter, what the backend pays before it can
+serve: third-party imports, importing main.py, building RiskModelService
+with each engine, and the time until the background warm-up is ready.
+
+Run from backend/:
+  python -m benchmarks.bench_startup                  # synthetic model
+  python -m benchmarks.bench_startup --model-dir models
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_IMPORTS = ['numpy', 'pandas', 'joblib', 'sklearn.ensemble', 'flask', 'openai', 'assemblyai']
+
+
+def _timed(code: str, env=None) -> float:
+    """Run `code` in a fresh interpreter; it must leave its timing in `elapsed`."""
+    script = f"import time\n_t0 = time.perf_counter()\n{code}\nprint(elapsed if 'elapsed' in dir() else time.perf_counter() - _t0)"
+    out = subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, capture_output=True,
+                         text=True, env={**os.environ, **(env or {})})
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _report(label, fn, repeat):
+    try:
+        best = min(fn() for _ in range(repeat))
+        print(f"  {label:<48} {best * 1000:9.1f} ms")
+    except RuntimeError as e:
+        print(f"  {label:<48} {'skipped':>9}  ({e})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--model-dir', help='Directory with loan_risk_model.joblib (default: synthetic)')
+    parser.add_argument('--repeat', type=int, default=3, help='Best of N runs')
+    args = parser.parse_args()
+
+    model_dir = os.path.abspath(args.model_dir) if args.model_dir else tempfile.mkdtemp(prefix='miqyas-bench-')
+    if not args.model_dir:
+        sys.path.insert(0, BACKEND_DIR)
+        from benchmarks.synthetic import train_synthetic_model
+        from services.compiled_model import COMPILED_MODEL_FILE, export_compiled_model
+        print(f"Training synthetic model in {model_dir} ...")
+        pipeline, features_info = train_synthetic_model(model_dir)
+        export_compiled_model(pipeline, features_info, os.path.join(model_dir, COMPILED_MODEL_FILE))
+
+    print("Third-party imports")
+    for module in HEAVY_IMPORTS:
+        _report(f"import {module}", lambda: _timed(f"import {module}"), args.repeat)
+
+    print("Backend")
+    _report("import main (lazy services, no warm-up)",
+            lambda: _timed("import main", env={'WARMUP_SERVICES': ''}), args.repeat)
+    for engine, use_compiled in (('sklearn', False), ('compiled', True)):
+        _report(f"RiskModelService() [{engine}]",
+                lambda: _timed("from services.miqyas import RiskModelService\n"
+                               f"RiskModelService({model_dir!r}, use_compiled={use_compiled})"),
+                args.repeat)
+    _report("import main → /api/ready (background warm-up)",
+            lambda: _timed("import main\n"
+                           "client = main.app.test_client()\n"
+                           "while client.get('/api/ready').status_code != 200:\n"
+                           "    time.sleep(0.005)",
+                           env={'WARMUP_SERVICES': 'miqyas', 'MIQYAS_MODEL_DIR': model_dir}),
+            args.repeat)
+
+
+if __name__ == '__main__':
+    main()
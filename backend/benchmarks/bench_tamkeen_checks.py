@@ -0,0 +1,107 @@
+"""
+bench_tamkeen_checks.py — Tamkeen Contract Checks: One by One vs Fan-Out
+─────────────────────────────────────────────────────────────────────────
+Runs the RMs Assistant's contract checks on a synthetic case folder (see
+bench_contract_ingest.py) through CheckRunner, against
+benchmarks/mock_llm_server.py:
+
+  - one by one:   max_concurrency=1, what the UI did with one /api/chat call
+                  per check
+  - fan-out:      all checks at once, bounded by --concurrency
+  - re-run:       same checks on the unchanged document set (result cache)
+
+Also reports the prompt size per check (retrieved excerpts) against sending
+the whole case text.
+
+Run from backend/:
+  python -m benchmarks.bench_tamkeen_checks
+  python -m benchmarks.bench_tamkeen_checks --checks 12 --concurrency 6 --latency-ms 800
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.bench_contract_ingest import build_case
+from benchmarks.mock_llm_server import start_mock_server
+from services.document_ingest import DocumentIngestor
+from services.llm_gateway import LLMGateway
+from services.tamkeen_checks import CheckRunner
+
+CHECK_NAMES = [
+    "Value Consistency Check", "Payment Timing Check", "Peak Deficit Check", "Cost Loading vs Inflow Check",
+    "Risky Assumptions Check", "Risk Visibility Assessment", "Retention Release Check", "Guarantee Coverage Check",
+]
+SYSTEM_PROMPT = ("You are a specialized {name} analyst. Your response MUST conclude with a status line in the "
+                 "format 'STATUS: [COLOR]' where [COLOR] is either GREEN, YELLOW, or RED.")
+
+
+def make_checks(n):
+    names = [CHECK_NAMES[i % len(CHECK_NAMES)] + (f" #{i // len(CHECK_NAMES) + 1}" if i >= len(CHECK_NAMES) else "")
+             for i in range(n)]
+    return [{"id": f"check_{i}", "query": f"from contract vs analysis file return {name} results",
+             "systemPrompt": SYSTEM_PROMPT.format(name=name)} for i, name in enumerate(names)]
+
+
+def timed_run(label, runner, context, checks, max_concurrency):
+    start = time.perf_counter()
+    first, statuses = None, {}
+    for event in runner.run(context, checks, max_concurrency):
+        if event["type"] == "check":
+            first = first or (time.perf_counter() - start) * 1000
+            statuses[event.get("status")] = statuses.get(event.get("status"), 0) + 1
+        else:
+            report = event
+    total = (time.perf_counter() - start) * 1000
+    print(f"{label:<14} first result {first:>8.0f} ms   all {total:>8.0f} ms   cached {report['cached']:>2}   "
+          f"failed {report['failed']}   statuses {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--checks', type=int, default=6)
+    parser.add_argument('--concurrency', type=int, default=6)
+    parser.add_argument('--latency-ms', type=float, default=500)
+    parser.add_argument('--annexes', type=int, default=9)
+    parser.add_argument('--pages', type=int, default=5)
+    args = parser.parse_args()
+
+    _, mock_url = start_mock_server(latency_ms=args.latency_ms)
+    # Gateway response cache off, so only CheckRunner's result cache is measured
+    llm = LLMGateway(api_key='mock', base_url=mock_url, max_concurrency=max(8, args.concurrency), cache_size=0)
+    root = tempfile.mkdtemp(prefix='tamkeen-checks-bench-')
+    try:
+        folder = os.path.join(root, 'case')
+        build_case(folder, args.annexes, args.pages)
+        ingestor = DocumentIngestor(os.path.join(root, 'ingest.sqlite'), max_workers=1)
+        runner = CheckRunner(llm, max_concurrency=args.concurrency)
+        checks = make_checks(args.checks)
+
+        start = time.perf_counter()
+        context = runner.context(ingestor, folder)
+        print(f"Case: {context.documents} documents, {len(context.chunks)} chunks; context built in "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        start = time.perf_counter()
+        runner.context(ingestor, folder)
+        print(f"Context reuse (unchanged documents): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        full_text = sum(len(chunk) for chunk in context.chunks)
+        excerpts = [context.retrieve(c["query"], runner.top_k) for c in checks]
+        per_check = sum(len(json.dumps(e)) for e in excerpts) / len(excerpts)
+        print(f"Prompt per check: {per_check:,.0f} chars of excerpts vs {full_text:,} chars of case text\n")
+
+        print(f"{args.checks} checks, mock LLM {args.latency_ms:.0f} ms per call")
+        timed_run("one by one", CheckRunner(llm), context, checks, 1)
+        timed_run(f"fan-out x{args.concurrency}", runner, context, checks, args.concurrency)
+        timed_run("re-run", runner, context, checks, args.concurrency)
+        ingestor.shutdown()
+    finally:
+        llm.close()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+bench_vector_index.py — RafeeQ Vector Index Recall vs Latency
+──────────────────────────────────────────────────────────────
+Builds an on-disk index of clustered unit vectors (shaped like text
+embeddings), then reports recall@k against exact search and per-query
+latency for exact scans and IVF at several nprobe settings. Also times
+incremental adds, deletes and reopening the index from disk.
+
+Run from backend/:
+  python -m benchmarks.bench_vector_index
+  python -m benchmarks.bench_vector_index --rows 1000000 --dim 384
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from services.vector_index import VectorIndex
+
+
+def make_vectors(n_rows, dim, n_topics, seed):
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((n_topics, dim)).astype(np.float32)
+    x = topics[rng.integers(0, n_topics, n_rows)] + 0.6 * rng.standard_normal((n_rows, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def time_queries(index, queries, k, **search):
+    results, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        rows, _ = index.search(q, k=k, **search)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(set(rows.tolist()))
+    return results, np.percentile(latencies, [50, 99])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--dim', type=int, default=256)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    index_dir = tempfile.mkdtemp(prefix='rafeeq-bench-')
+    try:
+        vectors = make_vectors(args.rows, args.dim, n_topics=max(16, args.rows // 500), seed=0)
+        records = [{"doc_id": f"doc-{i // 20}", "chunk_no": i % 20, "text": ""} for i in range(args.rows)]
+
+        index = VectorIndex(index_dir, dim=args.dim, ivf_min_rows=args.rows + 1)
+        start = time.perf_counter()
+        for offset in range(0, args.rows, 50000):
+            index.add(vectors[offset:offset + 50000], records[offset:offset + 50000])
+        print(f"Added {args.rows} x {args.dim} vectors in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        index.build_ivf()
+        print(f"Trained IVF ({index.stats()['ivf_lists']} lists) in {time.perf_counter() - start:.2f}s")
+
+        rng = np.random.default_rng(1)
+        queries = vectors[rng.integers(0, args.rows, args.queries)] \
+            + 0.3 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        truth, (p50, p99) = time_queries(index, queries, args.k, mode='exact')
+        print(f"\n{'mode':>12}  recall@{args.k:<3} {'p50 ms':>8} {'p99 ms':>8}")
+        print(f"{'exact':>12}  {1.0:>9.3f} {p50:>8.2f} {p99:>8.2f}")
+        for nprobe in (1, 4, 16, 64):
+            found, (p50, p99) = time_queries(index, queries, args.k, mode='ivf', nprobe=nprobe)
+            recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth)])
+            print(f"{'ivf/' + str(nprobe):>12}  {recall:>9.3f} {p50:>8.2f} {p99:>8.2f}")
+
+        extra = make_vectors(1000, args.dim, n_topics=16, seed=2)
+        start = time.perf_counter()
+        index.add(extra, [{"doc_id": "extra", "chunk_no": i, "text": ""} for i in range(1000)])
+        add_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        index.delete("extra")
+        delete_ms = (time.perf_counter() - start) * 1000
+        print(f"\nIncremental add of 1000 rows: {add_ms:.1f} ms; delete of one document: {delete_ms:.1f} ms")
+
+        start = time.perf_counter()
+        reopened = VectorIndex(index_dir, dim=args.dim)
+        reopened.search(queries[0], k=args.k)
+        print(f"Reopen from disk + first query: {(time.perf_counter() - start) * 1000:.1f} ms")
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
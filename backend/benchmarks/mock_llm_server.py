@@ -0,0 +1,146 @@
+"""
+mock_llm_server.py — Offline OpenAI-Compatible Chat Server
+───────────────────────────────────────────────────────────
+Answers POST /v1/chat/completions with a canned Markdown risk table after a
+configurable delay, and can fail a share of requests (429 / 503) to exercise
+the gateway's retries. Keeps connections alive like a real API. When the
+system prompt asks for a "STATUS:" line (Tamkeen contract checks), one is
+appended to the reply.
+
+Requests with "stream": true get the reply as SSE chunks, one word every
+--token-ms after the first-token delay (--latency-ms), like the real API.
+
+Run from backend/:
+  python -m benchmarks.mock_llm_server --port 8089 --latency-ms 300 --token-ms 20
+  OPENAI_BASE_URL=http://127.0.0.1:8089/v1 python main.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_TABLE = (
+    "| Type (Discrepancy/Red Flag) | Details | Risk Level (High/Medium) |\n"
+    "|---|---|---|\n"
+    "| Red Flag | Mock analysis of a {size}-character application | Medium |"
+)
+CANNED_REPLY = (
+    "Based on the indexed credit file, the applicant's debt-to-income ratio is within policy and "
+    "the salary transfer letter matches the declared income. This is a mock reply to a "
+    "{size}-character message."
+)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not self.path.endswith('/chat/completions'):
+            return self._send(404, {"error": {"message": "Not found"}})
+
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.connections.add(self.client_address)
+        time.sleep(server.latency_seconds)
+        if random.random() < server.failure_rate:
+            status = random.choice((429, 503))
+            return self._send(status, {"error": {"message": f"Mock failure {status}"}})
+
+        request = json.loads(body or b'{}')
+        user_message = next((m["content"] for m in request.get("messages", []) if m["role"] == "user"), "")
+        system_prompt = next((m["content"] for m in request.get("messages", []) if m["role"] == "system"), "")
+        content = CANNED_TABLE.format(size=len(user_message))
+        if "STATUS:" in system_prompt:
+            content += f"\n\nSTATUS: {random.choice(('GREEN', 'YELLOW', 'RED'))}"
+        if request.get("stream"):
+            return self._stream(request, CANNED_REPLY.format(size=len(user_message)))
+        self._send(200, {
+            "id": f"chatcmpl-mock-{server.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+            "usage": {"prompt_tokens": len(user_message) // 4, "completion_tokens": 40,
+                      "total_tokens": len(user_message) // 4 + 40},
+        })
+
+    def _stream(self, request, text):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for i, word in enumerate(text.split(' ')):
+                if i:
+                    time.sleep(self.server.token_seconds)
+                self._chunk({
+                    "id": f"chatcmpl-mock-{self.server.requests}",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": request.get("model", "mock"),
+                    "choices": [{"index": 0, "delta": {"content": word if i == 0 else ' ' + word},
+                                 "finish_reason": None}],
+                })
+            self._chunk("[DONE]")
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # the client stopped reading (cancelled stream)
+
+    def _chunk(self, payload):
+        data = f"data: {payload if isinstance(payload, str) else json.dumps(payload)}\n\n".encode()
+        self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+        self.wfile.flush()
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_mock_server(port: int = 0, latency_ms: float = 200, failure_rate: float = 0.0, token_ms: float = 20):
+    """Serve on a daemon thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockLLMHandler)
+    server.daemon_threads = True
+    server.latency_seconds = latency_ms / 1000
+    server.failure_rate = failure_rate
+    server.token_seconds = token_ms / 1000
+    server.requests = 0
+    server.connections = set()
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, name='mock-llm', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=300)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--token-ms', type=float, default=20, help='Delay between streamed words')
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server(args.port, args.latency_ms, args.failure_rate, args.token_ms)
+    print(f"Mock LLM listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""
+suite.py — Backend Benchmark Suite
+───────────────────────────────────
+Repeatable numbers for "did this change make things faster or slower?":
+
+  - micro:     RiskModelService.predict at batch sizes 1, 100 and 10k
+  - endpoints: concurrent keep-alive clients against /api/predict,
+               /api/mujaz/process (fake transcriber) and /api/dashboard/stats
+
+Everything runs on a seeded synthetic model and data (benchmarks/synthetic.py).
+Results are written as JSON and, given a baseline, compared metric by metric;
+the exit code is 1 when anything regressed past --tolerance.
+
+Run from backend/:
+  python -m benchmarks.suite --save-baseline            # record benchmarks/results/baseline.json
+  python -m benchmarks.suite                            # compare against it
+  python -m benchmarks.suite --only micro --batch-sizes 1,100
+  python -m benchmarks.suite --url http://host:5001     # drive a running server (endpoints only)
+
+The in-process server shares the GIL with the load generator, so compare
+in-process runs only with other in-process runs on the same machine.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from benchmarks.synthetic import FEATURES_INFO, make_frame, train_synthetic_model
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(RESULTS_DIR, 'latest.json')
+
+# Lower is better for latencies, higher for throughput.
+COMPARED = {'p50_ms': -1, 'p95_ms': -1, 'p99_ms': -1, 'throughput_per_s': 1}
+
+
+def summarize(latencies_ms, elapsed_s, units):
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "count": len(latencies_ms),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "throughput_per_s": round(units / elapsed_s, 1),
+    }
+
+
+def json_rows(n_rows, seed):
+    """Synthetic applications as JSON-safe dicts (missing values left out, like the frontend)."""
+    df = make_frame(n_rows, FEATURES_INFO, seed=seed).astype(object).where(lambda d: d.notna(), None)
+    return [{k: v for k, v in r.items() if v is not None} for r in df.to_dict('records')]
+
+
+# ── Micro-benchmarks ───────────────────────────────────────
+def bench_predict(model_dir, batch_sizes, min_seconds):
+    from services.miqyas import RiskModelService
+    service = RiskModelService(model_dir=model_dir)
+    results = {}
+    for batch_size in batch_sizes:
+        rows = json_rows(batch_size, seed=batch_size)
+        batch = rows[0] if batch_size == 1 else rows
+        service.predict(batch)  # warm-up: lazy imports, first-touch pages
+        latencies, start = [], time.perf_counter()
+        while time.perf_counter() - start < min_seconds or len(latencies) < 5:
+            t0 = time.perf_counter()
+            service.predict(batch)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        stats = summarize(latencies, time.perf_counter() - start, len(latencies) * batch_size)
+        results[f"predict.batch_{batch_size}"] = {**stats, "unit": "rows"}
+        print(f"  predict batch={batch_size:>6}: p50 {stats['p50_ms']:.3f} ms  p99 {stats['p99_ms']:.3f} ms  "
+              f"{stats['throughput_per_s']:,.0f} rows/s")
+    return results
+
+
+# ── Endpoint load tests ────────────────────────────────────
+def start_server():
+    """Serve main.app on an ephemeral port in this process."""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    import main  # importing main starts the usual warm-up
+    for name in ('miqyas', 'mujaz_jobs', 'dashboard'):
+        main.SERVICES[name].instance()
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, main.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def multipart(field, filename, payload):
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: audio/wav\r\n\r\n').encode() + payload + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def endpoint_requests(n_rows):
+    """name → factory(i) returning (method, path, body, content_type) for request i."""
+    rows = json_rows(n_rows, seed=11)
+
+    def mujaz(i):
+        # Unique audio each time, so requests are transcribed instead of deduplicated
+        body, content_type = multipart('file', f'bench-{i}.wav', uuid.uuid4().bytes * 4096)
+        return 'POST', '/api/mujaz/process', body, content_type
+
+    return {
+        "/api/predict": lambda i: ('POST', '/api/predict', json.dumps(rows[i % len(rows)]).encode(),
+                                   'application/json'),
+        "/api/mujaz/process": mujaz,
+        "/api/dashboard/stats": lambda i: ('GET', '/api/dashboard/stats', None, None),
+    }
+
+
+def run_load(base_url, factory, total, concurrency):
+    parts = urlsplit(base_url)
+    counter = iter(range(total))
+    lock = threading.Lock()
+    latencies, errors = [], []
+
+    def client():
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=120)
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            method, path, body, content_type = factory(i)
+            headers = {'Content-Type': content_type} if content_type else {}
+            t0 = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=120)
+                ok = False
+            elapsed = (time.perf_counter() - t0) * 1000
+            with lock:
+                (latencies if ok else errors).append(elapsed)
+        conn.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(client) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    if not latencies:
+        return {"count": 0, "errors": len(errors)}
+    return {**summarize(latencies, elapsed, len(latencies)), "errors": len(errors), "concurrency": concurrency}
+
+
+def bench_endpoints(base_url, requests_per_endpoint, concurrency, endpoints):
+    results = {}
+    factories = endpoint_requests(200)
+    for name in endpoints:
+        run_load(base_url, factories[name], max(concurrency, 10), concurrency)  # warm-up
+        stats = run_load(base_url, factories[name], requests_per_endpoint, concurrency)
+        results[f"endpoint.{name}"] = {**stats, "unit": "requests"}
+        if stats["count"]:
+            print(f"  {name:<22} p50 {stats['p50_ms']:.2f} ms  p95 {stats['p95_ms']:.2f} ms  "
+                  f"p99 {stats['p99_ms']:.2f} ms  {stats['throughput_per_s']:,.0f} req/s  errors {stats['errors']}")
+        else:
+            print(f"  {name:<22} all {stats['errors']} requests failed")
+    return results
+
+
+# ── Results & baseline ─────────────────────────────────────
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    import sklearn
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "commit": commit,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Print a current-vs-baseline table; return the metrics that regressed."""
+    regressions = []
+    print(f"\nAgainst baseline from {baseline.get('created_at', '?')} (commit {baseline['environment'].get('commit')}):")
+    for name, stats in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before or not stats.get("count") or not before.get("count"):
+            continue
+        for metric, direction in COMPARED.items():
+            old, new = before.get(metric), stats.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change * direction < -tolerance
+            if worse:
+                regressions.append(f"{name} {metric}")
+            if metric in ('p50_ms', 'p99_ms', 'throughput_per_s'):
+                print(f"  {name:<32} {metric:<17} {old:>12,.3f} → {new:>12,.3f}  {change:+7.1%}"
+                      f"{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--only', choices=['micro', 'endpoints'], help='Run just one half of the suite')
+    parser.add_argument('--model-dir', help='Directory with loan_risk_model.joblib (default: synthetic)')
+    parser.add_argument('--batch-sizes', default='1,100,10000')
+    parser.add_argument('--min-seconds', type=float, default=2.0, help='Minimum timing per batch size')
+    parser.add_argument('--url', help='Base URL of a running server instead of an in-process one')
+    parser.add_argument('--endpoints', default='/api/predict,/api/mujaz/process,/api/dashboard/stats')
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Also write the results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative slowdown per metric')
+    args = parser.parse_args()
+
+    model_dir = args.model_dir
+    if not model_dir:
+        model_dir = tempfile.mkdtemp(prefix='miqyas-suite-')
+        print(f"Training synthetic model in {model_dir} ...")
+        train_synthetic_model(model_dir)
+
+    report = {
+        "created_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "environment": environment(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ('output', 'baseline', 'save_baseline')},
+        "results": {},
+    }
+
+    if args.only in (None, 'micro'):
+        print("Micro-benchmarks:")
+        sizes = [int(s) for s in args.batch_sizes.split(',') if s]
+        report["results"].update(bench_predict(model_dir, sizes, args.min_seconds))
+
+    if args.only in (None, 'endpoints'):
+        base_url = args.url
+        if not base_url:
+            os.environ['MIQYAS_MODEL_DIR'] = model_dir
+            os.environ.setdefault('MUJAZ_TRANSCRIBER', 'fake')
+            os.environ.setdefault('MUJAZ_FAKE_DELAY', '0.05')
+            _, base_url = start_server()
+        endpoints = [e for e in args.endpoints.split(',') if e]
+        print(f"Endpoints ({args.concurrency} clients, {args.requests} requests each) at {base_url}:")
+        report["results"].update(bench_endpoints(base_url, args.requests, args.concurrency, endpoints))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    regressions = []
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}" +
+              (': ' + ', '.join(regressions) if regressions else ''))
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one.")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
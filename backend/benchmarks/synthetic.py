@@ -0,0 +1,73 @@
+"""
+synthetic.py — Synthetic Miqyas Data & Model
+─────────────────────────────────────────────
+Generates application rows that follow the features_info schema and trains a
+pipeline with services/model_training.build_pipeline, so the benchmarks can run
+without the real dataset.
+"""
+
+import os
+import joblib
+import numpy as np
+import pandas as pd
+
+from services.drift_monitor import build_baseline, save_baseline
+from services.model_training import build_pipeline
+
+# Mirrors the fields the frontend sends (see useCases.simulationValues)
+NUMERIC_RANGES = {
+    'age': (21, 65),
+    'credit_score': (300, 900),
+    'monthly_salary_sar': (4000, 60000),
+    'financing_amount_sar': (20000, 1500000),
+    'dti_ratio': (0.0, 1.0),
+}
+CATEGORIES = {
+    'gender': ['Male', 'Female'],
+    'nationality_group': ['Local', 'GCC', 'Expat'],
+    'employment_type': ['Government', 'Private', 'Self-employed'],
+    'industry': ['Construction', 'Retail', 'Healthcare', 'Technology', 'Logistics'],
+}
+FEATURES_INFO = {
+    'numeric_features': list(NUMERIC_RANGES),
+    'categorical_features': list(CATEGORIES),
+}
+
+
+def make_frame(n_rows: int, features_info=None, seed: int = 0, missing_rate: float = 0.05):
+    """Random applications; features not in the built-in schema get generic values."""
+    features_info = features_info or FEATURES_INFO
+    rng = np.random.default_rng(seed)
+    data = {}
+    for name in features_info['numeric_features']:
+        low, high = NUMERIC_RANGES.get(name, (0.0, 1.0))
+        col = rng.uniform(low, high, n_rows)
+        col[rng.random(n_rows) < missing_rate] = np.nan
+        data[name] = col
+    for name in features_info['categorical_features']:
+        col = rng.choice(CATEGORIES.get(name, ['A', 'B', 'C']), n_rows).astype(object)
+        col[rng.random(n_rows) < missing_rate] = np.nan
+        data[name] = col
+    return pd.DataFrame(data)
+
+
+def make_labels(df):
+    """A noisy rule over credit score and DTI, good enough to grow realistic trees."""
+    rng = np.random.default_rng(1)
+    score = df.get('credit_score', pd.Series(600.0, index=df.index)).fillna(600).to_numpy()
+    dti = df.get('dti_ratio', pd.Series(0.4, index=df.index)).fillna(0.4).to_numpy()
+    score = score + rng.normal(0, 60, len(df))
+    return np.where(score > 680, 'Approved', np.where(dti > 0.6, 'Rejected', 'Manual Review'))
+
+
+def train_synthetic_model(model_dir: str, n_rows: int = 20000, n_estimators: int = 100):
+    """Fit and save loan_risk_model.joblib, features_info.joblib and drift_baseline.json into model_dir."""
+    os.makedirs(model_dir, exist_ok=True)
+    df = make_frame(n_rows)
+    pipeline = build_pipeline(FEATURES_INFO['numeric_features'], FEATURES_INFO['categorical_features'],
+                              n_estimators=n_estimators)
+    pipeline.fit(df, make_labels(df))
+    joblib.dump(pipeline, os.path.join(model_dir, 'loan_risk_model.joblib'))
+    joblib.dump(FEATURES_INFO, os.path.join(model_dir, 'features_info.joblib'))
+    save_baseline(build_baseline(df, FEATURES_INFO), os.path.join(model_dir, 'drift_baseline.json'))
+    return pipeline, FEATURES_INFO
@@ -5,32 +5,246 @@ Entry point for the backend API.
 Run with: python main.py
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
+from werkzeug.utils import secure_filename
+import functools
+import hashlib
+import hmac
+import itertools
+import json
 import os
+import shutil
+import tempfile
+import time
+import uuid
 
 # --- Service imports ---
 from services.miqyas import RiskModelService as MiqyasService
 from services.tamkeen import TamkeenService
-from services.rafeeq import RafeeqService
+from services.tamkeen_checks import CheckRunner
+from services.document_ingest import SUPPORTED_EXTENSIONS, DocumentIngestor, extract_text
+from services.rafeeq import RafeeqService, chat_backend_from_env
+from services.chat_sessions import ChatSessionStore
 from services.mudaqqiq import MudaqqiqService
+from services.near_duplicates import NearDuplicateIndex
 from services.mujaz import MujazService
 from services.dashboard import DashboardService
+from services.instrumentation import METRICS, SamplingProfiler, span
+from services.miqyas_batch import DEFAULT_CHUNK_SIZE, frames_from_columns, frames_from_upload
+from services.miqyas_encoding import JSON, encode, negotiate
+from services.lazy import LazyService
+from services.llm_gateway import LLMGateway
+from services.mujaz_jobs import MujazJobQueue, QueueFullError
+from services.mujaz_uploads import UploadOffsetError, UploadSpool, UploadTooLargeError
+from services.transcript_store import TranscriptStore
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_DIR = os.path.join(BASE_DIR, 'models')
+MODEL_DIR = os.getenv('MIQYAS_MODEL_DIR', os.path.join(BASE_DIR, 'models'))
 UPLOAD_DIR = os.path.join(BASE_DIR, 'uploads')
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+CASES_DIR = os.getenv('TAMKEEN_CASES_DIR', os.path.join(BASE_DIR, 'cases'))
 
-# --- Initialize services ---
-miqyas_service   = MiqyasService(model_dir=MODEL_DIR)
-tamkeen_service  = TamkeenService()
-rafeeq_service   = RafeeqService()
-mudaqqiq_service = MudaqqiqService()
-mujaz_service    = MujazService()
-dashboard_service = DashboardService()
+
+def _build_llm_gateway():
+    # Shared by every service that calls the LLM (e.g. LLM_MAX_CONCURRENCY=8 LLM_CACHE_DISK=1)
+    return LLMGateway.from_env(
+        cache_path=os.path.join(BASE_DIR, 'cache', 'llm.sqlite') if os.getenv('LLM_CACHE_DISK') else None,
+    )
+
+
+def _build_miqyas():
+    service = MiqyasService(model_dir=MODEL_DIR, llm=llm_gateway)
+
+    # Optional micro-batching for /api/predict (e.g. MIQYAS_COALESCE_WINDOW_MS=2)
+    if os.getenv('MIQYAS_COALESCE_WINDOW_MS'):
+        service.enable_coalescing(
+            window_ms=float(os.getenv('MIQYAS_COALESCE_WINDOW_MS')),
+            max_batch=int(os.getenv('MIQYAS_COALESCE_MAX_BATCH', '64')),
+        )
+
+    # Optional prediction cache (e.g. MIQYAS_CACHE_SIZE=10000 MIQYAS_CACHE_TTL=3600 MIQYAS_CACHE_DISK=1)
+    if os.getenv('MIQYAS_CACHE_SIZE'):
+        service.enable_cache(
+            max_entries=int(os.getenv('MIQYAS_CACHE_SIZE')),
+            ttl_seconds=float(os.getenv('MIQYAS_CACHE_TTL')) if os.getenv('MIQYAS_CACHE_TTL') else None,
+            disk_path=os.path.join(BASE_DIR, 'cache', 'predictions.sqlite') if os.getenv('MIQYAS_CACHE_DISK') else None,
+        )
+
+    # Input-quality and drift monitoring of predict traffic; MIQYAS_DRIFT_WINDOW=0 turns it off
+    drift_window = int(os.getenv('MIQYAS_DRIFT_WINDOW', '10000'))
+    if drift_window > 0:
+        service.enable_drift_monitoring(
+            window_rows=drift_window,
+            min_rows=int(os.getenv('MIQYAS_DRIFT_MIN_ROWS', '200')),
+            max_rows_per_request=int(os.getenv('MIQYAS_DRIFT_SAMPLE_ROWS', '256')),
+        )
+
+    # Optional registry polling, so a version activated by the training CLI goes live (e.g. MIQYAS_RELOAD_INTERVAL=30)
+    if os.getenv('MIQYAS_RELOAD_INTERVAL'):
+        service.watch_registry(float(os.getenv('MIQYAS_RELOAD_INTERVAL')))
+    return service
+
+
+# --- Initialize services (built on first use) ---
+llm_gateway      = LazyService('LLM', _build_llm_gateway)
+miqyas_service   = LazyService('Miqyas', _build_miqyas)
+tamkeen_service  = LazyService('Tamkeen', lambda: TamkeenService(
+    ingestor=DocumentIngestor(
+        os.path.join(DATA_DIR, 'tamkeen_documents.sqlite'),
+        max_workers=int(os.getenv('TAMKEEN_INGEST_WORKERS', '0')) or None,
+    ),
+    cases_dir=CASES_DIR,
+    # Contract checks fan out through the shared gateway (e.g. TAMKEEN_CHECK_CONCURRENCY=4 TAMKEEN_CHECK_TOP_K=6)
+    checks=CheckRunner(
+        llm_gateway,  # the proxy: the gateway is built on the first check run, not for every Tamkeen route
+        top_k=int(os.getenv('TAMKEEN_CHECK_TOP_K', '6')),
+        max_concurrency=int(os.getenv('TAMKEEN_CHECK_CONCURRENCY', '4')),
+        cache_path=os.path.join(BASE_DIR, 'cache', 'tamkeen_checks.sqlite') if os.getenv('LLM_CACHE_DISK') else None,
+    ),
+))
+rafeeq_service   = LazyService('RafeeQ', lambda: RafeeqService(
+    index_dir=os.path.join(DATA_DIR, 'rafeeq_index'),
+    # RAFEEQ_LLM=extractive (default) | llm | fake
+    chat_backend=chat_backend_from_env(llm_gateway.instance() if os.getenv('RAFEEQ_LLM') == 'llm' else None),
+    sessions=ChatSessionStore(
+        max_sessions=int(os.getenv('RAFEEQ_MAX_SESSIONS', '1000')),
+        max_turns=int(os.getenv('RAFEEQ_MAX_TURNS', '12')),
+        ttl_seconds=float(os.getenv('RAFEEQ_SESSION_TTL', '3600')),
+    ),
+))
+mudaqqiq_service = LazyService('MudaQQiQ', lambda: MudaqqiqService(
+    index=NearDuplicateIndex(os.path.join(DATA_DIR, 'mudaqqiq_index')),
+    min_similarity=float(os.getenv('MUDAQQIQ_MIN_SIMILARITY', '0.5')),
+))
+mujaz_service    = LazyService('Mujaz', lambda: MujazService(
+    store=TranscriptStore(os.path.join(DATA_DIR, 'mujaz_transcripts.sqlite')),
+))
+dashboard_service = LazyService('Dashboard', lambda: DashboardService(
+    db_path=os.path.join(DATA_DIR, 'dashboard.sqlite'),
+))
+mujaz_uploads    = LazyService('MujazUploads', lambda: UploadSpool(
+    UPLOAD_DIR, max_bytes=int(os.getenv('MUJAZ_MAX_UPLOAD_MB', '500')) * 1024 * 1024,
+))
+mujaz_jobs       = LazyService('MujazJobs', lambda: MujazJobQueue(
+    mujaz_service.instance(),
+    db_path=os.path.join(DATA_DIR, 'mujaz_jobs.sqlite'),
+    max_workers=int(os.getenv('MUJAZ_MAX_CONCURRENCY', '2')),
+    max_pending=int(os.getenv('MUJAZ_MAX_PENDING', '100')),
+    on_finish=mujaz_uploads.discard,
+))
+
+SERVICES = {
+    'llm': llm_gateway,
+    'miqyas': miqyas_service,
+    'tamkeen': tamkeen_service,
+    'rafeeq': rafeeq_service,
+    'mudaqqiq': mudaqqiq_service,
+    'mujaz': mujaz_service,
+    'dashboard': dashboard_service,
+    'mujaz_uploads': mujaz_uploads,
+    'mujaz_jobs': mujaz_jobs,
+}
+
+# Services listed in WARMUP_SERVICES (comma-separated, 'all' or '') are built
+# in the background while the server starts; the rest wait for first use.
+WARMUP_SERVICES = [
+    name.strip() for name in os.getenv('WARMUP_SERVICES', 'miqyas,mujaz_jobs').split(',') if name.strip()
+]
+if WARMUP_SERVICES == ['all']:
+    WARMUP_SERVICES = list(SERVICES)
+
+
+def warm_up_services():
+    for name in WARMUP_SERVICES:
+        SERVICES[name].warm_up()
+
+
+# ── Activity log ───────────────────────────────────────────
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def _record_event(response):
+    # Every state-changing service call lands in the dashboard's event log
+    parts = request.path.split('/')
+    if request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and len(parts) > 2 and parts[1] == 'api' \
+            and parts[2] != 'dashboard' and request.url_rule is not None:
+        try:
+            dashboard_service.record_event(
+                service=parts[2],
+                event=request.url_rule.endpoint,
+                status_code=response.status_code,
+                duration_ms=(time.perf_counter() - g.request_start) * 1000,
+            )
+        except Exception:
+            pass  # the activity log must never fail a request
+    return response
+
+
+# ── Metrics & profiling ────────────────────────────────────
+# Opt-in (e.g. PROFILER_ENABLED=1): lets anyone who can reach the API sample its stacks.
+profiler = SamplingProfiler() if os.getenv('PROFILER_ENABLED') else None
+
+
+@app.after_request
+def _observe_latency(response):
+    # Labelled by route template, not path, so IDs in URLs don't explode the series count.
+    # Streamed responses are timed until their headers are ready.
+    start = g.get('request_start')
+    if start is not None:
+        METRICS.observe(
+            'http_request_duration_seconds', time.perf_counter() - start,
+            method=request.method,
+            route=request.url_rule.rule if request.url_rule is not None else 'unmatched',
+            status=response.status_code,
+        )
+    return response
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text format; ?format=json returns p50/p95/p99 per series instead."""
+    if request.args.get('format') == 'json':
+        return jsonify(METRICS.snapshot())
+    return Response(METRICS.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/profiler', methods=['GET'])
+def profiler_status():
+    if profiler is None:
+        return jsonify({'error': 'Profiler disabled; set PROFILER_ENABLED=1'}), 404
+    return jsonify(profiler.status())
+
+
+@app.route('/api/profiler/start', methods=['POST'])
+def profiler_start():
+    """Body: {"interval_ms": 5, "duration_seconds": 30} — stops on its own after the duration."""
+    if profiler is None:
+        return jsonify({'error': 'Profiler disabled; set PROFILER_ENABLED=1'}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        interval_ms = max(1.0, float(data.get('interval_ms', 5)))
+        duration = float(data['duration_seconds']) if data.get('duration_seconds') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': "'interval_ms' and 'duration_seconds' must be numbers"}), 400
+    try:
+        return jsonify(profiler.start(interval_ms, duration))
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+
+
+@app.route('/api/profiler/stop', methods=['POST'])
+def profiler_stop():
+    """Folded stacks for flamegraph.pl / speedscope: curl -X POST .../stop > out.folded"""
+    if profiler is None:
+        return jsonify({'error': 'Profiler disabled; set PROFILER_ENABLED=1'}), 404
+    return Response(profiler.stop(), mimetype='text/plain')
 
 
 # ── Dashboard ──────────────────────────────────────────────
@@ -39,18 +253,218 @@ def get_dashboard_stats():
     return jsonify(dashboard_service.get_stats())
 
 
+@app.route('/api/dashboard/cases', methods=['GET'])
+def list_dashboard_cases():
+    """Paginated cases: ?limit=50&cursor=...&risk=High&rm=...&status=...&industry=..."""
+    try:
+        return jsonify(dashboard_service.list_cases(
+            limit=request.args.get('limit', 50, type=int),
+            cursor=request.args.get('cursor'),
+            **{name: request.args.get(name) for name in ('risk', 'rm', 'status', 'industry')},
+        ))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+
+@app.route('/api/dashboard/cases/<case_id>', methods=['PATCH'])
+def update_dashboard_case(case_id):
+    result = dashboard_service.update_case(case_id, request.json or {})
+    if result['status'] == 'success':
+        return jsonify(result)
+    return jsonify(result), 404 if result['message'].startswith('Unknown') else 400
+
+
 # ── Miqyas Credit (Risk Model) ─────────────────────────────
+def record_on_dashboard(method, *args):
+    """Upsert scored cases via dashboard_service.<method>; a dashboard failure never fails the prediction."""
+    try:
+        with span('dashboard.record_predictions'):
+            getattr(dashboard_service, method)(*args)
+    except Exception as e:
+        print(f"[Dashboard] Recording predictions failed: {e}")
+
+
 @app.route('/api/predict', methods=['POST'])
 def predict():
     data = request.json
     if not data:
         return jsonify({'error': 'No data provided'}), 400
     try:
-        return jsonify(miqyas_service.predict(data))
+        response_type = negotiate(request.headers.get('Accept'), request.args.get('format'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 406
+    if response_type != JSON:
+        return _predict_dense(data, response_type)
+    try:
+        results = miqyas_service.predict(data)
+        record_on_dashboard('record_predictions', [data] if isinstance(data, dict) else data, results)
+        with span('miqyas.serialize'):
+            return jsonify(results)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def _predict_dense(data, response_type):
+    """/api/predict in one of the compact formats (see services/miqyas_encoding.py)."""
+    try:
+        labels, probabilities = miqyas_service.predict_matrix(data)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    record_on_dashboard('record_scores', [data] if isinstance(data, dict) else data, labels, probabilities)
+    try:
+        with span('miqyas.serialize'):
+            body = encode(response_type, labels, probabilities)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 406
+    return Response(body, mimetype=response_type)
+
+
+@app.route('/api/miqyas/status', methods=['GET'])
+def miqyas_status():
+    return jsonify(miqyas_service.get_status())
+
+
+def _admin_denied():
+    # Model admin routes need X-Admin-Token to match MIQYAS_ADMIN_TOKEN; without
+    # a token they are closed unless MIQYAS_ADMIN_OPEN=1 (local development).
+    token = os.getenv('MIQYAS_ADMIN_TOKEN')
+    if not token:
+        if os.getenv('MIQYAS_ADMIN_OPEN') == '1':
+            return None
+        return jsonify({'error': 'Admin routes disabled; set MIQYAS_ADMIN_TOKEN'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), token.encode()):
+        return jsonify({'error': 'Admin token required'}), 403
+    return None
+
+
+def _model_change(action):
+    denied = _admin_denied()
+    if denied:
+        return denied
+    try:
+        state = action()
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    status = {'loading': 202, 'failed': 500}.get(state['state'], 200)
+    return jsonify(state), status
+
+
+@app.route('/api/miqyas/models', methods=['GET'])
+def miqyas_models():
+    return jsonify(miqyas_service.models_status())
+
+
+@app.route('/api/miqyas/models/promote', methods=['POST'])
+def miqyas_promote():
+    """Body: {"version": "20240101-120000", "wait": false} — loads in the background, then swaps."""
+    data = request.json or {}
+    if not data.get('version'):
+        return jsonify({'error': "'version' is required"}), 400
+    return _model_change(lambda: miqyas_service.promote(str(data['version']), wait=bool(data.get('wait'))))
+
+
+@app.route('/api/miqyas/models/rollback', methods=['POST'])
+def miqyas_rollback():
+    data = request.get_json(silent=True) or {}
+    return _model_change(lambda: miqyas_service.rollback(wait=bool(data.get('wait'))))
+
+
+@app.route('/api/miqyas/models/shadow', methods=['POST'])
+def miqyas_shadow():
+    """Body: {"version": "...", "sample_rate": 0.1} — score a sample of traffic on a candidate too."""
+    data = request.json or {}
+    if not data.get('version'):
+        return jsonify({'error': "'version' is required"}), 400
+    try:
+        sample_rate = float(data.get('sample_rate', 0.1))
+    except (TypeError, ValueError):
+        return jsonify({'error': "'sample_rate' must be a number"}), 400
+    if not 0 < sample_rate <= 1:
+        return jsonify({'error': "'sample_rate' must be in (0, 1]"}), 400
+    return _model_change(lambda: miqyas_service.set_shadow(str(data['version']), sample_rate,
+                                                           wait=bool(data.get('wait'))))
+
+
+@app.route('/api/miqyas/models/shadow', methods=['DELETE'])
+def miqyas_clear_shadow():
+    denied = _admin_denied()
+    if denied:
+        return denied
+    return jsonify({'shadow': miqyas_service.clear_shadow()})
+
+
+@app.route('/api/miqyas/drift', methods=['GET'])
+def miqyas_drift():
+    """Input quality and feature drift of recent predict traffic vs. the model's training baseline."""
+    report = miqyas_service.drift_report()
+    if report is None:
+        return jsonify({'error': 'Drift monitoring is not enabled for the serving model'}), 404
+    return jsonify(report)
+
+
+@app.route('/api/miqyas/drift/reset', methods=['POST'])
+def miqyas_drift_reset():
+    denied = _admin_denied()
+    if denied:
+        return denied
+    if miqyas_service.drift is None:
+        return jsonify({'error': 'Drift monitoring is not enabled for the serving model'}), 404
+    miqyas_service.drift.reset()
+    return jsonify({'status': 'reset'})
+
+
+@app.route('/api/miqyas/predict-batch', methods=['POST'])
+def predict_batch():
+    """
+    Score a whole portfolio in one call.
+    Body: columnar JSON, a CSV / Arrow body, or a multipart 'file' upload.
+    Response: NDJSON, one result per line, streamed chunk by chunk.
+    """
+    if not miqyas_service.model_loaded:
+        return jsonify({'error': 'Model not loaded'}), 503
+    spool = None
+    try:
+        chunk_size = max(1, request.args.get('chunk_size', DEFAULT_CHUNK_SIZE, type=int))
+        if 'file' in request.files:
+            # Flask closes multipart files once the view returns, so hand the
+            # streaming reader its own on-disk copy.
+            upload = request.files['file']
+            spool = tempfile.TemporaryFile()
+            shutil.copyfileobj(upload.stream, spool)
+            spool.seek(0)
+            frames = frames_from_upload(spool, upload.mimetype, upload.filename, chunk_size)
+        elif request.is_json:
+            frames = frames_from_columns(request.get_json(), chunk_size)
+        else:
+            frames = frames_from_upload(request.stream, request.content_type, chunk_size=chunk_size)
+    except ValueError as e:
+        if spool is not None:
+            spool.close()
+        return jsonify({'error': str(e)}), 400
+
+    def generate():
+        row = 0
+        try:
+            for results in miqyas_service.predict_batch(frames):
+                lines = []
+                for result in results:
+                    lines.append(json.dumps({'row': row, **result}))
+                    row += 1
+                yield '\n'.join(lines) + '\n'
+        except Exception as e:
+            # Rows before `row` were already sent; report where the stream stopped
+            yield json.dumps({'error': str(e), 'row': row}) + '\n'
+        finally:
+            if spool is not None:
+                spool.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @app.route('/api/miqyas/deep-analyze', methods=['POST'])
 def deep_analyze():
     data = request.json
@@ -62,46 +476,446 @@ def deep_analyze():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/miqyas/deep-analyze-batch', methods=['POST'])
+def deep_analyze_batch():
+    """
+    Score a portfolio and deep-analyze the risky cases.
+    Body: {"applications": [...], "threshold": 0.5, "max_concurrency": 8}
+    Response: NDJSON — one "case" line per application as it finishes, then a "report" line.
+    """
+    data = request.json or {}
+    applications = data.get('applications')
+    if not isinstance(applications, list) or not applications or \
+            not all(isinstance(a, dict) for a in applications):
+        return jsonify({'error': "'applications' must be a non-empty list of objects"}), 400
+    if not miqyas_service.model_loaded:
+        return jsonify({'error': 'Model not loaded'}), 503
+    try:
+        threshold = float(data.get('threshold', 0.5))
+        max_concurrency = int(data['max_concurrency']) if data.get('max_concurrency') is not None else None
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        return jsonify({'error': "'threshold' must be a number and 'max_concurrency' a positive integer"}), 400
+
+    def generate():
+        try:
+            for event in miqyas_service.deep_analyze_portfolio(applications, threshold, max_concurrency):
+                yield json.dumps(event) + '\n'
+        except Exception as e:
+            yield json.dumps({'type': 'error', 'error': str(e)}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 # ── Tamkeen (RMs Assistant) ────────────────────────────────
 @app.route('/api/tamkeen/analyze', methods=['POST'])
 def tamkeen_analyze():
     data = request.json or {}
-    return jsonify(tamkeen_service.analyze_contract(data))
+    result = tamkeen_service.analyze_contract(data)
+    return jsonify(result), 200 if result['status'] == 'success' else 400
+
+
+def _case_file_name(filename):
+    # Same idea for uploaded files: 'عقد.pdf' would otherwise be saved as 'pdf'
+    name = secure_filename(filename)
+    if not name or filename.isascii():
+        return name
+    stem, ext = os.path.splitext(filename)
+    ext = ext if secure_filename(ext.lstrip('.')) == ext.lstrip('.') else ''
+    return f"{secure_filename(stem) or 'document'}_{hashlib.sha256(filename.encode()).hexdigest()[:10]}{ext}"
+
+
+@app.route('/api/cases', methods=['POST'])
+def create_case_folder():
+    """Multipart: client, industry, files[] — saved into <TAMKEEN_CASES_DIR>/<slug>_<hash>_docs/."""
+    client = request.form.get('client', '').strip()
+    if not client:
+        return jsonify({'error': 'client is required'}), 400
+    # secure_filename drops non-ASCII (e.g. Arabic) names entirely; the hash of
+    # the full name keeps every client in a folder of its own.
+    slug = secure_filename(client)[:40] or 'case'
+    folder_name = f"{slug}_{hashlib.sha256(client.encode()).hexdigest()[:10]}_docs"
+    folder = os.path.join(CASES_DIR, folder_name)
+    os.makedirs(folder, exist_ok=True)
+    saved = []
+    for upload in request.files.getlist('files'):
+        name = _case_file_name(upload.filename or '')
+        if name:
+            upload.save(os.path.join(folder, name))
+            saved.append(name)
+    return jsonify({'status': 'success', 'folderPath': folder_name, 'filesUploaded': saved})
+
+
+@app.route('/api/parse-contract', methods=['POST'])
+def parse_contract():
+    """Body: {"folderPath": "..."} — project details, obligations and cash-flow terms from the case documents."""
+    data = request.json or {}
+    try:
+        return jsonify(tamkeen_service.parse_contract(data.get('folderPath')))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 404
+
+
+@app.route('/api/tamkeen/cashflow', methods=['POST'])
+def tamkeen_cashflow():
+    """
+    Deterministic cash-flow and facility checks across a portfolio.
+    Body: {"folderPaths": [...], "contracts": [{"contract_value", "duration_months", ...}], "policy": {...}}
+    """
+    data = request.json or {}
+    try:
+        return jsonify(tamkeen_service.analyze_portfolio(data.get('folderPaths'), data.get('contracts'),
+                                                         data.get('policy')))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 404
+
+
+@app.route('/api/tamkeen/checks', methods=['POST'])
+def tamkeen_checks():
+    """
+    Run contract checks over a case's documents.
+    Body: {"folderPath": "...", "checks": [{"id", "query", "systemPrompt"}, ...], "max_concurrency": 4}
+    Response: NDJSON — one "check" line per check as it finishes (with its parsed
+    GREEN/YELLOW/RED `status`), then a "report" line.
+    """
+    data = request.json or {}
+    try:
+        max_concurrency = int(data['max_concurrency']) if data.get('max_concurrency') is not None else None
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': "'max_concurrency' must be a positive integer"}), 400
+    try:
+        events = tamkeen_service.run_checks(data.get('folderPath'), data.get('checks'), max_concurrency)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 404
+
+    def generate():
+        try:
+            for event in events:
+                yield json.dumps(event) + '\n'
+        except Exception as e:
+            yield json.dumps({'type': 'error', 'error': str(e)}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/api/tamkeen/status', methods=['GET'])
+def tamkeen_status():
+    return jsonify(tamkeen_service.get_status())
 
 
 # ── RafeeQ (Conversational Doc) ───────────────────────────
 @app.route('/api/rafeeq/chat', methods=['POST'])
 def rafeeq_chat():
     data = request.json or {}
-    return jsonify(rafeeq_service.chat(data.get('message'), data.get('context')))
+    try:
+        return jsonify(rafeeq_service.chat(data.get('message'), data.get('context'), data.get('session_id')))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+
+@app.route('/api/rafeeq/chat/stream', methods=['POST'])
+def rafeeq_chat_stream():
+    """
+    Body: {"message": "...", "session_id": "...", "history_turns": N} — only the
+    new message; the server keeps the history (a new session is started if
+    session_id is omitted). If the server has lost a session the client holds N
+    turns for, the stream is just a start event with "context_required", and the
+    client resends once with "context": [{role, content}, ...] to restore them.
+    Response: Server-Sent Events when the client accepts text/event-stream,
+    otherwise NDJSON — start, token…, then done (or error) events.
+    """
+    data = request.json or {}
+    message = data.get('message')
+    if not isinstance(message, str) or not message.strip():
+        return jsonify({'status': 'error', 'message': 'Message is empty'}), 400
+    session_id = data.get('session_id') or uuid.uuid4().hex
+    try:
+        events = rafeeq_service.chat_stream(message, session_id=session_id, context=data.get('context'),
+                                            history_turns=data.get('history_turns') or 0)
+        first = next(events)  # validates the session id before the 200 goes out
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    sse = request.accept_mimetypes.best_match(['application/x-ndjson', 'text/event-stream']) == 'text/event-stream'
+
+    def generate():
+        for event in itertools.chain([first], events):
+            line = json.dumps(event, ensure_ascii=False)
+            yield f"event: {event['event']}\ndata: {line}\n\n" if sse else line + '\n'
+
+    return Response(stream_with_context(generate()),
+                    mimetype='text/event-stream' if sse else 'application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/rafeeq/sessions/<session_id>', methods=['GET'])
+def rafeeq_get_session(session_id):
+    session = rafeeq_service.get_session(session_id)
+    if session is None:
+        return jsonify({'status': 'error', 'message': f'Unknown session: {session_id}'}), 404
+    return jsonify(session)
+
+
+@app.route('/api/rafeeq/sessions/<session_id>', methods=['DELETE'])
+def rafeeq_delete_session(session_id):
+    if not rafeeq_service.delete_session(session_id):
+        return jsonify({'status': 'error', 'message': f'Unknown session: {session_id}'}), 404
+    return jsonify({'status': 'success', 'session_id': session_id})
+
+
+@app.route('/api/rafeeq/documents', methods=['POST'])
+def rafeeq_add_document():
+    data = request.json or {}
+    if not data.get('text'):
+        return jsonify({'error': 'No text provided'}), 400
+    doc_id = str(data.get('doc_id') or hashlib.sha256(data['text'].encode()).hexdigest()[:16])
+    result = rafeeq_service.add_document(doc_id, data['text'], data.get('title'))
+    return jsonify(result), 200 if result['status'] == 'success' else 400
+
+
+@app.route('/api/rafeeq/documents/<doc_id>', methods=['DELETE'])
+def rafeeq_delete_document(doc_id):
+    result = rafeeq_service.delete_document(doc_id)
+    return jsonify(result), 200 if result['status'] == 'success' else 404
+
+
+@app.route('/api/rafeeq/status', methods=['GET'])
+def rafeeq_status():
+    return jsonify(rafeeq_service.get_status())
 
 
 # ── MudaQQiQ (Audit) ──────────────────────────────────────
 @app.route('/api/mudaqqiq/verify', methods=['POST'])
 def mudaqqiq_verify():
+    """Body: {"document_id": "..."} for a registered document, or {"text": "...", "application_id": "..."}; optional "k"."""
     data = request.json or {}
-    return jsonify(mudaqqiq_service.verify_document(data.get('document_id')))
+    try:
+        k = int(data['k']) if data.get('k') else None
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': "'k' must be a number"}), 400
+    result = mudaqqiq_service.verify_document(data.get('document_id'), data.get('text'),
+                                              data.get('application_id'), k)
+    if result['status'] == 'success':
+        return jsonify(result)
+    return jsonify(result), 404 if data.get('document_id') else 400
+
+
+@app.route('/api/mudaqqiq/documents', methods=['POST'])
+def mudaqqiq_add_documents():
+    """
+    Register documents for duplicate checks.
+    JSON: {"doc_id", "text", "application_id", "title"} or {"documents": [...]};
+    multipart: file (PDF / DOCX / TXT) with doc_id and application_id form fields.
+    """
+    if 'file' in request.files:
+        upload = request.files['file']
+        extension = os.path.splitext(upload.filename or '')[1].lower()
+        if extension not in SUPPORTED_EXTENSIONS:
+            return jsonify({'status': 'error', 'message': f"Supported files: {', '.join(SUPPORTED_EXTENSIONS)}"}), 400
+        with tempfile.NamedTemporaryFile(suffix=extension) as spool:
+            upload.save(spool)
+            spool.flush()
+            try:
+                text, _ = extract_text(spool.name)
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': f'Could not read {upload.filename}: {e}'}), 400
+        doc_id = request.form.get('doc_id') or hashlib.sha256(text.encode()).hexdigest()[:16]
+        result = mudaqqiq_service.add_document(doc_id, text, request.form.get('application_id'),
+                                               request.form.get('title') or upload.filename)
+    else:
+        data = request.json or {}
+        result = mudaqqiq_service.add_documents(data['documents'] if 'documents' in data else [data])
+    return jsonify(result), 200 if result['status'] == 'success' else 400
+
+
+@app.route('/api/mudaqqiq/documents/<doc_id>', methods=['DELETE'])
+def mudaqqiq_delete_document(doc_id):
+    result = mudaqqiq_service.delete_document(doc_id)
+    return jsonify(result), 200 if result['status'] == 'success' else 404
+
+
+@app.route('/api/mudaqqiq/status', methods=['GET'])
+def mudaqqiq_status():
+    return jsonify(mudaqqiq_service.get_status())
 
 
 # ── Mujaz (Audio Summary) ─────────────────────────────────
+def _spool_request_audio():
+    """Stream the request's audio into the spool: multipart 'file' or a raw body."""
+    if 'file' in request.files:
+        file = request.files['file']
+        if file.filename == '':
+            return None
+        return mujaz_uploads.ingest(file.stream, file.filename)
+    if request.content_length or request.headers.get('Transfer-Encoding') == 'chunked':
+        return mujaz_uploads.ingest(request.stream, request.args.get('filename', 'recording'))
+    return None
+
+
+def _submit_spooled(spooled):
+    """Queue a spooled recording, unless the same audio was already processed."""
+    existing = mujaz_jobs.find_by_hash(spooled.content_hash)
+    if existing is not None:
+        # The matching job has its own copy of the audio; this upload's file is not needed
+        mujaz_uploads.discard(spooled.path)
+        if existing['status'] == 'done':
+            existing = _refresh_analysis(existing)
+        return {**existing, 'deduplicated': True}
+    try:
+        job_id = mujaz_jobs.submit(spooled.path, filename=spooled.filename, content_hash=spooled.content_hash)
+    except Exception:
+        mujaz_uploads.discard(spooled.path)
+        raise
+    return {'status': 'queued', 'job_id': job_id, 'content_hash': spooled.content_hash, 'deduplicated': False}
+
+
+def _refresh_analysis(job):
+    """Re-run post-processing on the stored transcript so logic changes apply to old jobs."""
+    result = mujaz_service.reanalyze(job['content_hash']) if job.get('content_hash') else None
+    if result and result.get('status') == 'success':
+        mujaz_jobs.update_result(job['job_id'], result)
+        job = {**job, 'result': result}
+    return job
+
+
+def _mujaz_errors(view):
+    """Map ingest / queue errors to HTTP responses for the Mujaz upload routes."""
+    @functools.wraps(view)
+    def wrapped(*args, **kwargs):
+        try:
+            return view(*args, **kwargs)
+        except UploadTooLargeError as e:
+            return jsonify({'status': 'error', 'error': str(e)}), 413
+        except UploadOffsetError as e:
+            return jsonify({'status': 'error', 'error': str(e), 'offset': e.expected}), 409
+        except QueueFullError as e:
+            return jsonify({'status': 'error', 'error': str(e)}), 503
+        except KeyError:
+            return jsonify({'status': 'error', 'error': 'Upload not found'}), 404
+        except Exception as e:
+            return jsonify({'status': 'error', 'error': str(e)}), 500
+    return wrapped
+
+
 @app.route('/api/mujaz/process', methods=['POST'])
+@_mujaz_errors
 def mujaz_process():
-    if 'file' not in request.files or request.files['file'].filename == '':
+    """
+    Legacy synchronous variant: queue the recording and hold the request until
+    it is transcribed. Kept for existing clients; the frontend submits to
+    /api/mujaz/jobs and polls /api/mujaz/jobs/<job_id> instead.
+    """
+    spooled = _spool_request_audio()
+    if spooled is None:
         return jsonify({'status': 'error', 'error': 'No file provided'}), 400
-    try:
-        file = request.files['file']
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
-        file.save(file_path)
-        return jsonify(mujaz_service.process_audio(file_path))
-    except Exception as e:
-        return jsonify({'status': 'error', 'error': str(e)}), 500
+    job = _submit_spooled(spooled)
+    if job['status'] != 'done':
+        job = mujaz_jobs.wait(job['job_id'])
+    if job['status'] == 'done':
+        return jsonify(job['result'])
+    return jsonify({'status': 'error', 'message': job.get('error') or 'Processing failed'})
+
+
+@app.route('/api/mujaz/jobs', methods=['POST'])
+@_mujaz_errors
+def mujaz_submit_job():
+    """Queue a recording for transcription; poll /api/mujaz/jobs/<job_id> for the result."""
+    spooled = _spool_request_audio()
+    if spooled is None:
+        return jsonify({'status': 'error', 'error': 'No file provided'}), 400
+    job = _submit_spooled(spooled)
+    return jsonify(job), 200 if job['status'] == 'done' else 202
+
+
+# Resumable uploads: create → PUT chunks at ?offset=N → complete
+@app.route('/api/mujaz/uploads', methods=['POST'])
+@_mujaz_errors
+def mujaz_create_upload():
+    data = request.json or {}
+    session = mujaz_uploads.create_session(data.get('filename', 'recording'), data.get('size'))
+    return jsonify(session), 201
+
+
+@app.route('/api/mujaz/uploads/<upload_id>', methods=['GET'])
+@_mujaz_errors
+def mujaz_upload_status(upload_id):
+    session = mujaz_uploads.session(upload_id)
+    if session is None:
+        raise KeyError(upload_id)
+    return jsonify(session)
+
+
+@app.route('/api/mujaz/uploads/<upload_id>', methods=['PUT'])
+@_mujaz_errors
+def mujaz_upload_chunk(upload_id):
+    offset = mujaz_uploads.append(upload_id, request.args.get('offset', 0, type=int), request.stream)
+    return jsonify({'upload_id': upload_id, 'offset': offset})
+
+
+@app.route('/api/mujaz/uploads/<upload_id>/complete', methods=['POST'])
+@_mujaz_errors
+def mujaz_complete_upload(upload_id):
+    job = _submit_spooled(mujaz_uploads.complete(upload_id))
+    return jsonify(job), 200 if job['status'] == 'done' else 202
+
+
+@app.route('/api/mujaz/jobs', methods=['GET'])
+def mujaz_list_jobs():
+    return jsonify({
+        'jobs': mujaz_jobs.list(limit=request.args.get('limit', 50, type=int)),
+        'queue': mujaz_jobs.stats(),
+    })
+
+
+@app.route('/api/mujaz/jobs/<job_id>', methods=['GET'])
+def mujaz_job_status(job_id):
+    job = mujaz_jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
+@app.route('/api/mujaz/jobs/<job_id>/reanalyze', methods=['POST'])
+def mujaz_reanalyze_job(job_id):
+    """Re-run notes / action-item extraction on the stored transcript (no re-transcription)."""
+    job = mujaz_jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'error': 'Job not found'}), 404
+    if job['status'] != 'done':
+        return jsonify({'status': 'error', 'error': f"Job is {job['status']}"}), 409
+    return jsonify(_refresh_analysis(job))
 
 
 # ── Health check ───────────────────────────────────────────
 @app.route('/api/status', methods=['GET'])
 def status():
-    return jsonify({'status': 'online'})
+    """Liveness is immediate; readiness waits for the warm-up services."""
+    services = {name: service.lazy_status() for name, service in SERVICES.items()}
+    ready = all(services[name]['state'] == 'ready' for name in WARMUP_SERVICES)
+    return jsonify({'status': 'online', 'ready': ready, 'services': services})
+
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    not_ready = [name for name in WARMUP_SERVICES if SERVICES[name].lazy_status()['state'] != 'ready']
+    if not_ready:
+        return jsonify({'ready': False, 'waiting_for': not_ready}), 503
+    return jsonify({'ready': True})
+
+
+# The debug reloader imports this module twice; only warm up in the process
+# that actually serves requests (or under a WSGI server importing main).
+if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    warm_up_services()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,367 @@
+"""
+cashflow_engine.py — Tamkeen Contract Cash-Flow & Obligations Engine
+─────────────────────────────────────────────────────────────────────
+Deterministic numbers for the RMs Assistant's cash-flow and facility checks,
+computed from the terms document_ingest.py extracts rather than from LLM text.
+
+  1. Terms:     contract value, duration, advance / retention / payment cycle
+                and the facility percentages (advance payment guarantee,
+                performance bond, LCs, receivables financing, LD cap) become
+                one row of a column-per-term portfolio (NumPy arrays)
+  2. Schedule:  per contract and month: S-curve progress → certified work,
+                cost outflow, interim payments net of advance recovery and
+                retention (paid `payment_cycle_days` later), the advance up
+                front and the retention released after the defects period
+  3. Metrics:   cumulative cash position, peak deficit and its month,
+                working-capital facility coverage, funding gap, guarantee
+                exposure
+  4. Checks:    covenant-style checks against POLICY, each GREEN / YELLOW /
+                RED; a contract's status is its worst check
+
+Every step is array arithmetic over (contracts × months), done in blocks of
+BLOCK_ROWS contracts, so a whole portfolio costs a few NumPy passes rather
+than a Python loop per contract per month. Terms that were not found are NaN:
+a missing contract value or duration makes the contract "unknown"; a missing
+facility counts as none.
+"""
+
+import math
+import re
+
+import numpy as np
+
+BLOCK_ROWS = 16384
+MAX_MONTHS = 240
+DAYS_PER_MONTH = 30
+
+STATUS_LABELS = ("green", "yellow", "red")
+GREEN, YELLOW, RED, UNKNOWN = 0, 1, 2, -1
+
+# Portfolio columns; percentages are of the contract value
+TERM_COLUMNS = (
+    "contract_value", "duration_months", "advance_payment_pct", "retention_pct", "payment_cycle_days",
+    "apg_pct", "performance_bond_pct", "lc_pct", "receivables_pct", "ld_cap_pct", "cost_ratio",
+)
+
+POLICY = {
+    "cost_ratio": 0.9,                  # contractor's cost as a share of contract value, unless given per contract
+    "payment_cycle_days": 60,           # when the contract does not say
+    "retention_release_months": 12,     # defects liability period after completion
+    "apg_coverage_min": 1.0,            # APG must cover the advance
+    "performance_bond_min_pct": 5.0,
+    "performance_bond_max_pct": 15.0,
+    "retention_max_pct": 10.0,
+    "payment_cycle_warning_days": 60,
+    "payment_cycle_critical_days": 90,
+    "funding_gap_warning_pct": 0.0,     # any gap is at least YELLOW
+    "funding_gap_critical_pct": 5.0,    # gap above this share of contract value is RED
+    "ld_cap_max_pct": 10.0,
+}
+# Bounds for policy overrides; the month / day values size the schedule's horizon
+_CYCLE_DAYS_LIMIT = (0, MAX_MONTHS * DAYS_PER_MONTH)
+POLICY_LIMITS = {
+    "retention_release_months": (0, MAX_MONTHS),
+    "payment_cycle_days": _CYCLE_DAYS_LIMIT,
+    "payment_cycle_warning_days": _CYCLE_DAYS_LIMIT,
+    "payment_cycle_critical_days": _CYCLE_DAYS_LIMIT,
+}
+CHECKS = ("advance_guarantee", "performance_bond", "retention", "payment_cycle", "funding_gap", "ld_cap")
+
+# Facility → clause keywords; the clause's percentage (or amount) is the facility size
+FACILITY_PATTERNS = {
+    "apg_pct": re.compile(r"advance\s+payment\s+(?:bank\s+)?guarantee|\bAPG\b", re.I),
+    "performance_bond_pct": re.compile(r"performance\s+(?:bond|guarantee|security)", re.I),
+    "lc_pct": re.compile(r"letters?\s+of\s+credit|\bL/?Cs?\b", re.I),
+    "receivables_pct": re.compile(r"receivables?\s+financ|assignment\s+of\s+(?:proceeds|receivables)|\bLCR\b", re.I),
+    "ld_cap_pct": re.compile(r"liquidated\s+damages|delay\s+penalt", re.I),
+}
+FACILITY_NAMES = {
+    "apg_pct": "Advance Payment Guarantee",
+    "performance_bond_pct": "Performance Bond",
+    "lc_pct": "Letters of Credit",
+    "receivables_pct": "Receivables Financing",
+}
+_NUMBER = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(million|mn|m\b|billion|bn|thousand|k\b)?', re.I)
+_SCALE = {"million": 1e6, "mn": 1e6, "m": 1e6, "billion": 1e9, "bn": 1e9, "thousand": 1e3, "k": 1e3}
+_DURATION = re.compile(r'(\d+(?:\.\d+)?)\s*(months?|years?|weeks?|days?)', re.I)
+_DURATION_MONTHS = {"month": 1.0, "year": 12.0, "week": 7 / DAYS_PER_MONTH, "day": 1 / DAYS_PER_MONTH}
+
+
+# ── Terms ──────────────────────────────────────────────────
+def parse_amount(text) -> float:
+    """184,500,000 SAR / SAR 1.2 million → float; NaN if there is no number."""
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = _NUMBER.search(text or "")
+    if not match:
+        return math.nan
+    return float(match.group(1).replace(',', '')) * _SCALE.get((match.group(2) or "").lower(), 1.0)
+
+
+def parse_duration_months(text) -> float:
+    """30 Months / 2.5 years / 540 days → months; NaN if there is no duration."""
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = _DURATION.search(text or "")
+    if not match:
+        return math.nan
+    return float(match.group(1)) * _DURATION_MONTHS[match.group(2).lower().rstrip('s')]
+
+
+def terms_from_case(parsed: dict) -> dict:
+    """
+    One portfolio row from a parsed case (TamkeenService.parse_contract /
+    document_ingest.merge_documents: details, obligations, cashflow_terms).
+    """
+    details, cashflow = parsed.get("details", {}), parsed.get("cashflow_terms", {})
+    value = parse_amount(details.get("value"))
+    terms = {column: math.nan for column in TERM_COLUMNS}
+    terms.update({
+        "contract_value": value,
+        "duration_months": parse_duration_months(details.get("duration")),
+        "advance_payment_pct": cashflow.get("advance_payment_pct", math.nan),
+        "retention_pct": cashflow.get("retention_pct", math.nan),
+        "payment_cycle_days": cashflow.get("payment_cycle_days", math.nan),
+    })
+    for obligation in parsed.get("obligations", []):
+        column = next((c for c, pattern in FACILITY_PATTERNS.items() if pattern.search(obligation["text"])), None)
+        if column is None or not math.isnan(terms[column]):
+            continue
+        if "percent" in obligation:
+            terms[column] = obligation["percent"]
+        elif "amount" in obligation and value > 0 and column != "ld_cap_pct":
+            terms[column] = obligation["amount"] / value * 100
+    return terms
+
+
+def portfolio_arrays(terms: list) -> dict:
+    """Column arrays (float64, NaN = not stated) from a list of term dicts; non-numeric terms are a ValueError."""
+    arrays = {}
+    for column in TERM_COLUMNS:
+        try:
+            values = np.array([math.nan if t.get(column) is None else t[column] for t in terms], dtype=float)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f"{column} must be a number") from None
+        if np.isinf(values).any():
+            raise ValueError(f"{column} must be finite")
+        arrays[column] = values
+    return arrays
+
+
+def _policy(overrides) -> dict:
+    """POLICY with `overrides` applied; unknown keys, non-numeric or out-of-range values are a ValueError."""
+    if overrides is None:
+        return POLICY
+    if not isinstance(overrides, dict):
+        raise ValueError("policy must be an object")
+    unknown = sorted(set(overrides) - set(POLICY))
+    if unknown:
+        raise ValueError(f"Unknown policy keys: {', '.join(unknown)}")
+    for key, value in overrides.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError("policy values must be numbers")
+        low, high = POLICY_LIMITS.get(key, (0, math.inf))
+        try:
+            in_range = math.isfinite(value) and low <= value <= high
+        except OverflowError:  # an int too large for a float
+            in_range = False
+        if not in_range:
+            raise ValueError(f"policy {key} must be between {low} and {high}" if math.isfinite(high)
+                             else f"policy {key} must be a finite number >= {low}")
+    return {**POLICY, **overrides}
+
+
+# ── Engine ─────────────────────────────────────────────────
+def _s_curve(progress):
+    """Cumulative share of work done at `progress` ∈ [0, 1] of the duration (smoothstep)."""
+    p = np.clip(progress, 0.0, 1.0)
+    return p * p * (3.0 - 2.0 * p)
+
+
+def _place(rows, months, values, n, horizon):
+    """Sum `values` into an (n × horizon) grid at (rows, months); months past the horizon land in the last column."""
+    flat = rows * horizon + np.minimum(months, horizon - 1)
+    grid = np.bincount(flat.ravel(), weights=values.ravel(), minlength=n * horizon)
+    return grid.astype(np.float64, copy=False).reshape(n, horizon)
+
+
+def schedule(portfolio: dict, policy: dict = None) -> dict:
+    """
+    Monthly (contracts × months) arrays for a block of contracts: work,
+    outflow, inflow, net and cumulative. Rows without a value or duration are zero.
+    """
+    policy = _policy(policy)
+    value = portfolio["contract_value"]
+    n = len(value)
+    valid = (value > 0) & (portfolio["duration_months"] > 0)
+    value = np.where(valid, value, 0.0)
+    duration = np.where(valid, np.minimum(portfolio["duration_months"], MAX_MONTHS), 1.0)
+    advance = np.nan_to_num(portfolio["advance_payment_pct"]) / 100
+    retention = np.nan_to_num(portfolio["retention_pct"]) / 100
+    cost_ratio = np.where(np.isnan(portfolio["cost_ratio"]), policy["cost_ratio"], portfolio["cost_ratio"])
+    cycle_days = np.where(np.isnan(portfolio["payment_cycle_days"]), policy["payment_cycle_days"],
+                          portfolio["payment_cycle_days"])
+    lag = np.ceil(np.clip(cycle_days, 0, MAX_MONTHS * DAYS_PER_MONTH) / DAYS_PER_MONTH).astype(np.int64)
+    completion = np.ceil(duration).astype(np.int64)
+    release_month = completion - 1 + int(policy["retention_release_months"])
+
+    horizon = int(max(completion.max(initial=1) + lag.max(initial=0), release_month.max(initial=0))) + 1
+    months = np.arange(horizon)
+    progress_end = _s_curve((months + 1) / duration[:, None])
+    work = value[:, None] * (progress_end - _s_curve(months / duration[:, None]))
+    outflow = work * cost_ratio[:, None]
+
+    rows = np.arange(n)[:, None]
+    interim = work * (1.0 - advance - retention)[:, None]
+    inflow = _place(rows, months[None, :] + lag[:, None], interim, n, horizon)
+    inflow[:, 0] += advance * value
+    inflow += _place(rows[:, 0], release_month, retention * value, n, horizon)
+
+    net = inflow - outflow
+    return {"months": horizon, "work": work, "outflow": outflow, "inflow": inflow, "net": net,
+            "cumulative": np.cumsum(net, axis=1), "valid": valid}
+
+
+def _grade(warning, critical):
+    return np.where(critical, RED, np.where(warning, YELLOW, GREEN)).astype(np.int8)
+
+
+def _ratio(numerator, denominator):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1.0), np.nan)
+
+
+def evaluate(portfolio: dict, policy: dict = None) -> dict:
+    """
+    Metrics, per-check codes (GREEN / YELLOW / RED, UNKNOWN for invalid rows)
+    and overall status for every contract, as arrays aligned with the portfolio.
+    """
+    policy = _policy(policy)
+    n = len(portfolio["contract_value"])
+    blocks = [_evaluate_block({k: v[i:i + BLOCK_ROWS] for k, v in portfolio.items()}, policy)
+              for i in range(0, n, BLOCK_ROWS)] or [_evaluate_block(portfolio, policy)]
+    return {key: np.concatenate([b[key] for b in blocks]) for key in blocks[0]}
+
+
+def _evaluate_block(portfolio: dict, policy: dict) -> dict:
+    s = schedule(portfolio, policy)
+    value, valid = np.where(s["valid"], portfolio["contract_value"], 0.0), s["valid"]
+    pct = {k: np.nan_to_num(portfolio[k]) for k in ("advance_payment_pct", "apg_pct", "performance_bond_pct",
+                                                    "lc_pct", "receivables_pct")}
+
+    cumulative = s["cumulative"]
+    low = cumulative.min(axis=1)
+    peak_deficit = np.maximum(-low, 0.0)
+    facility_limit = (pct["lc_pct"] + pct["receivables_pct"]) / 100 * value
+    funding_gap = np.maximum(peak_deficit - facility_limit, 0.0)
+    funding_gap_pct = _ratio(funding_gap, value) * 100
+    apg_coverage = _ratio(pct["apg_pct"], pct["advance_payment_pct"])
+    cycle_days = np.where(np.isnan(portfolio["payment_cycle_days"]), policy["payment_cycle_days"],
+                          portfolio["payment_cycle_days"])
+    performance_bond = portfolio["performance_bond_pct"]
+    retention = np.nan_to_num(portfolio["retention_pct"])
+    ld_cap = portfolio["ld_cap_pct"]
+
+    has_advance = pct["advance_payment_pct"] > 0
+    checks = {
+        "advance_guarantee": np.where(
+            has_advance, _grade(np.nan_to_num(apg_coverage) < policy["apg_coverage_min"], pct["apg_pct"] <= 0), GREEN),
+        "performance_bond": _grade(
+            np.isnan(performance_bond) | (performance_bond > policy["performance_bond_max_pct"]),
+            np.nan_to_num(performance_bond, nan=policy["performance_bond_min_pct"]) < policy["performance_bond_min_pct"]),
+        "retention": _grade(retention > policy["retention_max_pct"], False),
+        "payment_cycle": _grade(cycle_days > policy["payment_cycle_warning_days"],
+                                cycle_days > policy["payment_cycle_critical_days"]),
+        "funding_gap": _grade(np.nan_to_num(funding_gap_pct) > policy["funding_gap_warning_pct"],
+                              np.nan_to_num(funding_gap_pct) > policy["funding_gap_critical_pct"]),
+        "ld_cap": _grade(np.isnan(ld_cap) | (ld_cap > policy["ld_cap_max_pct"]), False),
+    }
+    checks = {name: np.where(valid, codes, UNKNOWN).astype(np.int8) for name, codes in checks.items()}
+    status = np.where(valid, np.max(np.stack(list(checks.values())), axis=0), UNKNOWN).astype(np.int8)
+
+    return {
+        "valid": valid,
+        "peak_deficit": peak_deficit,
+        "peak_deficit_month": np.where(low < 0, cumulative.argmin(axis=1), -1),
+        "months_negative": (cumulative < 0).sum(axis=1),
+        "facility_limit": facility_limit,
+        "facility_coverage": _ratio(facility_limit, peak_deficit),
+        "funding_gap": funding_gap,
+        "funding_gap_pct": funding_gap_pct,
+        "apg_coverage": apg_coverage,
+        "guarantee_exposure": (pct["apg_pct"] + pct["performance_bond_pct"] + pct["lc_pct"]) / 100 * value,
+        "final_position": cumulative[:, -1],
+        **{f"check_{name}": codes for name, codes in checks.items()},
+        "status": status,
+    }
+
+
+# ── Single case ────────────────────────────────────────────
+def _json_number(x, digits=2):
+    x = float(x)
+    return None if math.isnan(x) or math.isinf(x) else round(x, digits)
+
+
+def _label(code):
+    return STATUS_LABELS[code] if code >= 0 else "unknown"
+
+
+def case_report(terms: dict, policy: dict = None) -> dict:
+    """JSON-ready metrics, checks, facility table and monthly schedule for one contract."""
+    policy = _policy(policy)
+    portfolio = portfolio_arrays([terms])
+    row = {k: v[0] for k, v in portfolio.items()}
+    result = {k: v[0] for k, v in evaluate(portfolio, policy).items()}
+
+    values = {
+        "advance_guarantee": result["apg_coverage"], "performance_bond": row["performance_bond_pct"],
+        "retention": row["retention_pct"], "payment_cycle": row["payment_cycle_days"],
+        "funding_gap": result["funding_gap_pct"], "ld_cap": row["ld_cap_pct"],
+    }
+    limits = {
+        "advance_guarantee": policy["apg_coverage_min"], "performance_bond": policy["performance_bond_min_pct"],
+        "retention": policy["retention_max_pct"], "payment_cycle": policy["payment_cycle_critical_days"],
+        "funding_gap": policy["funding_gap_critical_pct"], "ld_cap": policy["ld_cap_max_pct"],
+    }
+    report = {
+        "status": _label(result["status"]),
+        "terms": {k: _json_number(v) for k, v in row.items()},
+        "metrics": {
+            **{k: _json_number(result[k]) for k in (
+                "peak_deficit", "facility_limit", "facility_coverage", "funding_gap", "funding_gap_pct",
+                "apg_coverage", "guarantee_exposure", "final_position")},
+            "peak_deficit_month": int(result["peak_deficit_month"]) if result["peak_deficit_month"] >= 0 else None,
+            "months_negative": int(result["months_negative"]),
+        },
+        "checks": [{"check": name, "status": _label(result[f"check_{name}"]), "value": _json_number(values[name]),
+                    "threshold": limits[name]} for name in CHECKS],
+        "facilities": [{"facility": label, "percent": _json_number(row[column]),
+                        "amount": _json_number(row[column] / 100 * row["contract_value"])}
+                       for column, label in FACILITY_NAMES.items()],
+        "schedule": None,
+    }
+    if result["valid"]:
+        s = schedule(portfolio, policy)
+        report["schedule"] = {k: np.round(s[k][0], 2).tolist() for k in ("inflow", "outflow", "cumulative")}
+    return report
+
+
+def portfolio_report(terms: list, policy: dict = None) -> dict:
+    """Status, check labels and headline metrics per contract, plus status counts, for a list of term dicts."""
+    result = evaluate(portfolio_arrays(terms), policy)
+    labels = np.array(("unknown",) + STATUS_LABELS)  # code + 1 → label
+    columns = {
+        "status": labels[result["status"] + 1].tolist(),
+        **{k: [_json_number(x) for x in result[k]] for k in ("peak_deficit", "funding_gap", "funding_gap_pct",
+                                                              "facility_coverage", "apg_coverage")},
+        "checks": [dict(zip(CHECKS, row)) for row in
+                   zip(*(labels[result[f"check_{name}"] + 1].tolist() for name in CHECKS))],
+    }
+    contracts = [dict(zip(columns, row)) for row in zip(*columns.values())]
+    return {
+        "contracts": contracts,
+        "summary": {"contracts": len(contracts),
+                    **{label: int((result["status"] == code).sum())
+                       for code, label in enumerate(STATUS_LABELS)},
+                    "unknown": int((result["status"] == UNKNOWN).sum())},
+    }
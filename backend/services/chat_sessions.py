@@ -0,0 +1,134 @@
+"""
+chat_sessions.py — Server-Side Chat Sessions
+─────────────────────────────────────────────
+Conversation state for RafeeQ, keyed by session id, so a client sends only
+its new message instead of the whole history on every turn.
+
+  - Bounded history:  at most `max_turns` messages are kept verbatim; past
+                      that, the oldest are folded into a running summary and
+                      only the last `keep_turns` stay
+  - Summarisation:    pluggable `summarizer(previous_summary, turns) -> str`;
+                      the default is extractive (first sentence per turn), so
+                      no LLM call sits on the request path
+  - Bounded store:    LRU over `max_sessions`, idle sessions expire after
+                      `ttl_seconds`
+
+Sessions live in this process's memory: run one server process per store, or
+pin clients to a process, when scaling out.
+"""
+
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+MAX_SESSION_ID_LENGTH = 128
+_SENTENCE_END = re.compile(r'(?<=[.!?؟])\s')
+
+
+def extractive_summary(previous: str, turns: list, max_chars: int = 2000, turn_chars: int = 160) -> str:
+    """Append the first sentence of each folded turn; the oldest lines drop off past `max_chars`."""
+    lines = [previous] if previous else []
+    for turn in turns:
+        first = " ".join(_SENTENCE_END.split(turn["content"].strip(), maxsplit=1)[0].split())
+        if len(first) > turn_chars:
+            first = first[:turn_chars - 1].rstrip() + "…"
+        lines.append(f"{'User' if turn['role'] == 'user' else 'Assistant'}: {first}")
+    summary = "\n".join(lines)
+    if len(summary) > max_chars:
+        summary = summary[-max_chars:].split("\n", 1)[-1]
+    return summary
+
+
+class ChatSession:
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.summary = ""
+        self.turns = []
+        self.summarized_turns = 0
+        self.created_at = self.updated_at = time.time()
+        self.lock = threading.Lock()
+
+    def to_dict(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "summary": self.summary,
+            "turns": list(self.turns),
+            "summarized_turns": self.summarized_turns,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class ChatSessionStore:
+    def __init__(self, max_sessions: int = 1000, max_turns: int = 12, keep_turns: int = 6,
+                 max_turn_chars: int = 4000, ttl_seconds: float = 3600, summarizer=None):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.keep_turns = min(keep_turns, max_turns)
+        self.max_turn_chars = max_turn_chars
+        self.ttl_seconds = ttl_seconds
+        self.summarizer = summarizer or extractive_summary
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"created": 0, "expired": 0, "evicted": 0, "summarized_turns": 0}
+
+    def get(self, session_id: str = None, create: bool = True):
+        """
+        The session for `session_id` (created if unknown, with a generated id
+        if None); None if unknown and not `create`. Invalid ids are a ValueError.
+        """
+        if create and session_id is not None and (not isinstance(session_id, str)
+                                                  or len(session_id) > MAX_SESSION_ID_LENGTH):
+            raise ValueError(f"session_id must be a string of at most {MAX_SESSION_ID_LENGTH} characters")
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                return session
+            if not create:
+                return None
+            session = ChatSession(session_id or uuid.uuid4().hex)
+            self._sessions[session.session_id] = session
+            self.counters["created"] += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.counters["evicted"] += 1
+            return session
+
+    def _expire(self, now):
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.updated_at < self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self.counters["expired"] += 1
+
+    def history(self, session: ChatSession):
+        """(summary, turns) to put in front of the next message."""
+        with session.lock:
+            return session.summary, list(session.turns)
+
+    def append(self, session: ChatSession, *turns):
+        """Record {"role", "content"} turns; folds the oldest into the summary past max_turns."""
+        with session.lock:
+            for turn in turns:
+                session.turns.append({"role": turn["role"], "content": turn["content"][:self.max_turn_chars]})
+            if len(session.turns) > self.max_turns:
+                cut = len(session.turns) - self.keep_turns
+                folded, session.turns = session.turns[:cut], session.turns[cut:]
+                session.summary = self.summarizer(session.summary, folded)
+                session.summarized_turns += len(folded)
+                self.counters["summarized_turns"] += len(folded)
+            session.updated_at = time.time()
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> dict:
+        return {**self.counters, "sessions": len(self._sessions), "max_sessions": self.max_sessions,
+                "max_turns": self.max_turns, "keep_turns": self.keep_turns, "ttl_seconds": self.ttl_seconds}
@@ -0,0 +1,165 @@
+"""
+coalescer.py — Micro-Batching Request Coalescer
+────────────────────────────────────────────────
+Flask runs with threaded=True, so concurrent /api/predict calls each score a
+one-row DataFrame. The coalescer parks those calls for a short window (or
+until enough rows arrive), scores them as one batch, and hands every caller
+its own slice of the results.
+
+Usage:
+  coalescer = PredictionCoalescer(score_batch, window_ms=2.0, max_batch=64)
+  results = coalescer.submit([record, ...], key=model)   # blocks until scored
+
+Requests with different keys (e.g. the model a caller captured before a
+hot-swap) share a window but are never scored together.
+"""
+
+import queue
+import threading
+import time
+
+# Upper bounds for the batch-size and queue-wait histograms
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+QUEUE_WAIT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50)
+
+
+class _Pending:
+    __slots__ = ('records', 'key', 'enqueued', 'done', 'result', 'error')
+
+    def __init__(self, records, key):
+        self.records = records
+        self.key = key
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _empty_histogram(bounds):
+    return dict.fromkeys([str(b) for b in bounds] + [f">{bounds[-1]}"], 0)
+
+
+def _bucket(value, bounds):
+    for bound in bounds:
+        if value <= bound:
+            return str(bound)
+    return f">{bounds[-1]}"
+
+
+class PredictionCoalescer:
+    def __init__(self, score_batch, window_ms: float = 2.0, max_batch: int = 64):
+        """
+        `score_batch(records, key)` takes a list of feature dicts and the
+        (hashable) key they were submitted with, and returns one result per
+        record, in order.
+        """
+        self.score_batch = score_batch
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._size_hist = _empty_histogram(BATCH_SIZE_BUCKETS)
+        self._wait_hist = _empty_histogram(QUEUE_WAIT_BUCKETS_MS)
+
+        self._thread = threading.Thread(target=self._run, name='miqyas-coalescer', daemon=True)
+        self._thread.start()
+
+    def submit(self, records: list, key=None) -> list:
+        """Queue records for the next batch with this key and wait for their results."""
+        pending = _Pending(records, key)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch, rows = [first], len(first.records)
+            deadline = first.enqueued + self.window
+            stop = False
+            while rows < self.max_batch:
+                # Past the window, still drain whatever is already queued
+                timeout = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                rows += len(item.records)
+
+            self._dispatch(batch, rows)
+            if stop:
+                return
+
+    def _dispatch(self, batch, rows):
+        started = time.perf_counter()
+        self._record(batch, rows, started)
+
+        groups = {}
+        for pending in batch:
+            groups.setdefault(pending.key, []).append(pending)
+        for key, group in groups.items():
+            self._score_group(key, group)
+
+        for pending in batch:
+            pending.done.set()
+
+    def _score_group(self, key, group):
+        try:
+            results = self.score_batch([r for p in group for r in p.records], key)
+            offset = 0
+            for pending in group:
+                pending.result = results[offset:offset + len(pending.records)]
+                offset += len(pending.records)
+        except Exception:
+            # One malformed request must not fail its neighbours: score each
+            # caller on its own so the error lands only where it belongs.
+            for pending in group:
+                try:
+                    pending.result = self.score_batch(pending.records, key)
+                except Exception as e:
+                    pending.error = e
+
+    def _record(self, batch, rows, started):
+        with self._lock:
+            self._batches += 1
+            self._rows += rows
+            self._size_hist[_bucket(rows, BATCH_SIZE_BUCKETS)] += 1
+            for pending in batch:
+                wait = started - pending.enqueued
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+                self._wait_hist[_bucket(wait * 1000, QUEUE_WAIT_BUCKETS_MS)] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = sum(self._wait_hist.values())
+            return {
+                "window_ms": self.window * 1000,
+                "max_batch": self.max_batch,
+                "batches": self._batches,
+                "rows": self._rows,
+                "requests": requests,
+                "avg_batch_rows": self._rows / self._batches if self._batches else 0.0,
+                "batch_size_histogram": dict(self._size_hist),
+                "avg_queue_wait_ms": self._wait_total * 1000 / requests if requests else 0.0,
+                "max_queue_wait_ms": self._wait_max * 1000,
+                "queue_wait_histogram_ms": dict(self._wait_hist),
+            }
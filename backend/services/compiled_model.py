@@ -0,0 +1,278 @@
+"""
+compiled_model.py — Array-Backed Miqyas Inference Engine
+─────────────────────────────────────────────────────────
+Flattens the fitted loan_risk_model pipeline
+  ColumnTransformer → (median imputer + scaler | 'missing' imputer + one-hot)
+  → RandomForestClassifier
+into plain NumPy arrays, and evaluates them without any sklearn machinery.
+
+Export (done by train_ml_model.py, or by hand for an existing model):
+  python -m services.compiled_model models/
+
+Two on-disk formats:
+  - loan_risk_model.compiled/      one .npy per array; loaded with mmap_mode='r'
+                                   so every worker process on a host shares a
+                                   single physical copy through the page cache
+  - loan_risk_model.compiled.npz   single file, read fully into each process
+
+The evaluator exposes `classes_` and `predict_proba(df)`, so RiskModelService
+can use it in place of the sklearn pipeline for every batch size. Large frames
+are walked PREDICT_CHUNK_ROWS rows at a time, which bounds the per-(row, tree)
+working arrays without loading a private copy of the pipeline.
+"""
+
+import json
+import os
+import shutil
+import sys
+import numpy as np
+
+COMPILED_BUNDLE_DIR = 'loan_risk_model.compiled'
+COMPILED_MODEL_FILE = 'loan_risk_model.compiled.npz'
+BUNDLE_MANIFEST = 'manifest.json'
+PREDICT_CHUNK_ROWS = 2048
+
+
+# ── Export ────────────────────────────────────────────────
+def _unpack_pipeline(pipeline, features_info):
+    """Pull the fitted stages out of the pipeline, refusing anything we can't flatten."""
+    preprocessor = pipeline.named_steps['preprocessor']
+    forest = pipeline.named_steps['classifier']
+
+    transformers = {name: (steps, cols) for name, steps, cols in preprocessor.transformers_
+                    if name != 'remainder'}
+    if set(transformers) != {'num', 'cat'} or preprocessor.remainder != 'drop':
+        raise ValueError("Unsupported pipeline: expected 'num' and 'cat' transformers only")
+
+    num_steps, num_cols = transformers['num']
+    cat_steps, cat_cols = transformers['cat']
+    if list(num_cols) != list(features_info['numeric_features']) or \
+            list(cat_cols) != list(features_info['categorical_features']):
+        raise ValueError("Unsupported pipeline: column order differs from features_info")
+
+    imputer, scaler = num_steps.named_steps['imputer'], num_steps.named_steps['scaler']
+    cat_imputer, onehot = cat_steps.named_steps['imputer'], cat_steps.named_steps['onehot']
+    if onehot.drop is not None or getattr(onehot, 'infrequent_categories_', None):
+        raise ValueError("Unsupported pipeline: one-hot drop / infrequent categories")
+
+    return imputer, scaler, cat_imputer, onehot, forest
+
+
+def _flatten_forest(forest):
+    """Concatenate every tree's node arrays, rebasing child indices to global offsets."""
+    features, thresholds, children, leaves, values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+
+        # Older sklearn stores class counts, newer stores fractions; normalise both.
+        value = tree.value[:, 0, :].astype(np.float64)
+        totals = value.sum(axis=1, keepdims=True)
+        value /= np.where(totals == 0, 1.0, totals)
+
+        roots.append(offset)
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+        # Row k holds (right, left) so that the next node is children[k, x <= threshold]
+        children.append(np.where(is_leaf[:, None], -1,
+                                 np.stack([tree.children_right, tree.children_left], axis=1) + offset))
+        leaves.append(is_leaf)
+        values.append(value)
+        offset += tree.node_count
+
+    return {
+        'node_feature': np.concatenate(features).astype(np.int32),
+        'node_threshold': np.concatenate(thresholds).astype(np.float64),
+        'node_children': np.concatenate(children).astype(np.int32),
+        'node_is_leaf': np.concatenate(leaves),
+        'node_value': np.concatenate(values),
+        'roots': np.asarray(roots, dtype=np.int64),
+    }
+
+
+def flatten_pipeline(pipeline, features_info) -> dict:
+    """Return the fitted pipeline as a dict of NumPy arrays."""
+    imputer, scaler, cat_imputer, onehot, forest = _unpack_pipeline(pipeline, features_info)
+    n_num = len(features_info['numeric_features'])
+
+    mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_num)
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_num)
+
+    # Category → output column lookup. Columns after the numeric block follow
+    # the encoder's categories_ order, feature by feature.
+    cat_feature, cat_value, cat_column = [], [], []
+    column = n_num
+    for j, categories in enumerate(onehot.categories_):
+        for category in categories:
+            if not isinstance(category, str):
+                raise ValueError(f"Unsupported pipeline: non-string category {category!r}")
+            cat_feature.append(j)
+            cat_value.append(category)
+            cat_column.append(column)
+            column += 1
+
+    return {
+        'numeric_features': np.asarray(features_info['numeric_features'], dtype=str),
+        'categorical_features': np.asarray(features_info['categorical_features'], dtype=str),
+        'num_fill': np.asarray(imputer.statistics_, dtype=np.float64),
+        'num_mean': np.asarray(mean, dtype=np.float64),
+        'num_scale': np.asarray(scale, dtype=np.float64),
+        'cat_missing': np.asarray(str(cat_imputer.fill_value)),
+        'cat_feature': np.asarray(cat_feature, dtype=np.int32),
+        'cat_value': np.asarray(cat_value, dtype=str),
+        'cat_column': np.asarray(cat_column, dtype=np.int32),
+        'n_outputs': np.asarray(column, dtype=np.int64),
+        'classes': np.asarray([str(c) for c in forest.classes_], dtype=str),
+        **_flatten_forest(forest),
+    }
+
+
+def export_compiled_model(pipeline, features_info, path: str) -> str:
+    """
+    Write the flattened pipeline next to the joblib model: a .npz file if
+    `path` ends in .npz, otherwise a memory-mappable .npy bundle directory.
+    """
+    arrays = flatten_pipeline(pipeline, features_info)
+    if path.endswith('.npz'):
+        np.savez(path, **arrays)
+        return path
+
+    # Build the bundle beside the target and swap it in, so a worker starting
+    # mid-export never maps a half-written directory.
+    staging = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for name, array in arrays.items():
+        np.save(os.path.join(staging, f"{name}.npy"), array)
+    with open(os.path.join(staging, BUNDLE_MANIFEST), 'w') as f:
+        json.dump({'format': 1, 'arrays': sorted(arrays)}, f)
+
+    retired = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.rename(path, retired)
+    os.rename(staging, path)
+    shutil.rmtree(retired, ignore_errors=True)
+    return path
+
+
+def compiled_model_path(model_dir: str):
+    """The compiled export to load from model_dir (bundle preferred), or None."""
+    for name in (COMPILED_BUNDLE_DIR, COMPILED_MODEL_FILE):
+        path = os.path.join(model_dir, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def compiled_model_mtime(path: str) -> float:
+    # A bundle is complete once its manifest is written
+    if os.path.isdir(path):
+        return os.path.getmtime(os.path.join(path, BUNDLE_MANIFEST))
+    return os.path.getmtime(path)
+
+
+# ── Evaluation ────────────────────────────────────────────
+class CompiledRiskModel:
+    """Drop-in replacement for the sklearn pipeline's predict_proba."""
+
+    def __init__(self, arrays):
+        self.numeric_features = [str(f) for f in arrays['numeric_features']]
+        self.categorical_features = [str(f) for f in arrays['categorical_features']]
+        self.classes_ = np.asarray(arrays['classes'])
+
+        self.num_fill = np.asarray(arrays['num_fill'])
+        self.num_mean = np.asarray(arrays['num_mean'])
+        self.num_scale = np.asarray(arrays['num_scale'])
+        self.n_outputs = int(arrays['n_outputs'])
+
+        self.cat_missing = str(arrays['cat_missing'])
+        self.cat_lookup = [{} for _ in self.categorical_features]
+        for j, value, column in zip(arrays['cat_feature'].tolist(), arrays['cat_value'].tolist(),
+                                    arrays['cat_column'].tolist()):
+            self.cat_lookup[j][value] = column
+
+        self.node_feature = arrays['node_feature']
+        self.node_threshold = arrays['node_threshold']
+        self.node_children = arrays['node_children'].reshape(-1)
+        # Exports written before node_is_leaf was stored mark leaves by their children alone
+        leaves = arrays.get('node_is_leaf')
+        self.node_is_leaf = leaves if leaves is not None else arrays['node_children'].reshape(-1, 2)[:, 1] == -1
+        self.node_value = arrays['node_value']
+        self.roots = arrays['roots']
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True):
+        """Load a .npz export, or map a bundle directory read-only (mmap=False copies it)."""
+        if os.path.isdir(path):
+            with open(os.path.join(path, BUNDLE_MANIFEST)) as f:
+                names = json.load(f)['arrays']
+            mode = 'r' if mmap else None
+            return cls({name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode, allow_pickle=False)
+                        for name in names})
+
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls({key: arrays[key] for key in arrays.files})
+
+    def transform(self, df):
+        """Impute, scale and one-hot encode a DataFrame aligned to features_info."""
+        n_rows = len(df)
+        out = np.zeros((n_rows, self.n_outputs), dtype=np.float64)
+
+        if self.numeric_features:
+            x = df[self.numeric_features].to_numpy(dtype=np.float64, na_value=np.nan)
+            x = np.where(np.isnan(x), self.num_fill, x)
+            out[:, :len(self.numeric_features)] = (x - self.num_mean) / self.num_scale
+
+        # Like the pipeline, only NaN counts as missing; None and unseen values
+        # are unknown categories and encode as all zeros.
+        for j, name in enumerate(self.categorical_features):
+            lookup, missing = self.cat_lookup[j], self.cat_lookup[j].get(self.cat_missing, -1)
+            columns = np.fromiter(
+                (missing if v != v else lookup.get(v, -1) for v in df[name].tolist()),
+                dtype=np.int64, count=n_rows,
+            )
+            hit = columns >= 0
+            out[np.flatnonzero(hit), columns[hit]] = 1.0
+
+        return out
+
+    def predict_proba(self, df):
+        if len(df) <= PREDICT_CHUNK_ROWS:
+            return self._predict_chunk(df)
+        return np.concatenate([self._predict_chunk(df.iloc[start:start + PREDICT_CHUNK_ROWS])
+                               for start in range(0, len(df), PREDICT_CHUNK_ROWS)])
+
+    def _predict_chunk(self, df):
+        # The forest compares float32 features against float64 thresholds.
+        x = self.transform(df).astype(np.float32)
+        n_rows, n_cols = x.shape
+        n_trees = self.roots.shape[0]
+        x = x.reshape(-1)
+
+        leaves = np.empty(n_rows * n_trees, dtype=np.int64)
+        pending = np.arange(n_rows * n_trees)
+        nodes = np.tile(self.roots, n_rows)
+        offsets = np.repeat(np.arange(n_rows) * n_cols, n_trees)
+
+        # Walk every (row, tree) pair down one level per pass, retiring pairs
+        # as soon as they land on a leaf.
+        while pending.size:
+            done = self.node_is_leaf[nodes]
+            if done.any():
+                leaves[pending[done]] = nodes[done]
+                keep = ~done
+                pending, nodes, offsets = pending[keep], nodes[keep], offsets[keep]
+            go_left = x[offsets + self.node_feature[nodes]] <= self.node_threshold[nodes]
+            nodes = self.node_children[2 * nodes + go_left]
+
+        return self.node_value[leaves].reshape(n_rows, n_trees, -1).mean(axis=1)
+
+if __name__ == '__main__':
+    import joblib
+
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else 'models'
+    pipeline = joblib.load(os.path.join(model_dir, 'loan_risk_model.joblib'))
+    features_info = joblib.load(os.path.join(model_dir, 'features_info.joblib'))
+    out = export_compiled_model(pipeline, features_info, os.path.join(model_dir, COMPILED_BUNDLE_DIR))
+    print(f"Compiled model saved to {out}")
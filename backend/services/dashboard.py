@@ -1,23 +1,350 @@
 """
 dashboard.py — Dashboard Stats Service
 ────────────────────────────────────────
-Returns summary statistics for the main dashboard.
-Replace placeholder values with real DB queries.
+Summary statistics and the cases table for the main dashboard, backed by a
+local SQLite file.
+
+  - cases       one row per case, upserted from every /api/predict decision
+  - events      append-only log of service calls (predict, deep-analyze, ...)
+  - kpis / risk_counts / rm_counts
+                aggregates kept current by triggers on `cases`, so
+                get_stats() reads a handful of rows instead of the history
+
+Writes go through a background writer that commits in batches, so recording
+never adds a disk sync to the request path. The writer's queue is bounded:
+when the disk falls behind, new writes are dropped and counted rather than
+queued without limit. Case pages use keyset pagination over indexed columns.
 """
 
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from services.risk_labels import APPROVED_LABEL
+
+# Risk bands over the model's risk score, 1 - P(Approved)
+RISK_BANDS = ((0.67, 'High'), (0.34, 'Medium'), (0.0, 'Low'))
+WRITE_BATCH = 1000
+WRITE_QUEUE_MAX = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cases (
+    id TEXT PRIMARY KEY,
+    client TEXT,
+    industry TEXT,
+    rm TEXT,
+    risk TEXT,
+    risk_score REAL,
+    decision TEXT,
+    confidence REAL,
+    ews REAL,
+    status TEXT NOT NULL DEFAULT 'New',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cases_updated ON cases (updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_cases_risk ON cases (risk, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_cases_rm ON cases (rm, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_cases_status ON cases (status, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_cases_industry ON cases (industry, updated_at, id);
+
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    service TEXT,
+    event TEXT,
+    case_id TEXT,
+    status_code INTEGER,
+    duration_ms REAL
+);
+
+CREATE TABLE IF NOT EXISTS kpis (name TEXT PRIMARY KEY, value REAL NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS risk_counts (risk TEXT PRIMARY KEY, n INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS rm_counts (rm TEXT PRIMARY KEY, n INTEGER NOT NULL);
+
+CREATE TRIGGER IF NOT EXISTS cases_ai AFTER INSERT ON cases BEGIN
+    UPDATE kpis SET value = value + 1 WHERE name = 'total_cases';
+    UPDATE kpis SET value = value + COALESCE(NEW.ews, 0) WHERE name = 'ews_sum';
+    UPDATE kpis SET value = value + (NEW.ews IS NOT NULL) WHERE name = 'ews_count';
+    INSERT INTO risk_counts (risk, n) SELECT NEW.risk, 1 WHERE NEW.risk IS NOT NULL
+        ON CONFLICT (risk) DO UPDATE SET n = n + 1;
+    INSERT INTO rm_counts (rm, n) SELECT NEW.rm, 1 WHERE NEW.rm IS NOT NULL
+        ON CONFLICT (rm) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cases_ad AFTER DELETE ON cases BEGIN
+    UPDATE kpis SET value = value - 1 WHERE name = 'total_cases';
+    UPDATE kpis SET value = value - COALESCE(OLD.ews, 0) WHERE name = 'ews_sum';
+    UPDATE kpis SET value = value - (OLD.ews IS NOT NULL) WHERE name = 'ews_count';
+    UPDATE risk_counts SET n = n - 1 WHERE risk = OLD.risk;
+    UPDATE rm_counts SET n = n - 1 WHERE rm = OLD.rm;
+    DELETE FROM rm_counts WHERE rm = OLD.rm AND n <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cases_au AFTER UPDATE OF risk, rm, ews ON cases BEGIN
+    UPDATE kpis SET value = value - COALESCE(OLD.ews, 0) + COALESCE(NEW.ews, 0) WHERE name = 'ews_sum';
+    UPDATE kpis SET value = value - (OLD.ews IS NOT NULL) + (NEW.ews IS NOT NULL) WHERE name = 'ews_count';
+    UPDATE risk_counts SET n = n - 1 WHERE risk = OLD.risk;
+    INSERT INTO risk_counts (risk, n) SELECT NEW.risk, 1 WHERE NEW.risk IS NOT NULL
+        ON CONFLICT (risk) DO UPDATE SET n = n + 1;
+    UPDATE rm_counts SET n = n - 1 WHERE rm = OLD.rm;
+    INSERT INTO rm_counts (rm, n) SELECT NEW.rm, 1 WHERE NEW.rm IS NOT NULL
+        ON CONFLICT (rm) DO UPDATE SET n = n + 1;
+    DELETE FROM rm_counts WHERE rm = OLD.rm AND n <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS rm_counts_ai AFTER INSERT ON rm_counts BEGIN
+    UPDATE kpis SET value = value + 1 WHERE name = 'active_rms';
+END;
+
+CREATE TRIGGER IF NOT EXISTS rm_counts_ad AFTER DELETE ON rm_counts BEGIN
+    UPDATE kpis SET value = value - 1 WHERE name = 'active_rms';
+END;
+"""
+
+KPI_NAMES = ('total_cases', 'active_rms', 'ews_sum', 'ews_count')
+
+UPSERT_CASE = """
+INSERT INTO cases (id, client, industry, rm, risk, risk_score, decision, confidence, ews, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    client = COALESCE(excluded.client, client),
+    industry = COALESCE(excluded.industry, industry),
+    rm = COALESCE(excluded.rm, rm),
+    risk = excluded.risk,
+    risk_score = excluded.risk_score,
+    decision = excluded.decision,
+    confidence = excluded.confidence,
+    ews = COALESCE(excluded.ews, ews),
+    updated_at = excluded.updated_at
+"""
+
+INSERT_EVENT = """
+INSERT INTO events (created_at, service, event, case_id, status_code, duration_ms) VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+CASE_FILTERS = ('risk', 'rm', 'status', 'industry')
+CASE_COLUMNS = ('id', 'client', 'industry', 'rm', 'risk', 'risk_score', 'decision', 'confidence', 'ews',
+                'status', 'created_at', 'updated_at')
+
+
+def risk_band(risk_score: float) -> str:
+    return next(band for floor, band in RISK_BANDS if risk_score >= floor)
+
+
+def _invalid_case_field(fields):
+    """Message for the first field update_case cannot store, or None."""
+    for name, value in fields.items():
+        if name == 'status':
+            if not isinstance(value, str) or not value.strip():
+                return "status must be a non-empty string"
+        elif name == 'ews':
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                      or not math.isfinite(value)):
+                return "ews must be a finite number or null"
+        elif value is not None and not isinstance(value, str):
+            return f"{name} must be a string or null"
+    return None
+
+
 class DashboardService:
-    def __init__(self):
-        pass
-        # TODO: initialize your database connection here
+    def __init__(self, db_path: str = 'data/dashboard.sqlite'):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        missing = [(name,) for name in KPI_NAMES
+                   if not self._db.execute("SELECT 1 FROM kpis WHERE name = ?", (name,)).fetchone()]
+        if missing:
+            self._db.executemany("INSERT INTO kpis (name, value) VALUES (?, 0)", missing)
+            self._db.commit()
+            self.rebuild_aggregates()
+
+        self._queue = queue.Queue(maxsize=WRITE_QUEUE_MAX)
+        self.dropped_writes = 0
+        self._drop_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._write_loop, name='dashboard-writer', daemon=True)
+        self._writer.start()
+
+    # ── Recording ──────────────────────────────────────────
+    def record_predictions(self, records, results):
+        """Upsert one case per scored application; ids come from case_id / customer_id or are generated."""
+        scored = (
+            (record, result["decision"], result.get("confidence"),
+             1.0 - result.get("all_probabilities", {}).get(APPROVED_LABEL, 0.0))
+            for record, result in zip(records, results)
+            if not str(result.get("decision", "")).startswith("Error")
+        )
+        self._upsert_cases(scored)
+
+    def record_scores(self, records, labels, probabilities):
+        """record_predictions for the dense (labels, probability matrix) form of the results."""
+        best = probabilities.argmax(axis=1)
+        confidences = probabilities[np.arange(len(best)), best]
+        if APPROVED_LABEL in labels:
+            approved = probabilities[:, labels.index(APPROVED_LABEL)]
+        else:
+            approved = np.zeros(len(best))
+        self._upsert_cases(zip(records, (labels[k] for k in best.tolist()), confidences.tolist(),
+                               (1.0 - approved).tolist()))
+
+    def _upsert_cases(self, scored):
+        now = time.time()
+        rows = []
+        for record, decision, confidence, risk_score in scored:
+            case_id = record.get("case_id") or record.get("customer_id") or uuid.uuid4().hex[:12]
+            rows.append((
+                str(case_id), record.get("client"), record.get("industry"), record.get("rm"),
+                risk_band(risk_score), risk_score, decision, confidence,
+                record.get("ews"), now, now,
+            ))
+        if rows:
+            self._enqueue(UPSERT_CASE, rows)
+
+    def record_event(self, service: str, event: str, case_id: str = None, status_code: int = None,
+                     duration_ms: float = None):
+        self._enqueue(INSERT_EVENT, [(time.time(), service, event, case_id, status_code, duration_ms)])
+
+    def _enqueue(self, sql, rows):
+        try:
+            self._queue.put_nowait((sql, rows))
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped_writes += 1
+                dropped = self.dropped_writes
+            if dropped % WRITE_QUEUE_MAX == 1:
+                print(f"[Dashboard] Write queue full; dropped {dropped} write(s) so far")
 
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            with self._lock:
+                try:
+                    for sql, rows in batch:
+                        self._db.executemany(sql, rows)
+                    self._db.commit()
+                except Exception as e:
+                    self._db.rollback()
+                    print(f"[Dashboard] Dropped {len(batch)} write(s): {e}")
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued write is committed."""
+        self._queue.join()
+
+    def rebuild_aggregates(self):
+        """Recompute the aggregate tables from `cases` (e.g. after restoring a backup)."""
+        with self._lock:
+            db = self._db
+            db.execute("DELETE FROM risk_counts")
+            db.execute("DELETE FROM rm_counts")
+            db.execute("INSERT INTO risk_counts SELECT risk, COUNT(*) FROM cases WHERE risk IS NOT NULL GROUP BY risk")
+            db.execute("INSERT INTO rm_counts SELECT rm, COUNT(*) FROM cases WHERE rm IS NOT NULL GROUP BY rm")
+            total, ews_sum, ews_count = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(ews), 0), COUNT(ews) FROM cases").fetchone()
+            active = db.execute("SELECT COUNT(*) FROM rm_counts").fetchone()[0]
+            db.executemany("UPDATE kpis SET value = ? WHERE name = ?", [
+                (total, 'total_cases'), (active, 'active_rms'), (ews_sum, 'ews_sum'), (ews_count, 'ews_count'),
+            ])
+            db.commit()
+
+    # ── Queries ────────────────────────────────────────────
     def get_stats(self) -> dict:
         """
         Return dashboard KPI statistics.
         """
-        # TODO: replace with real queries
+        with self._lock:
+            kpis = dict(self._db.execute("SELECT name, value FROM kpis").fetchall())
+            risk_distribution = dict(self._db.execute("SELECT risk, n FROM risk_counts WHERE n > 0").fetchall())
+            recent = self._db.execute(
+                f"SELECT {', '.join(CASE_COLUMNS)} FROM cases ORDER BY updated_at DESC, id DESC LIMIT 5"
+            ).fetchall()
+            events = self._db.execute(
+                "SELECT created_at, service, event, case_id, status_code, duration_ms "
+                "FROM events ORDER BY id DESC LIMIT 10"
+            ).fetchall()
         return {
-            "total_cases": 0,
-            "active_rms": 0,
-            "high_risk_count": 0,
-            "recent_activity": [],
+            "total_cases": int(kpis.get('total_cases', 0)),
+            "active_rms": int(kpis.get('active_rms', 0)),
+            "high_risk_count": risk_distribution.get('High', 0),
+            "avg_ews": round(kpis['ews_sum'] / kpis['ews_count'], 2) if kpis.get('ews_count') else None,
+            "risk_distribution": risk_distribution,
+            "recent_activity": [dict(zip(CASE_COLUMNS, row)) for row in recent],
+            "recent_events": [
+                dict(zip(('created_at', 'service', 'event', 'case_id', 'status_code', 'duration_ms'), row))
+                for row in events
+            ],
         }
+
+    def list_cases(self, limit: int = 50, cursor: str = None, **filters) -> dict:
+        """
+        One page of cases, most recently updated first. Filter by any of
+        risk / rm / status / industry; pass back `next_cursor` for the next page.
+        """
+        where, params = [], []
+        for name in CASE_FILTERS:
+            if filters.get(name):
+                where.append(f"{name} = ?")
+                params.append(filters[name])
+        if cursor:
+            updated_at, _, case_id = cursor.partition('|')
+            where.append("(updated_at, id) < (?, ?)")
+            params += [float(updated_at), case_id]
+
+        limit = max(1, min(int(limit), 500))
+        sql = f"SELECT {', '.join(CASE_COLUMNS)} FROM cases"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY updated_at DESC, id DESC LIMIT ?"
+
+        active = {name for name in CASE_FILTERS if filters.get(name)}
+        with self._lock:
+            rows = self._db.execute(sql, params + [limit + 1]).fetchall()
+            # Totals come from the aggregates when they can (no filter, or risk / rm only)
+            total = None
+            if not active:
+                total = int(self._db.execute("SELECT value FROM kpis WHERE name = 'total_cases'").fetchone()[0])
+            elif active in ({'risk'}, {'rm'}):
+                (name,) = active
+                row = self._db.execute(f"SELECT n FROM {name}_counts WHERE {name} = ?", (filters[name],)).fetchone()
+                total = row[0] if row else 0
+
+        cases = [dict(zip(CASE_COLUMNS, row)) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = cases[-1]
+            next_cursor = f"{last['updated_at']!r}|{last['id']}"
+        return {"status": "success", "cases": cases, "next_cursor": next_cursor, "total": total}
+
+    def update_case(self, case_id: str, fields: dict) -> dict:
+        """Set status / rm / client / industry / ews on a case."""
+        if not isinstance(fields, dict):
+            return {"status": "error", "message": "Expected a JSON object"}
+        allowed = {k: v for k, v in fields.items() if k in ('status', 'rm', 'client', 'industry', 'ews')}
+        if not allowed:
+            return {"status": "error", "message": "Nothing to update"}
+        invalid = _invalid_case_field(allowed)
+        if invalid:
+            return {"status": "error", "message": invalid}
+        assignments = ", ".join(f"{k} = ?" for k in allowed)
+        with self._lock:
+            cursor = self._db.execute(f"UPDATE cases SET {assignments}, updated_at = ? WHERE id = ?",
+                                      list(allowed.values()) + [time.time(), case_id])
+            self._db.commit()
+        if not cursor.rowcount:
+            return {"status": "error", "message": f"Unknown case: {case_id}"}
+        return {"status": "success", "case_id": case_id}
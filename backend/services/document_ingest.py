@@ -0,0 +1,377 @@
+"""
+document_ingest.py — Tamkeen Case Document Ingestion
+─────────────────────────────────────────────────────
+Turns a case folder (contract + annexes as PDF / DOCX / TXT) into text and
+parsed contract fields, without re-reading files that have not changed:
+
+  1. Scan:   stat every supported file; a file whose (size, mtime) matches
+             the file index is known by its content hash without reading it
+  2. Hash:   changed or new files are hashed (SHA-256); content seen before
+             under any name or mtime comes straight from the cache
+  3. Parse:  the rest are extracted and parsed in parallel on a process pool
+             (spawned lazily; a single file is parsed in-process)
+  4. Merge:  per-file fields are merged into one set of project details,
+             the main contract's values first, annexes filling the gaps
+
+Extracted text and parsed fields are stored zlib-compressed in SQLite keyed
+by content hash and PARSER_VERSION, so changing the parser invalidates them.
+A folder whose file signature is unchanged is answered from memory. File
+index rows for paths that are no longer under a scanned folder are dropped.
+
+PDF extraction needs pypdf (pip install pypdf); DOCX is read with the
+standard library.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree import ElementTree
+
+PARSER_VERSION = 1
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+MAX_FIELD_CHARS = 300
+MAX_OBLIGATIONS_PER_FILE = 50
+
+# Frontend projectDetails key → label patterns, matched as "Label: value" at the start of a line
+FIELD_LABELS = {
+    "projectName": r"project\s+name|project\s+title|name\s+of\s+(?:the\s+)?project",
+    "projectOwner": r"project\s+owner|employer|owner|client",
+    "mainContractor": r"(?:main\s+)?contractor",
+    "subContractor": r"sub[\s-]?contractor",
+    "projectDescription": r"project\s+description|description\s+of\s+(?:the\s+)?(?:project|works)",
+    "projectLocation": r"project\s+location|location|site",
+    "value": r"(?:total\s+)?contract\s+(?:value|price|sum|amount)",
+    "scopeOfWork": r"scope\s+of\s+works?|scope",
+    "duration": r"contract\s+duration|duration|contract\s+period|time\s+for\s+completion",
+    "startingDate": r"commencement\s+date|start(?:ing)?\s+date|effective\s+date",
+    "completionDate": r"(?:planned\s+)?completion\s+date|end\s+date|expiry\s+date",
+    "paymentTerms": r"payment\s+terms|terms\s+of\s+payment",
+}
+_FIELD_PATTERNS = {
+    field: re.compile(rf"^[ \t]*(?:\d+(?:\.\d+)*[.)]?[ \t]+)?(?:{labels})[ \t]*[:\-–][ \t]*(\S.*)$", re.I | re.M)
+    for field, labels in FIELD_LABELS.items()
+}
+
+# Obligation type → keywords; a sentence takes the first type that matches
+OBLIGATION_TYPES = (
+    ("guarantee", r"performance\s+(?:bond|guarantee)|advance\s+payment\s+guarantee|bank\s+guarantee|letter\s+of\s+guarantee"),
+    ("retention", r"retention"),
+    ("penalty", r"liquidated\s+damages|delay\s+penalt|penalt(?:y|ies)"),
+    ("insurance", r"insurance"),
+    ("facility", r"credit\s+facility|facility\s+agreement|loan|overdraft|letter\s+of\s+credit"),
+    ("covenant", r"covenant|shall\s+maintain|must\s+maintain|undertakes?\s+to"),
+)
+_OBLIGATION_PATTERNS = [(kind, re.compile(pattern, re.I)) for kind, pattern in OBLIGATION_TYPES]
+_SENTENCES = re.compile(r'(?<=[.;])\s+|\n{2,}')
+_PERCENT = re.compile(r'(\d+(?:\.\d+)?)\s*%')
+_AMOUNT = re.compile(r'(?:SAR|SR|AED|USD|\$)\s*([\d,]+(?:\.\d+)?)|([\d,]+(?:\.\d+)?)\s*(?:SAR|SR|AED|USD)', re.I)
+
+CASHFLOW_PATTERNS = {
+    "advance_payment_pct": re.compile(
+        r"advance\s+payment\D{0,40}?(\d+(?:\.\d+)?)\s*%|(\d+(?:\.\d+)?)\s*%\s*(?:as\s+an?\s+)?advance", re.I),
+    "retention_pct": re.compile(r"retention\D{0,40}?(\d+(?:\.\d+)?)\s*%|(\d+(?:\.\d+)?)\s*%\s*retention", re.I),
+    "payment_cycle_days": re.compile(
+        r"(?:within|after|of)\s+(\d{1,3})\s*(?:calendar\s+)?days|(\d{1,3})[\s-]*days?\s+(?:credit|payment)", re.I),
+}
+
+
+class ExtractionUnavailable(ValueError):
+    """A file type can't be read in this environment (missing optional dependency); not cached."""
+
+
+# ── Extraction & parsing (run in worker processes) ─────────
+def extract_text(path: str):
+    """(text, pages) for a PDF, DOCX or TXT file."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.pdf':
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise ExtractionUnavailable("PDF extraction requires pypdf (pip install pypdf)")
+        reader = PdfReader(path)
+        return "\n".join(page.extract_text() or "" for page in reader.pages), len(reader.pages)
+    if extension == '.docx':
+        namespace = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+        with zipfile.ZipFile(path) as archive:
+            root = ElementTree.fromstring(archive.read('word/document.xml'))
+        paragraphs = ("".join(node.text or "" for node in p.iter(f'{namespace}t')) for p in root.iter(f'{namespace}p'))
+        return "\n".join(paragraphs), None
+    with open(path, encoding='utf-8', errors='replace') as f:
+        return f.read(), None
+
+
+def _number(text: str):
+    return float(text.replace(',', ''))
+
+
+def parse_contract_fields(text: str) -> dict:
+    """Labelled project details, obligation clauses and cash-flow terms found in `text`."""
+    fields = {}
+    for field, pattern in _FIELD_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            fields[field] = match.group(1).strip()[:MAX_FIELD_CHARS]
+
+    obligations, seen = [], set()
+    for sentence in _SENTENCES.split(text):
+        sentence = " ".join(sentence.split())
+        if len(sentence) < 20 or sentence in seen:
+            continue
+        kind = next((k for k, pattern in _OBLIGATION_PATTERNS if pattern.search(sentence)), None)
+        if kind is None:
+            continue
+        obligation = {"type": kind, "text": sentence[:400]}
+        percent = _PERCENT.search(sentence)
+        if percent:
+            obligation["percent"] = float(percent.group(1))
+        amount = _AMOUNT.search(sentence)
+        if amount:
+            obligation["amount"] = _number(amount.group(1) or amount.group(2))
+        obligations.append(obligation)
+        seen.add(sentence)
+        if len(obligations) >= MAX_OBLIGATIONS_PER_FILE:
+            break
+
+    cashflow_terms = {}
+    for term, pattern in CASHFLOW_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            cashflow_terms[term] = _number(match.group(1) or match.group(2))
+    return {"fields": fields, "obligations": obligations, "cashflow_terms": cashflow_terms}
+
+
+def parse_document(path: str) -> dict:
+    """Extract and parse one file. Runs in a pool worker."""
+    start = time.perf_counter()
+    text, pages = extract_text(path)
+    return {"text": text, "pages": pages, **parse_contract_fields(text),
+            "parse_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+
+def _parse_safely(path: str) -> dict:
+    try:
+        return parse_document(path)
+    except ExtractionUnavailable as e:
+        return {"error": str(e), "retry": True}
+    except Exception as e:
+        # Unreadable content stays unreadable until the file changes, so this is cached like a result
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ── Ingestor ───────────────────────────────────────────────
+class DocumentIngestor:
+    def __init__(self, db_path: str, max_workers: int = None, max_folders: int = 256):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_folders = max_folders
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents (content_hash TEXT, parser_version INTEGER, created_at REAL, "
+            "data BLOB, PRIMARY KEY (content_hash, parser_version))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, content_hash TEXT)"
+        )
+        self._db.commit()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._folders = {}  # folder → (signature, result): unchanged folders skip SQLite entirely
+        self._folders_lock = threading.Lock()  # also guards counters, updated from concurrent requests
+        self.counters = {"folders": 0, "folder_hits": 0, "files_parsed": 0, "files_cached": 0, "errors": 0}
+
+    # ── Pool ───────────────────────────────────────────────
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # Spawned, not forked: the server process runs threads that must not be copied
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+    # ── Scan ───────────────────────────────────────────────
+    @staticmethod
+    def scan(folder: str) -> list:
+        """[(relative path, absolute path, size, mtime_ns)] of supported files, sorted."""
+        entries = []
+        for root, dirs, files in os.walk(folder):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for name in files:
+                if name.startswith(('.', '~$')) or not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                entries.append((os.path.relpath(path, folder), path, stat.st_size, stat.st_mtime_ns))
+        return sorted(entries)
+
+    def _load_documents(self, hashes) -> dict:
+        if not hashes:
+            return {}
+        placeholders = ",".join("?" * len(hashes))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT content_hash, data FROM documents WHERE parser_version = ? AND content_hash IN ({placeholders})",
+                (PARSER_VERSION, *hashes),
+            ).fetchall()
+        return {h: json.loads(zlib.decompress(data)) for h, data in rows}
+
+    # ── Ingest ─────────────────────────────────────────────
+    def ingest_folder(self, folder: str) -> dict:
+        """Text, fields and obligations for every supported file in `folder`, plus merged project details."""
+        start = time.perf_counter()
+        folder = os.path.realpath(folder)
+        entries = self.scan(folder)
+        signature = tuple((rel, size, mtime) for rel, _, size, mtime in entries)
+        with self._folders_lock:
+            memo = self._folders.get(folder)
+            hit = memo is not None and memo[0] == signature
+            self.counters["folders"] += 1
+            self.counters["folder_hits"] += hit
+        if hit:
+            return {**memo[1], "stats": {**memo[1]["stats"], "memory_hit": True,
+                                         "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)}}
+
+        with self._lock:
+            known = dict(((path, (size, mtime)), content_hash) for path, size, mtime, content_hash in self._db.execute(
+                f"SELECT path, size, mtime_ns, content_hash FROM files WHERE path IN ({','.join('?' * len(entries))})",
+                [path for _, path, _, _ in entries],
+            ).fetchall()) if entries else {}
+        hashes = {}
+        for _, path, size, mtime in entries:
+            # Same size and mtime as last time: trust the recorded hash instead of re-reading the file
+            hashes[path] = known.get((path, (size, mtime))) or file_sha256(path)
+        documents = self._load_documents(sorted(set(hashes.values())))
+
+        to_parse = sorted({h: path for path, h in hashes.items() if h not in documents}.items())
+        parsed = self._parse([path for _, path in to_parse])
+        fresh = []
+        for (content_hash, _), document in zip(to_parse, parsed):
+            documents[content_hash] = document
+            if not document.get("retry"):
+                fresh.append((content_hash, PARSER_VERSION, time.time(),
+                              zlib.compress(json.dumps(document, separators=(',', ':')).encode(), 6)))
+
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)", fresh)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                [(path, size, mtime, hashes[path]) for _, path, size, mtime in entries
+                 if not documents[hashes[path]].get("retry")],
+            )
+            # Renamed or deleted files: every indexed path under the folder that the scan no longer found
+            prefix = folder.rstrip(os.sep) + os.sep
+            stale = [(path,) for (path,) in self._db.execute(
+                "SELECT path FROM files WHERE path >= ? AND path < ?", (prefix, prefix[:-1] + chr(ord(os.sep) + 1)),
+            ) if path not in hashes]
+            self._db.executemany("DELETE FROM files WHERE path = ?", stale)
+            self._db.commit()
+
+        parsed_hashes = {h for h, _ in to_parse}
+        files = []
+        for rel, path, size, _ in entries:
+            content_hash = hashes[path]
+            document = documents[content_hash]
+            files.append({
+                "file": rel,
+                "content_hash": content_hash,
+                "size": size,
+                "status": "error" if "error" in document else "parsed" if content_hash in parsed_hashes else "cached",
+                **{k: v for k, v in document.items() if k not in ("text", "retry")},
+                "chars": len(document.get("text", "")),
+            })
+        with self._folders_lock:
+            self.counters["files_parsed"] += sum(f["status"] == "parsed" for f in files)
+            self.counters["files_cached"] += sum(f["status"] == "cached" for f in files)
+            self.counters["errors"] += sum(f["status"] == "error" for f in files)
+
+        result = {
+            "folder": folder,
+            **merge_documents(files),
+            "files": files,
+            "stats": {
+                "files": len(files),
+                "parsed": sum(f["status"] == "parsed" for f in files),
+                "cached": sum(f["status"] == "cached" for f in files),
+                "errors": sum(f["status"] == "error" for f in files),
+                "memory_hit": False,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+            },
+        }
+        if not any(document.get("retry") for document in documents.values()):
+            self._remember(folder, signature, result)
+        return result
+
+    def _parse(self, paths: list) -> list:
+        if len(paths) <= 1 or self.max_workers == 1:
+            return [_parse_safely(path) for path in paths]
+        chunksize = max(1, len(paths) // (self.max_workers * 4))
+        return list(self._executor().map(_parse_safely, paths, chunksize=chunksize))
+
+    def _remember(self, folder, signature, result):
+        # Next time every file is a cache hit
+        files = [{**f, "status": "cached"} if f["status"] == "parsed" else f for f in result["files"]]
+        cached = sum(f["status"] == "cached" for f in files)
+        result = {**result, "files": files, "stats": {**result["stats"], "parsed": 0, "cached": cached}}
+        with self._folders_lock:
+            self._folders.pop(folder, None)
+            self._folders[folder] = (signature, result)
+            while len(self._folders) > self.max_folders:
+                self._folders.pop(next(iter(self._folders)))
+
+    def document_texts(self, folder: str) -> list:
+        """[(relative path, text)] for the folder's documents, ingesting what has changed first."""
+        result = self.ingest_folder(folder)
+        documents = self._load_documents(sorted({f["content_hash"] for f in result["files"] if f["status"] != "error"}))
+        return [(f["file"], documents[f["content_hash"]]["text"]) for f in result["files"]
+                if "text" in documents.get(f["content_hash"], {})]
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM documents").fetchone()
+        with self._folders_lock:
+            counters, folders = dict(self.counters), len(self._folders)
+        return {**counters, "documents": count, "stored_bytes": size, "workers": self.max_workers,
+                "folders_in_memory": folders}
+
+
+def merge_documents(files: list) -> dict:
+    """Project details, obligations and cash-flow terms across a case's files; the main contract wins."""
+    def rank(f):
+        name = f["file"].lower()
+        return (0 if "contract" in name or "agreement" in name else 1, "annex" in name or "appendix" in name, name)
+
+    details, cashflow_terms, obligations, seen = {}, {}, [], set()
+    for f in sorted((f for f in files if f["status"] != "error"), key=rank):
+        for key, value in f.get("fields", {}).items():
+            details.setdefault(key, value)
+        for key, value in f.get("cashflow_terms", {}).items():
+            cashflow_terms.setdefault(key, value)
+        for obligation in f.get("obligations", []):
+            if obligation["text"] not in seen:  # annexes often repeat the contract's clauses
+                seen.add(obligation["text"])
+                obligations.append({**obligation, "source": f["file"]})
+    return {"details": details, "obligations": obligations, "cashflow_terms": cashflow_terms}
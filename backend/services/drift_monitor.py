@@ -0,0 +1,352 @@
+"""
+drift_monitor.py — Miqyas Input Quality & Feature Drift
+────────────────────────────────────────────────────────
+predict() fills absent features with NaN and ignores unknown keys, and the
+one-hot encoder silently zeroes unseen categories, so bad inputs never fail
+loudly. DriftMonitor watches the traffic instead, in constant memory:
+
+  numeric       count, missing, invalid (non-numeric), Welford mean/variance,
+                min/max, and a histogram over the training baseline's decile
+                edges (the quantile sketch; also what PSI is computed on)
+  categorical   count table capped at MAX_CATEGORIES (overflow → "__other__"),
+                rate of categories never seen in training
+  request       unknown keys (capped table)
+
+Stats accumulate in tumbling windows of `window_rows` rows; alerts compare
+the latest window that has at least `min_rows` rows against the baseline that
+model_training.py writes next to each model (drift_baseline.json). Without a
+baseline only the input-quality checks run.
+
+Observing a record is plain dict lookups and float arithmetic — a few
+microseconds per row — and large requests are sampled down to
+`max_rows_per_request` rows.
+"""
+
+import bisect
+import json
+import math
+import random
+import threading
+import time
+
+BASELINE_VERSION = 1
+N_BINS = 10
+MAX_CATEGORIES = 64
+BASELINE_CATEGORIES = 50
+MAX_UNKNOWN_KEYS = 32
+OTHER = "__other__"
+
+# Request keys the API itself uses besides model features (see DashboardService.record_predictions)
+METADATA_KEYS = frozenset({"case_id", "customer_id", "client", "rm", "ews", "industry"})
+
+# PSI conventions: < 0.1 stable, 0.1–0.25 moderate shift, > 0.25 significant shift
+THRESHOLDS = {
+    "psi_warning": 0.1,
+    "psi_critical": 0.25,
+    "missing_rate_delta": 0.10,  # absolute increase over the training missing rate
+    "invalid_rate": 0.01,
+    "unseen_rate": 0.05,
+    "unknown_key_rate": 0.05,    # share of records carrying a given unknown key
+}
+
+
+# ── Baseline (training side) ───────────────────────────────
+def build_baseline(X, features_info) -> dict:
+    """Summarise training features into the snapshot DriftMonitor compares against."""
+    import numpy as np
+    import pandas as pd
+
+    features = {}
+    for name in features_info['numeric_features']:
+        values = pd.to_numeric(X[name], errors='coerce') if name in X else pd.Series(dtype=float)
+        present = values.dropna().to_numpy(dtype=float)
+        entry = {"kind": "numeric", "missing_rate": _rate(len(values) - len(present), len(values))}
+        if len(present):
+            edges = np.unique(np.quantile(present, np.linspace(0, 1, N_BINS + 1)[1:-1]))
+            counts = np.bincount(np.searchsorted(edges, present, side='right'), minlength=len(edges) + 1)
+            entry.update({
+                "mean": float(present.mean()), "std": float(present.std()),
+                "min": float(present.min()), "max": float(present.max()),
+                "edges": edges.tolist(), "proportions": (counts / counts.sum()).tolist(),
+            })
+        features[name] = entry
+
+    for name in features_info['categorical_features']:
+        values = X[name] if name in X else pd.Series(dtype=object)
+        present = values.dropna().astype(str)
+        counts = present.value_counts()
+        top = counts.iloc[:BASELINE_CATEGORIES]
+        proportions = {str(k): float(v / len(present)) for k, v in top.items()} if len(present) else {}
+        if len(counts) > BASELINE_CATEGORIES:
+            proportions[OTHER] = float(counts.iloc[BASELINE_CATEGORIES:].sum() / len(present))
+        features[name] = {
+            "kind": "categorical",
+            "missing_rate": _rate(len(values) - len(present), len(values)),
+            "proportions": proportions,
+            "categories": sorted(map(str, counts.index))[:10000],
+        }
+    return {"version": BASELINE_VERSION, "rows": int(len(X)), "created_at": time.time(), "features": features}
+
+
+def save_baseline(baseline: dict, path: str):
+    with open(path, 'w') as f:
+        json.dump(baseline, f)
+
+
+def load_baseline(path: str):
+    try:
+        with open(path) as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return baseline if baseline.get("version") == BASELINE_VERSION else None
+
+
+# ── Sketches ───────────────────────────────────────────────
+class NumericSketch:
+    __slots__ = ("count", "missing", "invalid", "mean", "m2", "min", "max", "edges", "bins")
+
+    def __init__(self, edges=None):
+        self.count = self.missing = self.invalid = 0
+        self.mean = self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.edges = edges
+        self.bins = [0] * (len(edges) + 1) if edges is not None else None
+
+    def add(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+        if self.bins is not None:
+            self.bins[bisect.bisect_right(self.edges, x)] += 1
+
+    def quantile(self, q: float):
+        """Interpolated within the baseline bins; outer bins are bounded by the observed min/max."""
+        if self.bins is None or not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for i, n in enumerate(self.bins):
+            if n and seen + n >= target:
+                lo = self.edges[i - 1] if i > 0 else self.min
+                hi = self.edges[i] if i < len(self.edges) else self.max
+                lo, hi = max(lo, self.min), min(hi, self.max)
+                return lo + (hi - lo) * (target - seen) / n
+            seen += n
+        return self.max
+
+
+class CategoricalSketch:
+    __slots__ = ("count", "missing", "counts", "known", "unseen")
+
+    def __init__(self, known=None):
+        self.count = self.missing = self.unseen = 0
+        self.counts = {}
+        self.known = known
+
+    def add(self, value: str):
+        self.count += 1
+        counts = self.counts
+        if value in counts:
+            counts[value] += 1
+        elif len(counts) < MAX_CATEGORIES:
+            counts[value] = 1
+        else:
+            counts[OTHER] = counts.get(OTHER, 0) + 1
+        if self.known is not None and value not in self.known:
+            self.unseen += 1
+
+
+class Window:
+    def __init__(self, numeric, categorical, baseline):
+        base = baseline["features"] if baseline else {}
+        self.started_at = time.time()
+        self.rows = 0
+        self.unknown_keys = {}
+        self.numeric = {n: NumericSketch(base.get(n, {}).get("edges")) for n in numeric}
+        self.categorical = {
+            n: CategoricalSketch(frozenset(base[n]["categories"]) if n in base else None) for n in categorical
+        }
+
+
+# ── Monitor ────────────────────────────────────────────────
+class DriftMonitor:
+    def __init__(self, features_info, baseline=None, model_version=None, window_rows: int = 10000,
+                 min_rows: int = 200, max_rows_per_request: int = 256, thresholds: dict = None):
+        self.numeric = list(features_info['numeric_features']) if features_info else []
+        self.categorical = list(features_info['categorical_features']) if features_info else []
+        self.known_keys = frozenset(self.numeric) | frozenset(self.categorical) | METADATA_KEYS
+        self.baseline = baseline
+        self.model_version = model_version
+        self.window_rows = window_rows
+        self.min_rows = min_rows
+        self.max_rows_per_request = max_rows_per_request
+        self.thresholds = {**THRESHOLDS, **(thresholds or {})}
+        self.total_rows = 0
+        self._lock = threading.Lock()
+        self._current = self._new_window()
+        self._previous = None
+
+    def _new_window(self):
+        return Window(self.numeric, self.categorical, self.baseline)
+
+    def observe(self, records):
+        """Add a request's records (dicts, as sent to predict())."""
+        if len(records) > self.max_rows_per_request:
+            records = random.sample(records, self.max_rows_per_request)
+        with self._lock:
+            window = self._current
+            for record in records:
+                self._observe_one(window, record)
+            window.rows += len(records)
+            self.total_rows += len(records)
+            if window.rows >= self.window_rows:
+                self._previous, self._current = window, self._new_window()
+
+    def _observe_one(self, window, record):
+        for name, sketch in window.numeric.items():
+            value = record.get(name)
+            if value is None or value == '' or value != value:
+                sketch.missing += 1
+                continue
+            try:
+                sketch.add(float(value))
+            except (TypeError, ValueError):
+                sketch.invalid += 1
+        for name, sketch in window.categorical.items():
+            value = record.get(name)
+            if value is None or value == '' or value != value:
+                sketch.missing += 1
+            else:
+                sketch.add(str(value))
+        unknown_keys = window.unknown_keys
+        for key in record.keys() - self.known_keys:
+            if key in unknown_keys or len(unknown_keys) < MAX_UNKNOWN_KEYS:
+                unknown_keys[key] = unknown_keys.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._current, self._previous = self._new_window(), None
+
+    # ── Report ─────────────────────────────────────────────
+    def report(self) -> dict:
+        with self._lock:
+            window = self._current
+            if window.rows < self.min_rows and self._previous is not None:
+                window = self._previous
+            features = {n: self._numeric_stats(n, s) for n, s in window.numeric.items()}
+            features.update({n: self._categorical_stats(n, s) for n, s in window.categorical.items()})
+            unknown = dict(sorted(window.unknown_keys.items(), key=lambda kv: -kv[1]))
+            rows, started_at = window.rows, window.started_at
+
+        alerts = self._alerts(features, unknown, rows) if rows >= self.min_rows else []
+        return {
+            "model_version": self.model_version,
+            "baseline": bool(self.baseline),
+            "baseline_rows": self.baseline.get("rows") if self.baseline else None,
+            "window": {"rows": rows, "started_at": started_at, "window_rows": self.window_rows,
+                       "min_rows_for_alerts": self.min_rows},
+            "total_rows": self.total_rows,
+            "alerts": alerts,
+            "unknown_keys": unknown,
+            "features": features,
+        }
+
+    def _base(self, name):
+        return self.baseline["features"].get(name) if self.baseline else None
+
+    def _numeric_stats(self, name, s):
+        seen = s.count + s.missing + s.invalid
+        base = self._base(name)
+        stats = {
+            "kind": "numeric",
+            "rows": seen,
+            "missing_rate": _rate(s.missing, seen),
+            "invalid": s.invalid,
+            "mean": s.mean if s.count else None,
+            "std": math.sqrt(s.m2 / s.count) if s.count else None,
+            "min": s.min if s.count else None,
+            "max": s.max if s.count else None,
+            "p10": s.quantile(0.1), "p50": s.quantile(0.5), "p90": s.quantile(0.9),
+        }
+        if base:
+            stats["baseline_missing_rate"] = base["missing_rate"]
+            stats["baseline_mean"] = base.get("mean")
+            if s.bins is not None and s.count and base.get("proportions"):
+                stats["psi"] = _psi(base["proportions"], [n / s.count for n in s.bins])
+        return stats
+
+    def _categorical_stats(self, name, s):
+        seen = s.count + s.missing
+        base = self._base(name)
+        top = sorted(s.counts.items(), key=lambda kv: -kv[1])[:10]
+        stats = {
+            "kind": "categorical",
+            "rows": seen,
+            "missing_rate": _rate(s.missing, seen),
+            "distinct": len(s.counts),
+            "top": {k: _rate(v, s.count) for k, v in top},
+        }
+        if base:
+            stats["baseline_missing_rate"] = base["missing_rate"]
+            stats["unseen_rate"] = _rate(s.unseen, s.count)
+            if s.count and base["proportions"]:
+                expected = base["proportions"]
+                # Bucket both sides over the baseline's categories; everything else is "other"
+                actual = {k: 0.0 for k in expected}
+                actual.setdefault(OTHER, 0.0)
+                for value, n in s.counts.items():
+                    key = value if value in expected else OTHER
+                    actual[key] += n / s.count
+                keys = list(actual)
+                stats["psi"] = _psi([expected.get(k, 0.0) for k in keys], [actual[k] for k in keys])
+        return stats
+
+    def _alerts(self, features, unknown, rows):
+        t, alerts = self.thresholds, []
+
+        def alert(feature, kind, severity, value, threshold, message):
+            alerts.append({"feature": feature, "type": kind, "severity": severity,
+                           "value": round(value, 4), "threshold": threshold, "message": message})
+
+        for name, f in features.items():
+            base_missing = f.get("baseline_missing_rate", 0.0)
+            if f["missing_rate"] - base_missing > t["missing_rate_delta"]:
+                severity = "critical" if f["missing_rate"] >= 0.5 else "warning"
+                alert(name, "missing_rate", severity, f["missing_rate"], base_missing + t["missing_rate_delta"],
+                      f"{name} missing in {f['missing_rate']:.0%} of rows (training: {base_missing:.0%})")
+            psi = f.get("psi")
+            if psi is not None and psi > t["psi_warning"]:
+                severity = "critical" if psi > t["psi_critical"] else "warning"
+                alert(name, "drift", severity, psi, t["psi_warning"],
+                      f"{name} distribution shifted from training (PSI {psi:.2f})")
+            if f["kind"] == "numeric" and f["invalid"] and _rate(f["invalid"], f["rows"]) > t["invalid_rate"]:
+                alert(name, "invalid_values", "warning", _rate(f["invalid"], f["rows"]), t["invalid_rate"],
+                      f"{name} has {f['invalid']} non-numeric values")
+            if f.get("unseen_rate", 0.0) > t["unseen_rate"]:
+                alert(name, "unseen_categories", "warning", f["unseen_rate"], t["unseen_rate"],
+                      f"{f['unseen_rate']:.0%} of {name} values never appeared in training")
+        for key, n in unknown.items():
+            if n / rows > t["unknown_key_rate"]:
+                alert(key, "unknown_key", "warning", n / rows, t["unknown_key_rate"],
+                      f"Unknown input key '{key}' in {n / rows:.0%} of rows; the model ignores it")
+        return sorted(alerts, key=lambda a: (a["severity"] != "critical", a["feature"]))
+
+
+def _rate(n, total):
+    return n / total if total else 0.0
+
+
+def _psi(expected, actual, eps: float = 1e-4) -> float:
+    """Population stability index over matching buckets."""
+    total = 0.0
+    for e, a in zip(expected, actual):
+        e, a = max(e, eps), max(a, eps)
+        total += (a - e) * math.log(a / e)
+    return round(total, 4)
+
@@ -0,0 +1,79 @@
+"""
+embeddings.py — Text Chunking & Local Embeddings
+─────────────────────────────────────────────────
+Shared by RafeeQ retrieval and the Tamkeen document tools.
+
+  - chunk_text()      splits a document into overlapping, sentence-aligned chunks
+  - HashingEmbedder   deterministic local embedding (feature hashing of word
+                      unigrams + bigrams); no model download, no network
+
+Any object with `dim` and `embed(texts) -> np.ndarray[n, dim]` (rows
+L2-normalised) can be plugged in instead of HashingEmbedder.
+"""
+
+import re
+import zlib
+import numpy as np
+
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?؟])\s+|\n\s*\n')
+_TOKEN = re.compile(r'\w+')
+
+
+def chunk_text(text: str, max_chars: int = 800, overlap_chars: int = 120) -> list:
+    """Pack sentences into chunks of at most max_chars, repeating ~overlap_chars of context."""
+    overlap_chars = min(overlap_chars, max_chars // 2)
+    sentences = [s.strip() for s in _SENTENCE_BREAK.split(text or '') if s and s.strip()]
+    chunks, current, size = [], [], 0
+    for sentence in sentences:
+        # Very long "sentences" (tables, OCR runs) are hard-split
+        while len(sentence) > max_chars:
+            head, sentence = sentence[:max_chars], sentence[max_chars:]
+            if current:
+                chunks.append(' '.join(current))
+                current, size = [], 0
+            chunks.append(head)
+
+        if current and size + len(sentence) + 1 > max_chars:
+            chunks.append(' '.join(current))
+            # Carry the tail of the previous chunk forward as overlap
+            carried, carried_size = [], 0
+            for previous in reversed(current):
+                if carried_size + len(previous) > overlap_chars:
+                    break
+                carried.insert(0, previous)
+                carried_size += len(previous) + 1
+            current, size = carried, carried_size
+
+        current.append(sentence)
+        size += len(sentence) + 1
+
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def tokenize(text: str) -> list:
+    return _TOKEN.findall((text or '').lower())
+
+
+class HashingEmbedder:
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _features(self, tokens):
+        yield from tokens
+        yield from (f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+
+    def embed(self, texts) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            counts = {}
+            for feature in self._features(tokenize(text)):
+                # crc32 rather than hash(): stable across processes and restarts
+                h = zlib.crc32(feature.encode())
+                counts[h] = counts.get(h, 0) + 1
+            for h, tf in counts.items():
+                sign = 1.0 if h & 0x80000000 else -1.0
+                out[i, h % self.dim] += sign * (1.0 + np.log(tf))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1.0, norms)
@@ -0,0 +1,209 @@
+"""
+instrumentation.py — Latency Metrics and Sampling Profiler
+───────────────────────────────────────────────────────────
+Stdlib-only timing for the API and the hot stages inside services:
+
+  - METRICS.observe(name, seconds, **labels)   cumulative latency histograms
+  - span('miqyas.predict_proba')                times a block into span_duration_seconds
+  - METRICS.render_prometheus()                  text exposition for /api/metrics
+
+Spans cost a perf_counter pair and one locked bucket update, so they stay on
+in production. The SamplingProfiler is opt-in: it walks every thread's stack
+at a fixed interval and emits folded stacks ("a;b;c 42"), the input format of
+flamegraph.pl and speedscope.
+"""
+
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Seconds; fine at the low end, where single predictions live.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    'http_request_duration_seconds': 'Time from request start until the response headers are ready.',
+    'span_duration_seconds': 'Time spent in an instrumented stage inside a service.',
+}
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q: float):
+        """Bucket upper bound holding the q-th observation (what histogram_quantile approximates)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}  # (name, ((label, value), ...)) → Histogram
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('span_duration_seconds', time.perf_counter() - start, span=name)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self) -> dict:
+        """{name: [{labels, count, sum, p50, p95, p99}]} — for JSON consumers and benchmarks."""
+        out = {}
+        with self._lock:
+            for (name, labels), h in sorted(self._histograms.items()):
+                out.setdefault(name, []).append({
+                    "labels": dict(labels),
+                    "count": h.count,
+                    "sum": round(h.sum, 6),
+                    "p50": h.quantile(0.5),
+                    "p95": h.quantile(0.95),
+                    "p99": h.quantile(0.99),
+                })
+        return out
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            items = sorted(self._histograms.items())
+            current = None
+            for (name, labels), h in items:
+                if name != current:
+                    current = name
+                    if name in HELP:
+                        lines.append(f"# HELP {name} {HELP[name]}")
+                    lines.append(f"# TYPE {name} histogram")
+                cumulative = 0
+                for bound, n in zip(h.buckets + (float('inf'),), h.counts):
+                    cumulative += n
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {h.sum:.6f}")
+                lines.append(f"{name}_count{_labels(labels)} {h.count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+# Process-wide registry shared by main.py and the services.
+METRICS = MetricsRegistry()
+span = METRICS.span
+
+
+class SamplingProfiler:
+    """
+    Samples every Python thread's stack each `interval_ms` from a background
+    thread. Nothing is installed in the profiled code, so the overhead is the
+    sampler's own GIL time (well under 1% at the default 5 ms).
+    """
+
+    def __init__(self):
+        self._stacks = Counter()
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.started_at = None
+        self.samples = 0
+        self.interval_ms = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms: float = 5.0, duration_seconds: float = None):
+        with self._lock:
+            if self.running:
+                raise RuntimeError("Profiler is already running")
+            self._stacks = Counter()
+            self._stop.clear()
+            self.samples = 0
+            self.interval_ms = interval_ms
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, args=(interval_ms / 1000, duration_seconds),
+                                            name='sampling-profiler', daemon=True)
+            self._thread.start()
+        print(f"[Profiler] Sampling every {interval_ms} ms.")
+        return self.status()
+
+    def stop(self) -> str:
+        """Stop sampling and return the folded stacks collected so far."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.folded()
+
+    def folded(self) -> str:
+        with self._lock:
+            return ''.join(f"{stack} {n}\n" for stack, n in self._stacks.most_common())
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_ms": self.interval_ms,
+            "started_at": self.started_at,
+            "samples": self.samples,
+            "distinct_stacks": len(self._stacks),
+        }
+
+    def _run(self, interval, duration_seconds):
+        own = threading.get_ident()
+        deadline = time.monotonic() + duration_seconds if duration_seconds else None
+        while not self._stop.wait(interval):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    self._stacks[_fold(frame)] += 1
+                self.samples += 1
+        print(f"[Profiler] Stopped after {self.samples} samples.")
+
+
+def _fold(frame) -> str:
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
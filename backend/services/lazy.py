@@ -0,0 +1,67 @@
+"""
+lazy.py — Lazy Service Construction
+────────────────────────────────────
+Wraps a service factory so the service (and its heavy imports / model
+loading) is only built on first use, or ahead of time by a background
+warm-up thread started alongside the server.
+
+Usage:
+  miqyas_service = LazyService('miqyas', lambda: RiskModelService(...))
+  miqyas_service.predict(data)     # builds on first call, then delegates
+  miqyas_service.warm_up()         # optional: build in the background now
+
+The proxy's own methods (instance, warm_up, lazy_status) are named so they
+don't shadow the wrapped service's API.
+"""
+
+import threading
+import time
+
+
+class LazyService:
+    def __init__(self, name: str, factory):
+        self._name = name
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+        self._state = "idle"
+        self._error = None
+        self._load_seconds = None
+
+    def instance(self):
+        """Return the service, building it exactly once across threads."""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._state = "loading"
+                    start = time.perf_counter()
+                    try:
+                        self._instance = self._factory()
+                    except Exception as e:
+                        self._state, self._error = "failed", str(e)
+                        print(f"[{self._name}] Service construction failed: {e}")
+                        raise
+                    self._load_seconds = time.perf_counter() - start
+                    self._state = "ready"
+                    print(f"[{self._name}] Service ready in {self._load_seconds:.2f}s.")
+        return self._instance
+
+    def __getattr__(self, attr):
+        # Only called for attributes the proxy itself doesn't define
+        return getattr(self.instance(), attr)
+
+    def warm_up(self):
+        """Build the service on a background thread."""
+        def _build():
+            try:
+                self.instance()
+            except Exception:
+                pass  # state/error are recorded for /api/status
+
+        if self._instance is not None:
+            return
+        self._state = "loading"
+        threading.Thread(target=_build, name=f"warmup-{self._name}", daemon=True).start()
+
+    def lazy_status(self) -> dict:
+        return {"state": self._state, "load_seconds": self._load_seconds, "error": self._error}
@@ -0,0 +1,272 @@
+"""
+llm_gateway.py — Shared LLM Gateway
+────────────────────────────────────
+One long-lived, pooled chat-completions client shared by the services,
+instead of a new OpenAI client (and TCP/TLS handshake) per call.
+
+  - Compact prompts:  payloads are sent as minified JSON without nulls
+  - Response cache:   keyed on prompt version + model + normalised input
+                      (LRU/TTL, optional SQLite tier — see prediction_cache.py)
+  - Concurrency cap:  at most `max_concurrency` requests in flight
+  - Retries:          connection errors, 429s and 5xx, with jittered backoff
+  - Async fan-out:    submit() / acomplete() / complete_many() run many
+                      analyses at once
+  - Streaming:        stream() yields content deltas as they arrive (chat);
+                      retried only until the first delta, never cached
+
+Requests run on a private event loop thread, so the sync API (complete) and
+the async API (acomplete, from any loop) share one client and one limit.
+
+Point OPENAI_BASE_URL at a local server (benchmarks/mock_llm_server.py) to
+run offline.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+from services.prediction_cache import PredictionCache
+
+DEFAULT_MODEL = "gpt-5.2"
+
+
+def _drop_none(value):
+    if isinstance(value, dict):
+        return {k: _drop_none(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_drop_none(v) for v in value]
+    return value
+
+
+def compact_payload(payload) -> str:
+    """Minified JSON (no nulls, raw UTF-8); values are passed through unchanged."""
+    if isinstance(payload, str):
+        return payload.strip()
+    return json.dumps(_drop_none(payload), separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+class LLMGateway:
+    def __init__(self, api_key: str = None, base_url: str = None, max_concurrency: int = 8,
+                 max_retries: int = 3, backoff_seconds: float = 0.5, timeout_seconds: float = 120.0,
+                 cache_size: int = 1024, cache_ttl: float = None, cache_path: str = None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout_seconds = timeout_seconds
+        self.cache = PredictionCache(cache_size, cache_ttl, cache_path) if cache_size else None
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+        self._retryable = ()
+        self._start_lock = threading.Lock()
+        self._in_flight = 0
+        self.counters = {"requests": 0, "cache_hits": 0, "upstream_calls": 0, "retries": 0, "failures": 0}
+
+    @classmethod
+    def from_env(cls, cache_path: str = None):
+        return cls(
+            api_key=os.getenv('OPENAI_API_KEY'),
+            base_url=os.getenv('OPENAI_BASE_URL'),
+            max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', '8')),
+            max_retries=int(os.getenv('LLM_MAX_RETRIES', '3')),
+            cache_size=int(os.getenv('LLM_CACHE_SIZE', '1024')),
+            cache_ttl=float(os.getenv('LLM_CACHE_TTL')) if os.getenv('LLM_CACHE_TTL') else None,
+            cache_path=cache_path,
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key or self.base_url)
+
+    # ── Event loop / client ────────────────────────────────
+    def _ensure_started(self):
+        if self._loop is not None:
+            return
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='llm-gateway', daemon=True).start()
+            asyncio.run_coroutine_threadsafe(self._init_client(), loop).result()
+            self._loop = loop
+
+    async def _init_client(self):
+        import httpx
+        import openai
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._retryable = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+        self._client = openai.AsyncOpenAI(
+            api_key=self.api_key or 'unused',
+            base_url=self.base_url,
+            timeout=self.timeout_seconds,
+            max_retries=0,  # retried here, under the concurrency limit
+            http_client=openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            ),
+        )
+
+    def _submit(self, coro):
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    # ── Public API ─────────────────────────────────────────
+    def submit(self, system_prompt: str, payload, prompt_version: str, model: str = DEFAULT_MODEL,
+               temperature: float = 0.3):
+        """Start a request without waiting; returns a concurrent.futures.Future."""
+        return self._submit(self._complete(system_prompt, payload, prompt_version, model, temperature))
+
+    def complete(self, system_prompt: str, payload, prompt_version: str, model: str = DEFAULT_MODEL,
+                 temperature: float = 0.3) -> dict:
+        """Blocking call. Returns {content, cached, attempts, latency_ms}; raises on failure."""
+        return self.submit(system_prompt, payload, prompt_version, model, temperature).result()
+
+    async def acomplete(self, system_prompt: str, payload, prompt_version: str, model: str = DEFAULT_MODEL,
+                        temperature: float = 0.3) -> dict:
+        """Awaitable from any event loop; the request itself runs on the gateway's loop."""
+        return await asyncio.wrap_future(self.submit(system_prompt, payload, prompt_version, model, temperature))
+
+    def complete_many(self, requests) -> list:
+        """Fan out several complete() calls (dicts of its kwargs); failures come back as {"error": ...}."""
+        futures = [self.submit(**r) for r in requests]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({"error": str(e)})
+        return results
+
+    def stream(self, messages: list, model: str = DEFAULT_MODEL, temperature: float = 0.3,
+               timeout_seconds: float = None):
+        """
+        Blocking iterator over content deltas for a chat `messages` list. The
+        request runs on the gateway's loop under the same concurrency limit;
+        closing the iterator early cancels it.
+        """
+        deltas = queue.Queue()
+        future = self._submit(self._stream(messages, model, temperature, deltas))
+        try:
+            while True:
+                kind, value = deltas.get(timeout=timeout_seconds or self.timeout_seconds)
+                if kind == 'delta':
+                    yield value
+                elif kind == 'error':
+                    raise value
+                else:
+                    return
+        finally:
+            future.cancel()
+
+    async def _stream(self, messages, model, temperature, deltas):
+        self.counters["requests"] += 1
+        async with self._semaphore:
+            self._in_flight += 1
+            try:
+                for attempt in range(1, self.max_retries + 2):
+                    self.counters["upstream_calls"] += 1
+                    started = False
+                    try:
+                        response = await self._client.chat.completions.create(
+                            model=model, messages=messages, temperature=temperature, stream=True,
+                        )
+                        async for chunk in response:
+                            text = chunk.choices[0].delta.content if chunk.choices else None
+                            if text:
+                                started = True
+                                deltas.put(('delta', text))
+                        break
+                    except self._retryable as e:
+                        # Retrying after the first delta would repeat text the caller already has
+                        if started or attempt > self.max_retries:
+                            self.counters["failures"] += 1
+                            raise
+                        self.counters["retries"] += 1
+                        delay = self.backoff_seconds * 2 ** (attempt - 1) * (0.5 + random.random())
+                        print(f"[LLM] {type(e).__name__}; retrying stream in {delay:.2f}s (attempt {attempt})")
+                        await asyncio.sleep(delay)
+            except Exception as e:
+                if not isinstance(e, self._retryable):
+                    self.counters["failures"] += 1
+                deltas.put(('error', e))
+                return
+            finally:
+                self._in_flight -= 1
+        deltas.put(('done', None))
+
+    @staticmethod
+    def cache_key(system_prompt, content, prompt_version, model, temperature) -> str:
+        prompt_hash = hashlib.sha1(system_prompt.encode()).hexdigest()[:12]
+        payload = json.dumps([prompt_version, prompt_hash, model, temperature, content], ensure_ascii=False)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    async def _complete(self, system_prompt, payload, prompt_version, model, temperature):
+        start = time.perf_counter()
+        content = compact_payload(payload)
+        key = self.cache_key(system_prompt, content, prompt_version, model, temperature)
+        self.counters["requests"] += 1
+        if self.cache is not None:
+            hit = self.cache.get(key)
+            if hit is not None:
+                self.counters["cache_hits"] += 1
+                return {**hit, "cached": True, "attempts": 0,
+                        "latency_ms": (time.perf_counter() - start) * 1000}
+
+        async with self._semaphore:
+            self._in_flight += 1
+            try:
+                for attempt in range(1, self.max_retries + 2):
+                    self.counters["upstream_calls"] += 1
+                    try:
+                        response = await self._client.chat.completions.create(
+                            model=model,
+                            messages=[
+                                {"role": "system", "content": system_prompt},
+                                {"role": "user", "content": content},
+                            ],
+                            temperature=temperature,
+                        )
+                        break
+                    except self._retryable as e:
+                        if attempt > self.max_retries:
+                            self.counters["failures"] += 1
+                            raise
+                        self.counters["retries"] += 1
+                        delay = self.backoff_seconds * 2 ** (attempt - 1) * (0.5 + random.random())
+                        print(f"[LLM] {type(e).__name__}; retrying in {delay:.2f}s (attempt {attempt})")
+                        await asyncio.sleep(delay)
+                    except Exception:
+                        self.counters["failures"] += 1
+                        raise
+            finally:
+                self._in_flight -= 1
+
+        result = {"content": response.choices[0].message.content}
+        if self.cache is not None:
+            self.cache.put_many([(key, result)])
+        return {**result, "cached": False, "attempts": attempt,
+                "latency_ms": (time.perf_counter() - start) * 1000}
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "cache": self.cache.stats() if self.cache else None,
+        }
+
+    def close(self):
+        if self._loop is not None:
+            if self._client is not None:
+                asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
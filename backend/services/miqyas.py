@@ -2,58 +2,290 @@
 miqyas.py — Miqyas Credit Risk Model Service
 ─────────────────────────────────────────────
 Plug in your own ML model files under backend/models/:
-  - decision_model.joblib
-  - target_encoder.joblib
-  - feature_encoders.joblib
-  - feature_names.joblib
+  - loan_risk_model.joblib           (sklearn pipeline, from train_ml_model.py)
+  - features_info.joblib
+  - loan_risk_model.compiled/        (optional array-backed export, memory-mapped;
+                                      see compiled_model.py)
+or, with the model registry (model_registry.py), under models/versions/<v>/.
+Versions are loaded in the background and swapped in atomically; a
+candidate can also run in shadow mode next to the live model.
 
 Expected predict() output shape:
   [{ "decision": str, "confidence": float, "all_probabilities": {label: float} }]
 """
 
-import joblib
 import os
-import pandas as pd
+import random
+import threading
+import time
 import numpy as np
-import json
-from openai import OpenAI
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 
+from services.coalescer import PredictionCoalescer
+from services.compiled_model import CompiledRiskModel, compiled_model_mtime, compiled_model_path
+from services.drift_monitor import DriftMonitor, load_baseline
+from services.instrumentation import span
+from services.llm_gateway import LLMGateway
+from services.model_registry import DRIFT_BASELINE_FILE, ModelRegistry
+from services.prediction_cache import PredictionCache, model_fingerprint
+from services.risk_labels import APPROVED_LABEL
+
 load_dotenv()
 
-class RiskModelService:
-    def __init__(self, model_dir='models'):
+# Shadow scoring is best-effort: samples beyond this backlog are dropped.
+SHADOW_MAX_PENDING = 64
+
+# Bump the version whenever the prompt changes so cached analyses are not reused.
+DEEP_ANALYSIS_PROMPT_VERSION = "deep-analysis/1"
+DEEP_ANALYSIS_PROMPT = """You are a senior credit risk analyst and discrepancy detection engine. 
+Analyze the following loan application data (JSON format) to identify hidden patterns, discrepancies, and red flags.
+
+Return your response EXCLUSIVELY as a structured Markdown Table with no preceding or trailing text.
+The table MUST have exactly these columns:
+| Type (Discrepancy/Red Flag) | Details | Risk Level (High/Medium) |
+
+Only output the Markdown table. Do NOT use bullet points or any other formats and make your response short as possible.
+"""
+
+
+# pandas, joblib (→ sklearn) and openai (inside llm_gateway) are imported on
+# first use rather than at module load; together they dominate the cold start.
+def _records_frame(records):
+    import pandas as pd
+    return pd.DataFrame(records)
+
+
+def _joblib_load(path):
+    import joblib
+    return joblib.load(path)
+
+
+class LoadedModel:
+    """
+    One set of model artifacts, loaded from a directory. It is never mutated
+    after loading: RiskModelService swaps whole instances, so a request that
+    started on one model finishes on it.
+    """
+
+    def __init__(self, model_dir, use_compiled=True, version=None):
         self.model_dir = model_dir
-        self.model_loaded = False
+        self.version = version
+        self.loaded = False
         self.model = None
+        self.engine = None
         self.features_info = None
-        print(f"[Miqyas] Service initialized. Model dir: {model_dir}")
-        self._load_model()
+        self.drift_baseline = None
+        self.fingerprint = None
+        self.loaded_at = time.time()
+        self._load(use_compiled)
 
-    def _load_model(self):
+    def _load(self, use_compiled):
         try:
             model_path = os.path.join(self.model_dir, 'loan_risk_model.joblib')
+            compiled_path = compiled_model_path(self.model_dir)
             features_path = os.path.join(self.model_dir, 'features_info.joblib')
-            
-            if os.path.exists(model_path):
-                self.model = joblib.load(model_path)
-                self.model_loaded = True
+
+            if use_compiled and self._compiled_is_current(compiled_path, model_path):
+                try:
+                    self.model = CompiledRiskModel.load(compiled_path)
+                    self.loaded = True
+                    self.engine = "compiled"
+                    self.fingerprint = model_fingerprint(model_path if os.path.exists(model_path) else compiled_path)
+                    print("[Miqyas] Compiled model loaded successfully.")
+                except Exception as e:
+                    print(f"[Miqyas] Compiled model load failed, falling back to joblib: {e}")
+
+            if not self.loaded and os.path.exists(model_path):
+                self.model = _joblib_load(model_path)
+                self.loaded = True
+                self.engine = "sklearn"
+                self.fingerprint = model_fingerprint(model_path)
                 print("[Miqyas] Model loaded successfully.")
-            else:
+            elif not self.loaded:
                 print(f"[Miqyas] Model file not found at {model_path}")
 
             if os.path.exists(features_path):
-                self.features_info = joblib.load(features_path)
+                self.features_info = _joblib_load(features_path)
                 print("[Miqyas] Features info loaded.")
+
+            # Written by model_training.py; models trained before it only get input-quality checks
+            baseline_path = os.path.join(self.model_dir, DRIFT_BASELINE_FILE)
+            if os.path.exists(baseline_path):
+                self.drift_baseline = load_baseline(baseline_path)
         except Exception as e:
             print(f"[Miqyas] Model load failed: {e}")
 
+    @staticmethod
+    def _compiled_is_current(compiled_path, model_path):
+        # A compiled export older than the joblib model belongs to a previous training run.
+        if compiled_path is None:
+            return False
+        return not os.path.exists(model_path) or compiled_model_mtime(compiled_path) >= os.path.getmtime(model_path)
+
+    def warm_up(self):
+        """Score one empty row so lazy imports and mapped pages are in place before traffic arrives."""
+        self.score_frame(_records_frame([{}]))
+
+    def _feature_columns(self):
+        if not self.features_info:
+            return None
+        return self.features_info['numeric_features'] + self.features_info['categorical_features']
+
+    def _align_frame(self, df_input):
+        """
+        Ensure all expected columns are present (even if empty) and in training order.
+        The pipeline handles missing values, but the DataFrame needs the columns.
+        """
+        columns = self._feature_columns()
+        if columns is None:
+            return df_input
+        return df_input.reindex(columns=columns)
+
+    def score_frame(self, df_input):
+        # A single predict_proba pass; the decision is the argmax over classes,
+        # which is exactly what the forest's predict() computes internally.
+        _, probabilities = self.score_matrix(df_input)
+        with span('miqyas.build_results'):
+            return self._build_results(probabilities)
+
+    def score_matrix(self, df_input):
+        """(class labels, n_rows × n_classes probability array) — no per-row dicts."""
+        with span('miqyas.align'):
+            aligned = self._align_frame(df_input)
+        with span('miqyas.predict_proba'):
+            probabilities = self.model.predict_proba(aligned)
+        return self.labels, probabilities
+
+    @property
+    def labels(self):
+        return [str(c) for c in self.model.classes_]
+
+    def _build_results(self, probabilities):
+        labels = self.labels
+        best = np.argmax(probabilities, axis=1)
+        confidences = probabilities[np.arange(len(best)), best]
+
+        return [
+            {
+                "decision": labels[k],
+                "confidence": conf,
+                "all_probabilities": dict(zip(labels, row)),
+            }
+            for k, conf, row in zip(best.tolist(), confidences.tolist(), probabilities.tolist())
+        ]
+
+
+class ShadowStats:
+    """Agreement and latency of a candidate model scored alongside the live one."""
+
+    def __init__(self, version, sample_rate):
+        self.version = version
+        self.sample_rate = sample_rate
+        self.samples = 0
+        self.rows = 0
+        self.disagreements = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_probability_delta = 0.0
+        self.primary_ms = deque(maxlen=1000)
+        self.shadow_ms = deque(maxlen=1000)
+        self.recent_disagreements = deque(maxlen=20)
+        self._lock = threading.Lock()
+
+    def record(self, records, primary, shadow, primary_ms, shadow_ms):
+        with self._lock:
+            self.samples += 1
+            self.rows += len(primary)
+            self.primary_ms.append(primary_ms)
+            self.shadow_ms.append(shadow_ms)
+            for record, p, s in zip(records, primary, shadow):
+                delta = max((abs(p["all_probabilities"].get(label, 0.0) - prob)
+                             for label, prob in s["all_probabilities"].items()), default=0.0)
+                self.max_probability_delta = max(self.max_probability_delta, delta)
+                if p["decision"] != s["decision"]:
+                    self.disagreements += 1
+                    self.recent_disagreements.append({
+                        "primary": p["decision"], "primary_confidence": round(p["confidence"], 4),
+                        "shadow": s["decision"], "shadow_confidence": round(s["confidence"], 4),
+                        "case_id": record.get("case_id") or record.get("customer_id"),
+                    })
+            if self.samples % 100 == 0:
+                stats = self.stats()
+                print(f"[Miqyas] Shadow {self.version}: {stats['samples']} samples, "
+                      f"disagreement {stats['disagreement_rate']:.2%}, p50 {stats['primary_p50_ms']} ms live "
+                      f"vs {stats['shadow_p50_ms']} ms shadow")
+
+    def stats(self) -> dict:
+        def p50(values):
+            return round(float(np.percentile(values, 50)), 3) if values else None
+
+        return {
+            "version": self.version,
+            "sample_rate": self.sample_rate,
+            "samples": self.samples,
+            "rows": self.rows,
+            "disagreements": self.disagreements,
+            "disagreement_rate": self.disagreements / self.rows if self.rows else 0.0,
+            "max_probability_delta": round(self.max_probability_delta, 6),
+            "primary_p50_ms": p50(self.primary_ms),
+            "shadow_p50_ms": p50(self.shadow_ms),
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "recent_disagreements": list(self.recent_disagreements),
+        }
+
+
+class RiskModelService:
+    def __init__(self, model_dir='models', use_compiled=True, llm=None):
+        """`llm` is a shared LLMGateway; one is built from the environment if omitted."""
+        self.model_dir = model_dir
+        self.llm = llm
+        self.use_compiled = use_compiled
+        self.registry = ModelRegistry(model_dir)
+        self.coalescer = None
+        self.cache = None
+        self._shadow = None
+        self.shadow_stats = None
+        self._shadow_pool = None
+        self._shadow_slots = threading.BoundedSemaphore(SHADOW_MAX_PENDING)
+        self.drift = None
+        self._drift_settings = None
+        self._reload_lock = threading.Lock()
+        self.reload_state = {"state": "idle", "version": None, "error": None}
+        print(f"[Miqyas] Service initialized. Model dir: {model_dir}")
+
+        # The registry's active version wins; a bare models/ directory still works
+        active = self.registry.active_version()
+        try:
+            self._set_current(LoadedModel(self.registry.version_dir(active), use_compiled, version=active))
+        except KeyError:
+            self._set_current(LoadedModel(model_dir, use_compiled))
+
+        shadow = self.registry.manifest().get("shadow")
+        if shadow:
+            try:
+                self.set_shadow(shadow["version"], shadow.get("sample_rate") or 0.1)
+            except KeyError:
+                print(f"[Miqyas] Shadow version {shadow['version']} no longer exists; ignoring it.")
+
+    # The live model's attributes, for callers that predate hot-swapping
+    model_loaded = property(lambda self: self._current.loaded)
+    model = property(lambda self: self._current.model)
+    engine = property(lambda self: self._current.engine)
+    features_info = property(lambda self: self._current.features_info)
+    model_fingerprint = property(lambda self: self._current.fingerprint)
+    active_model_dir = property(lambda self: self._current.model_dir)
+    model_version = property(lambda self: self._current.version)
+
     def predict(self, data):
         """
         Run prediction on incoming feature data.
         'data' can be a dictionary or a list of dictionaries.
         """
-        if not self.model_loaded:
+        current = self._current
+        if not current.loaded:
             return [{
                 "decision": "Error: Model not loaded",
                 "confidence": 0.0,
@@ -61,38 +293,16 @@ class RiskModelService:
             }]
 
         try:
-            # Convert input data to DataFrame
-            if isinstance(data, dict):
-                df_input = pd.DataFrame([data])
-            else:
-                df_input = pd.DataFrame(data)
-
-            # Ensure all expected columns are present (even if empty)
-            # The pipeline handles missing values, but the DataFrame needs the columns
-            if self.features_info:
-                all_features = self.features_info['numeric_features'] + self.features_info['categorical_features']
-                for col in all_features:
-                    if col not in df_input.columns:
-                        df_input[col] = np.nan
-
-                # Reorder columns to match training order (optional but good practice)
-                df_input = df_input[all_features]
-
-            # Get predictions
-            predictions = self.model.predict(df_input)
-            probabilities = self.model.predict_proba(df_input)
-            classes = self.model.classes_
-
-            results = []
-            for i, pred in enumerate(predictions):
-                prob_dict = {classes[j]: float(probabilities[i][j]) for j in range(len(classes))}
-                confidence = float(np.max(probabilities[i]))
-                results.append({
-                    "decision": str(pred),
-                    "confidence": confidence,
-                    "all_probabilities": prob_dict
-                })
-            
+            start = time.perf_counter()
+            records = [data] if isinstance(data, dict) else list(data)
+            self.observe_drift(records)
+            keys, results, missing = self._cache_lookup(current, records)
+            if missing:
+                fresh = self._score_records(current, [records[i] for i in missing])
+                self._cache_fill(keys, results, missing, fresh)
+
+            if self._shadow is not None:
+                self._maybe_shadow(records, results, (time.perf_counter() - start) * 1000)
             return results
         except Exception as e:
             print(f"[Miqyas] Prediction error: {e}")
@@ -102,57 +312,387 @@ class RiskModelService:
                 "all_probabilities": {}
             }]
 
+    async def apredict(self, data, score):
+        """
+        predict() for the async server: the same drift tracking, result cache
+        and shadow scoring, but cache misses are scored by
+        `await score(model, records)` (e.g. in a process pool) instead of the
+        coalescer. Errors are raised rather than returned as result rows.
+        """
+        current = self._current
+        if not current.loaded:
+            raise RuntimeError("Model not loaded")
+        start = time.perf_counter()
+        records = [data] if isinstance(data, dict) else list(data)
+        self.observe_drift(records)
+        keys, results, missing = self._cache_lookup(current, records)
+        if missing:
+            fresh = await score(current, [records[i] for i in missing])
+            self._cache_fill(keys, results, missing, fresh)
+        if self._shadow is not None:
+            self._maybe_shadow(records, results, (time.perf_counter() - start) * 1000)
+        return results
+
+    def _cache_lookup(self, current, records):
+        """(keys, results, missing): cached results per record, None where `missing` still needs scoring."""
+        if self.cache is None or not current.features_info:
+            return None, [None] * len(records), list(range(len(records)))
+        keys = [
+            PredictionCache.make_key(current.fingerprint, r, current.features_info['numeric_features'],
+                                     current.features_info['categorical_features'])
+            for r in records
+        ]
+        results = [self.cache.get(k) for k in keys]
+        return keys, results, [i for i, r in enumerate(results) if r is None]
+
+    def _cache_fill(self, keys, results, missing, fresh):
+        for i, result in zip(missing, fresh):
+            results[i] = result
+        if keys is not None:
+            self.cache.put_many([(keys[i], results[i]) for i in missing])
+
+    def predict_matrix(self, data):
+        """
+        Dense variant of predict(): (labels, probabilities) with one row per
+        record, for the compact response formats. Skips the per-row result
+        cache and the coalescer, which only pay off for small requests.
+        """
+        current = self._current
+        if not current.loaded:
+            raise RuntimeError("Model not loaded")
+        records = [data] if isinstance(data, dict) else list(data)
+        self.observe_drift(records)
+        with span('miqyas.build_frame'):
+            frame = _records_frame(records)
+        return current.score_matrix(frame)
+
+    def _score_records(self, current, records):
+        # Small requests wait briefly for neighbours and are scored together
+        if self.coalescer and len(records) < self.coalescer.max_batch:
+            return self.coalescer.submit(records, key=current)
+        with span('miqyas.build_frame'):
+            frame = _records_frame(records)
+        return current.score_frame(frame)
+
+    def enable_cache(self, max_entries=10000, ttl_seconds=None, disk_path=None):
+        """Cache predict() results per aligned feature vector and model fingerprint."""
+        self.cache = PredictionCache(max_entries=max_entries, ttl_seconds=ttl_seconds, disk_path=disk_path)
+        print(f"[Miqyas] Prediction cache enabled: {max_entries} entries, TTL {ttl_seconds}s, disk {disk_path}.")
+
+    def enable_coalescing(self, window_ms=2.0, max_batch=64):
+        """Route small predict() calls through a micro-batching coalescer."""
+        # Batches are keyed by the model each caller captured, so a request that
+        # straddles a hot-swap is scored by the model its cache key names.
+        self.coalescer = PredictionCoalescer(
+            lambda records, model: model.score_frame(_records_frame(records)),
+            window_ms=window_ms, max_batch=max_batch,
+        )
+        print(f"[Miqyas] Coalescing enabled: window {window_ms} ms, max batch {max_batch} rows.")
+
+    def enable_drift_monitoring(self, window_rows=10000, min_rows=200, max_rows_per_request=256):
+        """Track input quality and feature drift of predict() traffic against the model's training baseline."""
+        self._drift_settings = {"window_rows": window_rows, "min_rows": min_rows,
+                                "max_rows_per_request": max_rows_per_request}
+        self.drift = self._new_drift_monitor(self._current)
+        print(f"[Miqyas] Drift monitoring enabled: window {window_rows} rows, "
+              f"baseline {'loaded' if self._current.drift_baseline else 'missing'}.")
+
+    def _new_drift_monitor(self, model):
+        if self._drift_settings is None or not model.features_info:
+            return None
+        return DriftMonitor(model.features_info, model.drift_baseline, model.version, **self._drift_settings)
+
+    def observe_drift(self, records):
+        drift = self.drift
+        if drift is not None:
+            with span('miqyas.drift_observe'):
+                drift.observe(records)
+
+    def drift_report(self):
+        return self.drift.report() if self.drift is not None else None
+
+    def predict_batch(self, frames):
+        """
+        Score an iterable of DataFrame chunks (see services/miqyas_batch.py).
+        Yields one list of result dicts per chunk so that callers can stream
+        results out without holding the whole batch in memory.
+        """
+        current = self._current
+        if not current.loaded:
+            raise RuntimeError("Model not loaded")
+
+        for df_chunk in frames:
+            if len(df_chunk):
+                yield current.score_frame(df_chunk)
+
+    # ── Hot swap ───────────────────────────────────────────
+    def _set_current(self, model):
+        # Drift is measured against the serving model's own baseline, so a swap starts a fresh monitor
+        self.drift = self._new_drift_monitor(model)
+        self._current = model
+
+    def _load_in_background(self, version, on_loaded, wait):
+        """Load `version` off the request path, then hand it to `on_loaded`."""
+        directory = self.registry.version_dir(version)  # KeyError for unknown versions
+        if not self._reload_lock.acquire(blocking=False):
+            raise RuntimeError(f"Model load already in progress ({self.reload_state['version']})")
+        self.reload_state = {"state": "loading", "version": version, "error": None, "started_at": time.time()}
+
+        def load():
+            try:
+                candidate = LoadedModel(directory, self.use_compiled, version=version)
+                if not candidate.loaded:
+                    raise RuntimeError(f"Version {version} has no loadable model")
+                candidate.warm_up()
+                on_loaded(candidate)
+                self.reload_state = {"state": "ready", "version": version, "error": None,
+                                     "finished_at": time.time()}
+            except Exception as e:
+                print(f"[Miqyas] Loading version {version} failed: {e}")
+                self.reload_state = {"state": "failed", "version": version, "error": str(e),
+                                     "finished_at": time.time()}
+            finally:
+                self._reload_lock.release()
+
+        thread = threading.Thread(target=load, name=f"miqyas-load-{version}", daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+        return dict(self.reload_state)
+
+    def _activate(self, candidate, rollback=False):
+        previous = self._current.version
+        self._set_current(candidate)  # atomic pointer swap; in-flight requests keep the old model
+        if rollback:
+            self.registry.complete_rollback(candidate.version)
+        else:
+            self.registry.activate(candidate.version)
+        print(f"[Miqyas] Now serving version {candidate.version} (was {previous}).")
+
+    def promote(self, version, wait=False):
+        """Load a registry version in the background and switch traffic to it."""
+        return self._load_in_background(version, self._activate, wait)
+
+    def rollback(self, wait=False):
+        target = self.registry.rollback_target()
+        if target is None:
+            raise KeyError("No previous version to roll back to")
+        return self._load_in_background(target, lambda m: self._activate(m, rollback=True), wait)
+
+    def reload_if_changed(self):
+        """Pick up a version activated by someone else (e.g. the training CLI)."""
+        active = self.registry.active_version()
+        if active and active != self._current.version and not self._reload_lock.locked():
+            print(f"[Miqyas] Registry now points at {active}; loading it.")
+            self._load_in_background(active, self._set_current, wait=False)
+
+    def watch_registry(self, interval_seconds=10.0):
+        def loop():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    print(f"[Miqyas] Registry check failed: {e}")
+
+        threading.Thread(target=loop, name='miqyas-registry-watch', daemon=True).start()
+
+    # ── Shadow mode ────────────────────────────────────────
+    def set_shadow(self, version, sample_rate=0.1, wait=False):
+        """Score `sample_rate` of predict() traffic on `version` too, off the request path."""
+        def attach(candidate):
+            if self._shadow_pool is None:
+                self._shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='miqyas-shadow')
+            self.shadow_stats = ShadowStats(version, sample_rate)
+            self._shadow = candidate
+            self.registry.set_shadow(version, sample_rate)
+            print(f"[Miqyas] Shadowing version {version} on {sample_rate:.0%} of traffic.")
+
+        return self._load_in_background(version, attach, wait)
+
+    def clear_shadow(self):
+        self._shadow = None
+        self.registry.set_shadow(None)
+        return self.shadow_stats.stats() if self.shadow_stats else None
+
+    def _maybe_shadow(self, records, results, primary_ms):
+        shadow, stats = self._shadow, self.shadow_stats
+        if shadow is None or random.random() >= stats.sample_rate:
+            return
+        if not self._shadow_slots.acquire(blocking=False):
+            stats.dropped += 1
+            return
+        self._shadow_pool.submit(self._run_shadow, shadow, stats, records, results, primary_ms)
+
+    def _run_shadow(self, shadow, stats, records, results, primary_ms):
+        try:
+            start = time.perf_counter()
+            shadow_results = shadow.score_frame(_records_frame(records))
+            stats.record(records, results, shadow_results, primary_ms, (time.perf_counter() - start) * 1000)
+        except Exception as e:
+            stats.errors += 1
+            print(f"[Miqyas] Shadow scoring failed: {e}")
+        finally:
+            self._shadow_slots.release()
+
+    def models_status(self):
+        return {
+            "active": self._current.version,
+            "engine": self._current.engine,
+            "loaded_at": self._current.loaded_at,
+            "reload": self.reload_state,
+            "shadow": self.shadow_stats.stats() if self._shadow is not None and self.shadow_stats else None,
+            "history": self.registry.manifest().get("history", []),
+            "versions": self.registry.list_versions(),
+        }
+
     def get_status(self):
         return {
             "model_loaded": self.model_loaded,
+            "engine": self.engine,
+            "model_version": self.model_version,
             "numeric_features_count": len(self.features_info['numeric_features']) if self.features_info else 0,
-            "categorical_features_count": len(self.features_info['categorical_features']) if self.features_info else 0
+            "categorical_features_count": len(self.features_info['categorical_features']) if self.features_info else 0,
+            "model_fingerprint": self.model_fingerprint,
+            "coalescer": self.coalescer.stats() if self.coalescer else None,
+            "cache": self.cache.stats() if self.cache else None,
+            "shadow": self.shadow_stats.stats() if self._shadow is not None and self.shadow_stats else None,
         }
 
+    def _llm(self):
+        if self.llm is None:
+            self.llm = LLMGateway.from_env()
+        return self.llm
+
     def deep_analyze(self, data):
         """
-        Send all fetched / input data to OpenAI for deep pattern and discrepancy analysis.
+        Send all fetched / input data to the LLM for deep pattern and discrepancy analysis.
         """
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
+        if not self._llm().configured:
+            return self._llm_not_configured()
+
+        try:
+            response = self.llm.complete(DEEP_ANALYSIS_PROMPT, data, DEEP_ANALYSIS_PROMPT_VERSION, temperature=0.3)
+            return self._analysis_result(response)
+        except Exception as e:
+            print(f"[Miqyas AI] Analysis error: {e}")
             return {
                 "status": "error",
-                "message": "OpenAI API Key not configured in .env"
+                "message": str(e)
             }
 
-        try:
-            client = OpenAI(api_key=api_key)
-            
-            # Prepare the data as JSON string for the prompt
-            data_json = json.dumps(data, indent=2)
+    async def adeep_analyze(self, data):
+        """deep_analyze for async servers: awaits the gateway instead of blocking a thread."""
+        if not self._llm().configured:
+            return self._llm_not_configured()
 
-            system_prompt = """You are a senior credit risk analyst and discrepancy detection engine. 
-Analyze the following loan application data (JSON format) to identify hidden patterns, discrepancies, and red flags.
-
-Return your response EXCLUSIVELY as a structured Markdown Table with no preceding or trailing text.
-The table MUST have exactly these columns:
-| Type (Discrepancy/Red Flag) | Details | Risk Level (High/Medium) |
-
-Only output the Markdown table. Do NOT use bullet points or any other formats and make your response short as possible.
-"""
-
-            response = client.chat.completions.create(
-                model="gpt-5.2",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": data_json}
-                ],
-                temperature=0.3
-            )
-
-            return {
-                "status": "success",
-                "analysis": response.choices[0].message.content,
-                "model_used": "GPT-5.2 (Premium Risk Analysis)"
-            }
+        try:
+            response = await self.llm.acomplete(DEEP_ANALYSIS_PROMPT, data, DEEP_ANALYSIS_PROMPT_VERSION,
+                                                temperature=0.3)
+            return self._analysis_result(response)
         except Exception as e:
             print(f"[Miqyas AI] Analysis error: {e}")
             return {
                 "status": "error",
                 "message": str(e)
             }
+
+    @staticmethod
+    def _llm_not_configured():
+        return {
+            "status": "error",
+            "message": "OpenAI API Key not configured in .env"
+        }
+
+    @staticmethod
+    def _analysis_result(response):
+        return {
+            "status": "success",
+            "analysis": response["content"],
+            "model_used": "GPT-5.2 (Premium Risk Analysis)",
+            "cached": response["cached"],
+        }
+
+    def deep_analyze_portfolio(self, applications, threshold=0.5, max_concurrency=None):
+        """
+        Score a list of applications in one pass, then deep-analyze only the
+        cases whose risk score (1 - P(Approved)) is at or above `threshold`.
+
+        Yields {"type": "case", ...} events — unflagged cases first, flagged
+        cases as their analyses finish — and then one {"type": "report", ...}.
+        """
+        if not self.model_loaded:
+            raise RuntimeError("Model not loaded")
+        start = time.perf_counter()
+        predictions = self.predict(applications)
+        failed = next((p for p in predictions if str(p.get("decision", "")).startswith("Error")), None)
+        if failed is not None or len(predictions) != len(applications):
+            raise RuntimeError((failed or predictions[0])["decision"])
+        score_ms = (time.perf_counter() - start) * 1000
+
+        flagged = []
+        for row, prediction in enumerate(predictions):
+            risk = round(1.0 - prediction["all_probabilities"].get(APPROVED_LABEL, 0.0), 6)
+            case = {"type": "case", "row": row, "risk_score": risk, "flagged": risk >= threshold,
+                    "prediction": prediction}
+            if case["flagged"]:
+                flagged.append(case)
+            else:
+                yield case
+
+        counts = {"analyzed": 0, "failed": 0, "cached": 0}
+        latencies = []
+        analysis_start = time.perf_counter()
+        llm = self._llm()
+        if flagged and not llm.configured:
+            for case in flagged:
+                counts["failed"] += 1
+                yield {**case, "analysis": None, "error": "OpenAI API Key not configured in .env"}
+        elif flagged:
+            # A sliding window of `max_concurrency` requests, so a large portfolio
+            # can't take every gateway slot from interactive callers.
+            window = max(1, min(max_concurrency or llm.max_concurrency, llm.max_concurrency))
+            queue = iter(flagged)
+            running = {}
+
+            def submit_next():
+                case = next(queue, None)
+                if case is not None:
+                    future = llm.submit(DEEP_ANALYSIS_PROMPT, applications[case["row"]],
+                                        DEEP_ANALYSIS_PROMPT_VERSION, temperature=0.3)
+                    running[future] = case
+
+            for _ in range(window):
+                submit_next()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    case = running.pop(future)
+                    submit_next()
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        counts["failed"] += 1
+                        yield {**case, "analysis": None, "error": str(e)}
+                        continue
+                    counts["analyzed"] += 1
+                    counts["cached"] += response["cached"]
+                    latencies.append(response["latency_ms"])
+                    yield {**case, "analysis": response["content"], "cached": response["cached"],
+                           "latency_ms": round(response["latency_ms"], 2)}
+
+        analysis_ms = (time.perf_counter() - analysis_start) * 1000
+        yield {
+            "type": "report",
+            "total_cases": len(predictions),
+            "flagged": len(flagged),
+            **counts,
+            "threshold": threshold,
+            "timings_ms": {
+                "score": round(score_ms, 2),
+                "deep_analysis": round(analysis_ms, 2),
+                "total": round((time.perf_counter() - start) * 1000, 2),
+                "analysis_p50": round(float(np.percentile(latencies, 50)), 2) if latencies else None,
+                "analysis_max": round(max(latencies), 2) if latencies else None,
+            },
+        }
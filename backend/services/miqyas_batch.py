@@ -0,0 +1,84 @@
+"""
+miqyas_batch.py — Batch Input Readers for Miqyas
+─────────────────────────────────────────────────
+Turns the payloads accepted by /api/miqyas/predict-batch into an iterator of
+DataFrame chunks, so RiskModelService.predict_batch never has to materialise
+a whole portfolio at once.
+
+Supported inputs:
+  - Columnar JSON   { "age": [..], "gender": [..], ... }
+  - CSV             text/csv body or multipart upload
+  - Arrow IPC       application/vnd.apache.arrow.stream (requires pyarrow)
+"""
+
+DEFAULT_CHUNK_SIZE = 5000
+
+CSV_TYPES = ('text/csv', 'application/csv')
+ARROW_STREAM_TYPES = ('application/vnd.apache.arrow.stream',)
+ARROW_FILE_TYPES = ('application/vnd.apache.arrow.file',)
+
+
+def frames_from_columns(columns: dict, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Slice a columnar JSON payload into DataFrame chunks.
+    Every column must be a list of the same length.
+    """
+    if not isinstance(columns, dict) or not columns:
+        raise ValueError("Columnar payload must be a non-empty object of column -> list")
+
+    lengths = {len(v) if isinstance(v, list) else -1 for v in columns.values()}
+    if len(lengths) != 1 or -1 in lengths:
+        raise ValueError("All columns must be lists of the same length")
+
+    return _slice_columns(columns, lengths.pop(), chunk_size)
+
+
+def _slice_columns(columns, n_rows, chunk_size):
+    import pandas as pd
+    for start in range(0, n_rows, chunk_size):
+        yield pd.DataFrame({k: v[start:start + chunk_size] for k, v in columns.items()})
+
+
+def frames_from_csv(stream, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Read a CSV file-like object incrementally."""
+    import pandas as pd
+    return pd.read_csv(stream, chunksize=chunk_size)
+
+
+def frames_from_arrow(stream, chunk_size: int = DEFAULT_CHUNK_SIZE, file_format: bool = False):
+    """
+    Read Arrow IPC record batch by record batch.
+    The stream format is read forward-only; the file format needs a seekable source.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ValueError("Arrow uploads require pyarrow (pip install pyarrow)")
+
+    if file_format:
+        reader = pa.ipc.open_file(stream)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        batches = pa.ipc.open_stream(stream)
+    return _slice_arrow(batches, chunk_size)
+
+
+def _slice_arrow(batches, chunk_size):
+    for batch in batches:
+        for start in range(0, batch.num_rows, chunk_size):
+            yield batch.slice(start, chunk_size).to_pandas()
+
+
+def frames_from_upload(stream, content_type: str = '', filename: str = '',
+                       chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Pick a reader from the upload's content type or file extension."""
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    filename = (filename or '').lower()
+
+    if content_type in ARROW_STREAM_TYPES or filename.endswith('.arrows'):
+        return frames_from_arrow(stream, chunk_size)
+    if content_type in ARROW_FILE_TYPES or filename.endswith(('.arrow', '.feather')):
+        return frames_from_arrow(stream, chunk_size, file_format=True)
+    if content_type in CSV_TYPES or filename.endswith('.csv'):
+        return frames_from_csv(stream, chunk_size)
+    raise ValueError(f"Unsupported batch format: {content_type or filename or 'unknown'}")
@@ -0,0 +1,115 @@
+"""
+miqyas_encoding.py — Compact Response Formats for Miqyas
+─────────────────────────────────────────────────────────
+The default /api/predict response repeats every class label in a dict per
+row. For large batches that costs more to build and serialise than scoring
+itself, so clients can ask (Accept header, or ?format=) for a dense form:
+labels once, probabilities as a row-major n_rows × n_classes array.
+
+  application/json                        default, unchanged shape
+  application/vnd.miqyas.compact+json     {"labels", "shape", "decision", "probabilities"}   ?format=compact
+  application/x-ndjson                    header line, then one probability row per line    ?format=ndjson
+  application/msgpack                     compact fields; probabilities as float64 LE bytes ?format=msgpack
+  application/vnd.apache.arrow.stream     Arrow IPC: decision (dictionary) + probabilities  ?format=arrow
+                                          (fixed-size list); labels in the schema metadata
+
+"decision" is the argmax class index per row; the confidence is that row's
+probability at the index. msgpack and pyarrow are optional.
+"""
+
+import json
+
+JSON = 'application/json'
+COMPACT_JSON = 'application/vnd.miqyas.compact+json'
+NDJSON = 'application/x-ndjson'
+MSGPACK = 'application/msgpack'
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+
+# Offer order: JSON first, so "*/*" and missing Accept headers keep the default.
+RESPONSE_TYPES = (JSON, COMPACT_JSON, NDJSON, MSGPACK, 'application/x-msgpack', ARROW_STREAM)
+FORMATS = {'json': JSON, 'compact': COMPACT_JSON, 'ndjson': NDJSON, 'msgpack': MSGPACK, 'arrow': ARROW_STREAM}
+
+NDJSON_CHUNK_ROWS = 10000
+
+
+def negotiate(accept_header: str = None, format_param: str = None) -> str:
+    """
+    Pick the response type; ?format= wins over Accept. An Accept header that
+    matches nothing gets the default JSON, as before; an unknown ?format= is a ValueError.
+    """
+    if format_param:
+        if format_param not in FORMATS:
+            raise ValueError(f"Unknown format '{format_param}'; expected one of {', '.join(FORMATS)}")
+        return FORMATS[format_param]
+    if not accept_header:
+        return JSON
+    from werkzeug.datastructures import MIMEAccept
+    from werkzeug.http import parse_accept_header
+    match = parse_accept_header(accept_header, MIMEAccept).best_match(RESPONSE_TYPES, default=JSON)
+    return MSGPACK if match == 'application/x-msgpack' else match
+
+
+def encode(mimetype: str, labels, probabilities):
+    """Body for a non-default response type: bytes, or an iterator of str for NDJSON."""
+    if mimetype == COMPACT_JSON:
+        return encode_compact_json(labels, probabilities)
+    if mimetype == NDJSON:
+        return encode_ndjson(labels, probabilities)
+    if mimetype == MSGPACK:
+        return encode_msgpack(labels, probabilities)
+    if mimetype == ARROW_STREAM:
+        return encode_arrow(labels, probabilities)
+    raise ValueError(f"No dense encoder for {mimetype}")
+
+
+def encode_compact_json(labels, probabilities) -> bytes:
+    return json.dumps({
+        "labels": labels,
+        "shape": list(probabilities.shape),
+        "decision": probabilities.argmax(axis=1).tolist(),
+        "probabilities": probabilities.ravel().tolist(),
+    }, separators=(',', ':')).encode()
+
+
+def encode_ndjson(labels, probabilities, chunk_rows: int = NDJSON_CHUNK_ROWS):
+    yield json.dumps({"labels": labels, "shape": list(probabilities.shape)}) + '\n'
+    for start in range(0, len(probabilities), chunk_rows):
+        # One dumps per chunk: "[[a,b],[c,d]]" → "[a,b]\n[c,d]\n"
+        rows = json.dumps(probabilities[start:start + chunk_rows].tolist(), separators=(',', ':'))
+        yield rows[1:-1].replace('],[', ']\n[') + '\n'
+
+
+def encode_msgpack(labels, probabilities) -> bytes:
+    try:
+        import msgpack
+    except ImportError:
+        raise ValueError("MessagePack responses require msgpack (pip install msgpack)")
+    return msgpack.packb({
+        "labels": labels,
+        "shape": list(probabilities.shape),
+        "decision": probabilities.argmax(axis=1).tolist(),
+        "dtype": "<f8",
+        "probabilities": probabilities.astype('<f8', copy=False).tobytes(),
+    })
+
+
+def encode_arrow(labels, probabilities) -> bytes:
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ValueError("Arrow responses require pyarrow (pip install pyarrow)")
+    n_rows, n_classes = probabilities.shape
+    decision = pa.DictionaryArray.from_arrays(
+        pa.array(probabilities.argmax(axis=1).astype('int32')), pa.array(labels, type=pa.string()))
+    values = pa.array(probabilities.astype('float64', copy=False).ravel())
+    batch = pa.record_batch(
+        [decision, pa.FixedSizeListArray.from_arrays(values, n_classes)],
+        schema=pa.schema(
+            [('decision', decision.type), ('probabilities', pa.list_(pa.float64(), n_classes))],
+            metadata={'labels': json.dumps(labels)},
+        ),
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,136 @@
+"""
+model_registry.py — Miqyas Model Registry
+──────────────────────────────────────────
+Versioned model artifacts plus a small manifest saying which one is live.
+
+  models/
+    registry.json                  {"active", "history", "shadow"}
+    versions/<version>/
+      loan_risk_model.joblib
+      features_info.joblib
+      loan_risk_model.compiled/
+      metrics.json                 (written by model_training.py)
+
+The training CLI adds versions and activates them; RiskModelService loads
+the active version, and promote / rollback / shadow changes go through here
+once the service has the new model loaded.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+
+MANIFEST_FILE = 'registry.json'
+VERSIONS_DIR = 'versions'
+MODEL_FILE = 'loan_risk_model.joblib'
+FEATURES_FILE = 'features_info.joblib'
+METRICS_FILE = 'metrics.json'
+DRIFT_BASELINE_FILE = 'drift_baseline.json'
+HISTORY_LIMIT = 20
+
+
+class ModelRegistry:
+    def __init__(self, models_dir: str):
+        self.models_dir = models_dir
+        self.versions_dir = os.path.join(models_dir, VERSIONS_DIR)
+        self.manifest_path = os.path.join(models_dir, MANIFEST_FILE)
+        self._lock = threading.Lock()
+
+    # ── Manifest ───────────────────────────────────────────
+    def manifest(self) -> dict:
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"active": None, "history": [], "shadow": None}
+
+    def _write(self, manifest):
+        manifest["updated_at"] = time.time()
+        os.makedirs(self.models_dir, exist_ok=True)
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def manifest_mtime(self):
+        try:
+            return os.path.getmtime(self.manifest_path)
+        except OSError:
+            return None
+
+    # ── Versions ───────────────────────────────────────────
+    def version_dir(self, version: str) -> str:
+        """Artifact directory for a version; KeyError if it does not exist."""
+        if not re.fullmatch(r'[A-Za-z0-9._-]+', version or '') or version.startswith('.'):
+            raise KeyError(f"Unknown model version: {version}")
+        path = os.path.join(self.versions_dir, version)
+        if not os.path.exists(os.path.join(path, MODEL_FILE)):
+            raise KeyError(f"Unknown model version: {version}")
+        return path
+
+    def list_versions(self) -> list:
+        manifest = self.manifest()
+        versions = []
+        if os.path.isdir(self.versions_dir):
+            for version in sorted(os.listdir(self.versions_dir), reverse=True):
+                path = os.path.join(self.versions_dir, version)
+                if not os.path.exists(os.path.join(path, MODEL_FILE)):
+                    continue
+                metrics = {}
+                if os.path.exists(os.path.join(path, METRICS_FILE)):
+                    with open(os.path.join(path, METRICS_FILE)) as f:
+                        metrics = json.load(f)
+                versions.append({
+                    "version": version,
+                    "created_at": os.path.getmtime(os.path.join(path, MODEL_FILE)),
+                    "rows": metrics.get("rows"),
+                    "params": metrics.get("params"),
+                    "test": metrics.get("test"),
+                    "active": version == manifest.get("active"),
+                    "shadow": version == (manifest.get("shadow") or {}).get("version"),
+                })
+        return versions
+
+    def active_version(self):
+        return self.manifest().get("active")
+
+    # ── Changes ────────────────────────────────────────────
+    def activate(self, version: str):
+        """Make `version` live, remembering the previous one for rollback."""
+        self.version_dir(version)
+        with self._lock:
+            manifest = self.manifest()
+            previous = manifest.get("active")
+            if previous and previous != version:
+                manifest["history"] = (manifest.get("history", []) + [previous])[-HISTORY_LIMIT:]
+            manifest["active"] = version
+            self._write(manifest)
+
+    def rollback_target(self):
+        """The most recent previously-active version that still exists, or None."""
+        manifest = self.manifest()
+        for version in reversed(manifest.get("history", [])):
+            if version != manifest.get("active") and os.path.isdir(os.path.join(self.versions_dir, version)):
+                return version
+        return None
+
+    def complete_rollback(self, version: str):
+        """Make `version` live and drop it (and anything after it) from the history."""
+        with self._lock:
+            manifest = self.manifest()
+            history = manifest.get("history", [])
+            if version in history:
+                history = history[:len(history) - 1 - history[::-1].index(version)]
+            manifest["history"] = history
+            manifest["active"] = version
+            self._write(manifest)
+
+    def set_shadow(self, version, sample_rate: float = None):
+        with self._lock:
+            manifest = self.manifest()
+            if not version and not manifest.get("shadow"):
+                return
+            manifest["shadow"] = {"version": version, "sample_rate": sample_rate} if version else None
+            self._write(manifest)
@@ -0,0 +1,314 @@
+"""
+model_training.py — Miqyas Training Pipeline
+─────────────────────────────────────────────
+Trains the loan risk model from a spreadsheet / CSV, without re-parsing the
+source on every run:
+
+  1. Load:     the source is converted once into a columnar cache (one .npy
+               per column; categoricals dictionary-encoded) keyed by the
+               source's size + mtime, with dtypes inferred in that one pass.
+               Later runs memory-map the cache instead of reading Excel.
+               Only numeric and text columns become features, as before.
+  2. Search:   every (hyperparameter candidate × CV fold) fit runs as its own
+               job across all cores.
+  3. Fit:      the best candidate is refit on the training split and scored
+               on the held-out test split.
+  4. Publish:  artifacts are written to models/versions/<version>/ with a
+               metrics.json and a drift_baseline.json (training-split feature
+               distributions for drift_monitor.py), and the version is activated in the model
+               registry (see model_registry.py).
+
+CLI (from backend/):
+  python -m services.model_training --source dataset/aafaq.xlsx
+  python -m services.model_training --source data.csv --n-estimators 100,300 --max-depth none,24 --folds 5
+"""
+
+import argparse
+import importlib.util
+import itertools
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from services.compiled_model import COMPILED_BUNDLE_DIR, export_compiled_model
+from services.drift_monitor import build_baseline, save_baseline
+from services.model_registry import (DRIFT_BASELINE_FILE, FEATURES_FILE, METRICS_FILE, MODEL_FILE, VERSIONS_DIR,
+                                     ModelRegistry)
+from services.prediction_cache import model_fingerprint
+
+TARGET = 'decision'
+DROP_COLUMNS = ['customer_id', 'national_id', 'application_time', 'pd12_estimate', 'default_12m_flag']
+
+
+def build_pipeline(numeric_features, categorical_features, n_jobs=-1, **forest_params):
+    """The Miqyas pipeline: median-impute + scale numerics, one-hot categoricals, random forest."""
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    preprocessor = ColumnTransformer(transformers=[
+        ('num', Pipeline(steps=[
+            ('imputer', SimpleImputer(strategy='median')),
+            ('scaler', StandardScaler()),
+        ]), numeric_features),
+        ('cat', Pipeline(steps=[
+            ('imputer', SimpleImputer(strategy='constant', fill_value='missing')),
+            ('onehot', OneHotEncoder(handle_unknown='ignore')),
+        ]), categorical_features),
+    ])
+    params = {'n_estimators': 100, 'random_state': 42, **forest_params}
+    return Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('classifier', RandomForestClassifier(n_jobs=n_jobs, **params)),
+    ])
+
+
+# ── Columnar cache ─────────────────────────────────────────
+def _read_source(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.xlsx', '.xls', '.xlsm'):
+        # python-calamine is a Rust reader, far faster than openpyxl
+        if importlib.util.find_spec('python_calamine') is not None:
+            return pd.read_excel(path, engine='calamine')
+        return pd.read_excel(path)
+    if ext == '.parquet':
+        return pd.read_parquet(path)
+    return pd.read_csv(path, low_memory=False)
+
+
+def _write_cache(df, cache_dir):
+    staging = cache_dir + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    columns = []
+    for i, name in enumerate(df.columns):
+        col = df[name]
+        entry = {"name": str(name), "file": f"col{i:04d}.npy"}
+        if pd.api.types.is_bool_dtype(col) or pd.api.types.is_datetime64_any_dtype(col):
+            # Kept as-is; like the original script, they are not model features
+            entry["kind"] = "raw"
+            np.save(os.path.join(staging, entry["file"]), col.to_numpy())
+        elif pd.api.types.is_numeric_dtype(col):
+            entry["kind"] = "numeric"
+            np.save(os.path.join(staging, entry["file"]), col.to_numpy(dtype=np.float64, na_value=np.nan))
+        else:
+            # Dictionary-encode: int32 codes (-1 = missing) + the category list
+            codes, categories = pd.factorize(col.astype(object).where(col.notna(), None), use_na_sentinel=True)
+            entry["kind"] = "categorical"
+            entry["categories"] = [str(c) for c in categories]
+            np.save(os.path.join(staging, entry["file"]), codes.astype(np.int32))
+        columns.append(entry)
+    with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+        json.dump({"rows": len(df), "columns": columns}, f)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(staging, cache_dir)
+
+
+def _read_cache(cache_dir):
+    with open(os.path.join(cache_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+    data = {}
+    for entry in manifest["columns"]:
+        values = np.load(os.path.join(cache_dir, entry["file"]), mmap_mode='r')
+        if entry["kind"] in ("numeric", "raw"):
+            data[entry["name"]] = values
+        else:
+            categories = np.array(entry["categories"] + [np.nan], dtype=object)
+            data[entry["name"]] = categories[values]  # code -1 picks the trailing NaN
+    return pd.DataFrame(data)
+
+
+def load_dataset(source: str, cache_root: str = None):
+    """DataFrame for `source`, via the columnar cache. Returns (df, cache_hit)."""
+    cache_root = cache_root or os.path.join(os.path.dirname(os.path.abspath(source)), '.columnar')
+    cache_dir = os.path.join(cache_root, model_fingerprint(source))
+    if os.path.exists(os.path.join(cache_dir, 'manifest.json')):
+        return _read_cache(cache_dir), True
+    df = _read_source(source)
+    os.makedirs(cache_root, exist_ok=True)
+    _write_cache(df, cache_dir)
+    return _read_cache(cache_dir), False
+
+
+def split_features(df):
+    """Drop ID/leakage columns and split into X, y and features_info."""
+    df = df[df[TARGET].notna()]
+    X = df.drop(columns=[c for c in DROP_COLUMNS + [TARGET] if c in df.columns])
+    features_info = {
+        'numeric_features': X.select_dtypes(include='number').columns.tolist(),
+        'categorical_features': X.select_dtypes(include='object').columns.tolist(),
+    }
+    return X, df[TARGET].astype(str), features_info
+
+
+# ── Search ─────────────────────────────────────────────────
+def _fit_fold(features_info, params, X, y, train_idx, test_idx):
+    from sklearn.metrics import accuracy_score, f1_score
+
+    pipeline = build_pipeline(features_info['numeric_features'], features_info['categorical_features'],
+                              n_jobs=1, **params)
+    pipeline.fit(X.iloc[train_idx], y.iloc[train_idx])
+    predicted = pipeline.predict(X.iloc[test_idx])
+    return {
+        "accuracy": accuracy_score(y.iloc[test_idx], predicted),
+        "f1_macro": f1_score(y.iloc[test_idx], predicted, average='macro'),
+    }
+
+
+def search(X, y, features_info, candidates, folds=5, n_jobs=-1, metric='f1_macro'):
+    """Cross-validate every candidate; all (candidate, fold) fits run in parallel."""
+    from sklearn.model_selection import StratifiedKFold
+
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=42).split(X, y))
+    tasks = list(itertools.product(range(len(candidates)), range(len(splits))))
+    scores = joblib.Parallel(n_jobs=n_jobs)(
+        joblib.delayed(_fit_fold)(features_info, candidates[c], X, y, *splits[f]) for c, f in tasks
+    )
+    results = []
+    for c, params in enumerate(candidates):
+        fold_scores = [s for (tc, _), s in zip(tasks, scores) if tc == c]
+        results.append({
+            "params": params,
+            **{name: float(np.mean([s[name] for s in fold_scores])) for name in ("accuracy", "f1_macro")},
+            f"{metric}_std": float(np.std([s[metric] for s in fold_scores])),
+        })
+    results.sort(key=lambda r: r[metric], reverse=True)
+    return results
+
+
+def parse_candidates(n_estimators='100', max_depth='none', min_samples_leaf='1'):
+    def values(spec, cast):
+        return [None if v.strip().lower() == 'none' else cast(v) for v in str(spec).split(',')]
+
+    grid = itertools.product(values(n_estimators, int), values(max_depth, int), values(min_samples_leaf, int))
+    return [{"n_estimators": n, "max_depth": d, "min_samples_leaf": leaf} for n, d, leaf in grid]
+
+
+# ── Artifacts ──────────────────────────────────────────────
+def publish_version(models_dir: str, version: str):
+    """
+    Activate a trained version in the registry (running servers hot-swap to
+    it) and copy its artifacts to models/ for tools that read them directly.
+    """
+    version_dir = os.path.join(models_dir, VERSIONS_DIR, version)
+    for name in (FEATURES_FILE, MODEL_FILE, DRIFT_BASELINE_FILE):
+        if not os.path.exists(os.path.join(version_dir, name)):
+            continue
+        tmp = os.path.join(models_dir, name + '.tmp')
+        shutil.copyfile(os.path.join(version_dir, name), tmp)
+        os.replace(tmp, os.path.join(models_dir, name))
+    # Export last so the compiled bundle is never older than the joblib model
+    pipeline = joblib.load(os.path.join(models_dir, MODEL_FILE))
+    features_info = joblib.load(os.path.join(models_dir, FEATURES_FILE))
+    export_compiled_model(pipeline, features_info, os.path.join(models_dir, COMPILED_BUNDLE_DIR))
+    ModelRegistry(models_dir).activate(version)
+
+
+def train(source: str, models_dir: str, candidates=None, folds: int = 5, test_size: float = 0.2,
+          n_jobs: int = -1, cache_root: str = None, publish: bool = True) -> dict:
+    from sklearn.metrics import accuracy_score, classification_report, f1_score
+    from sklearn.model_selection import train_test_split
+
+    timings = {}
+    start = time.perf_counter()
+    df, cache_hit = load_dataset(source, cache_root)
+    X, y, features_info = split_features(df)
+    timings["load"] = time.perf_counter() - start
+    print(f"[Training] Loaded {len(df)} rows x {df.shape[1]} columns "
+          f"({'columnar cache' if cache_hit else 'source, cache written'}) in {timings['load']:.2f}s")
+    print(f"[Training] Numerical features: {len(features_info['numeric_features'])}, "
+          f"categorical features: {len(features_info['categorical_features'])}")
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42, stratify=y)
+
+    candidates = candidates or parse_candidates()
+    results = None
+    if len(candidates) > 1 or folds > 1:
+        start = time.perf_counter()
+        results = search(X_train, y_train, features_info, candidates, folds=max(folds, 2), n_jobs=n_jobs)
+        timings["search"] = time.perf_counter() - start
+        print(f"[Training] Cross-validated {len(candidates)} candidate(s) x {max(folds, 2)} folds "
+              f"in {timings['search']:.2f}s")
+        for r in results:
+            print(f"  f1_macro={r['f1_macro']:.4f} ±{r['f1_macro_std']:.4f} accuracy={r['accuracy']:.4f} {r['params']}")
+    best = results[0]["params"] if results else candidates[0]
+
+    start = time.perf_counter()
+    pipeline = build_pipeline(features_info['numeric_features'], features_info['categorical_features'],
+                              n_jobs=n_jobs, **best)
+    pipeline.fit(X_train, y_train)
+    timings["fit"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = pipeline.predict(X_test)
+    test_metrics = {
+        "accuracy": float(accuracy_score(y_test, y_pred)),
+        "f1_macro": float(f1_score(y_test, y_pred, average='macro')),
+    }
+    timings["evaluate"] = time.perf_counter() - start
+    print(f"[Training] Fit in {timings['fit']:.2f}s; test accuracy {test_metrics['accuracy']:.4f}, "
+          f"f1_macro {test_metrics['f1_macro']:.4f} (evaluated in {timings['evaluate']:.2f}s)")
+    print(classification_report(y_test, y_pred))
+
+    start = time.perf_counter()
+    version = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+    version_dir = os.path.join(models_dir, VERSIONS_DIR, version)
+    os.makedirs(version_dir, exist_ok=True)
+    joblib.dump(pipeline, os.path.join(version_dir, MODEL_FILE))
+    joblib.dump(features_info, os.path.join(version_dir, FEATURES_FILE))
+    export_compiled_model(pipeline, features_info, os.path.join(version_dir, COMPILED_BUNDLE_DIR))
+    save_baseline(build_baseline(X_train, features_info), os.path.join(version_dir, DRIFT_BASELINE_FILE))
+    timings["save"] = time.perf_counter() - start
+
+    metrics = {
+        "version": version,
+        "source": os.path.abspath(source),
+        "source_fingerprint": model_fingerprint(source),
+        "rows": len(df),
+        "features_info": features_info,
+        "params": best,
+        "cv_results": results,
+        "test": test_metrics,
+        "timings_seconds": {k: round(v, 3) for k, v in timings.items()},
+    }
+    with open(os.path.join(version_dir, METRICS_FILE), 'w') as f:
+        json.dump(metrics, f, indent=2)
+    print(f"[Training] Saved version {version} to {version_dir}")
+
+    if publish:
+        publish_version(models_dir, version)
+        print(f"[Training] Published {version} to {models_dir}")
+    return metrics
+
+
+def main():
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Train the Miqyas loan risk model.")
+    parser.add_argument('--source', default=os.path.join(base_dir, 'dataset', 'aafaq.xlsx'),
+                        help='Excel / CSV / Parquet file with a "decision" column')
+    parser.add_argument('--models-dir', default=os.path.join(base_dir, 'models'))
+    parser.add_argument('--cache-dir', help='Columnar cache location (default: <source dir>/.columnar)')
+    parser.add_argument('--n-estimators', default='100', help='Comma-separated candidates')
+    parser.add_argument('--max-depth', default='none', help="Comma-separated candidates ('none' = unlimited)")
+    parser.add_argument('--min-samples-leaf', default='1', help='Comma-separated candidates')
+    parser.add_argument('--folds', type=int, default=5, help='CV folds (0 = skip cross-validation)')
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel jobs (-1 = all cores)')
+    parser.add_argument('--no-publish', action='store_true', help='Only write models/versions/<version>/')
+    args = parser.parse_args()
+
+    candidates = parse_candidates(args.n_estimators, args.max_depth, args.min_samples_leaf)
+    metrics = train(args.source, args.models_dir, candidates, folds=args.folds, n_jobs=args.jobs,
+                    cache_root=args.cache_dir, publish=not args.no_publish)
+    print("[Training] Timings: " + ", ".join(f"{k} {v:.2f}s" for k, v in metrics["timings_seconds"].items()))
+
+
+if __name__ == '__main__':
+    main()
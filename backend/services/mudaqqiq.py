@@ -1,22 +1,109 @@
 """
 mudaqqiq.py — MudaQQiQ Audit & Verification Service
 ─────────────────────────────────────────────────────
-Plug in your document verification / audit logic here.
+Catches supporting documents that are re-used, altered or duplicated across
+applications. Every registered document is fingerprinted (content hash,
+normalised-text hash, MinHash, SimHash) into a persistent LSH index (see
+services/near_duplicates.py); verify_document() returns its closest matches.
+
+  verification_score   1.0 = nothing similar in other applications,
+                       0.0 = an exact copy exists in another application
+  findings             one per match: duplicate | reformatted_copy |
+                       near_duplicate | altered_copy; matches within the same
+                       application are reported with severity "info"
 """
 
+import os
+
+from services.near_duplicates import NearDuplicateIndex, normalize_text
+
+NEAR_DUPLICATE_SIMILARITY = 0.9
+FINDING_TYPES = {"exact": "duplicate", "normalized": "reformatted_copy"}
+
+
 class MudaqqiqService:
-    def __init__(self):
-        pass
-        # TODO: initialize your audit engine / OCR pipeline here
+    def __init__(self, index=None, index_dir: str = os.path.join('data', 'mudaqqiq_index'),
+                 min_similarity: float = 0.5, top_k: int = 10):
+        self.index = index if index is not None else NearDuplicateIndex(index_dir)
+        self.min_similarity = min_similarity
+        self.top_k = top_k
+
+    # ── Documents ──────────────────────────────────────────
+    def add_documents(self, documents: list) -> dict:
+        """Register [{doc_id, text, application_id?, title?}]; a known doc_id is replaced."""
+        if not isinstance(documents, list) or not documents or not all(isinstance(d, dict) for d in documents):
+            return {"status": "error", "message": "documents must be a non-empty list of objects"}
+        for d in documents:
+            if not d.get("doc_id") or not isinstance(d.get("text"), str) or not d["text"].strip():
+                return {"status": "error", "message": "each document needs a doc_id and non-empty text"}
+            # Word-less text (punctuation only) all normalises to "" and would match every other such document
+            if not normalize_text(d["text"]):
+                return {"status": "error", "message": f"document {d['doc_id']} has no words to fingerprint"}
+        try:
+            rows = self.index.add(documents)
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+        return {"status": "success", "added": len(rows), "doc_ids": [str(d["doc_id"]) for d in documents]}
+
+    def add_document(self, doc_id: str, text: str, application_id: str = None, title: str = None) -> dict:
+        return self.add_documents([{"doc_id": doc_id, "text": text, "application_id": application_id,
+                                    "title": title}])
 
-    def verify_document(self, document_id: str) -> dict:
+    def delete_document(self, doc_id: str) -> dict:
+        if not self.index.delete(doc_id):
+            return {"status": "error", "message": f"Unknown document: {doc_id}"}
+        return {"status": "success", "doc_id": doc_id}
+
+    # ── Verification ───────────────────────────────────────
+    def verify_document(self, document_id: str = None, text: str = None, application_id: str = None,
+                        k: int = None) -> dict:
         """
-        Run verification checks on a document by ID.
-        Returns a score and list of findings.
+        Run verification checks on a registered document (by ID) or on raw
+        text. Returns a score and list of findings.
         """
-        # TODO: implement document verification logic
+        if document_id:
+            record = self.index.lookup(str(document_id))
+            if record is None:
+                return {"status": "error", "message": f"Unknown document: {document_id}"}
+            minhash, simhash = self.index.signature(record["row"])
+            content_hash, normalized_hash = record["content_hash"], record["normalized_hash"]
+            application_id = application_id or record["application_id"]
+            exclude_row = record["row"]
+        elif isinstance(text, str) and text.strip():
+            if not normalize_text(text):
+                return {"status": "error", "message": "text has no words to fingerprint"}
+            fingerprint = self.index.fingerprinter.fingerprint([text])
+            minhash, simhash = fingerprint["minhash"][0], fingerprint["simhash"][0]
+            content_hash, normalized_hash = fingerprint["content_hash"][0], fingerprint["normalized_hash"][0]
+            exclude_row = None
+        else:
+            return {"status": "error", "message": "document_id or text is required"}
+
+        matches = self.index.similar(minhash, simhash, content_hash, normalized_hash, k=k or self.top_k,
+                                     min_similarity=self.min_similarity, exclude_row=exclude_row)
+        findings = [self._finding(match, application_id) for match in matches]
+        external = [f["similarity"] for f in findings if f["severity"] != "info"]
         return {
             "status": "success",
-            "verification_score": 0.0,
-            "findings": [],
+            "document_id": document_id,
+            "verification_score": round(1.0 - max(external, default=0.0), 4),
+            "findings": findings,
+        }
+
+    @staticmethod
+    def _finding(match: dict, application_id: str = None) -> dict:
+        kind = FINDING_TYPES.get(match["match"]) or (
+            "near_duplicate" if match["similarity"] >= NEAR_DUPLICATE_SIMILARITY else "altered_copy")
+        same_application = application_id is not None and match["application_id"] == application_id
+        return {
+            "type": kind,
+            "severity": "info" if same_application else "high" if kind != "altered_copy" else "medium",
+            "doc_id": match["doc_id"],
+            "application_id": match["application_id"],
+            "title": match["title"],
+            "similarity": match["similarity"],
+            "simhash_similarity": match["simhash_similarity"],
         }
+
+    def get_status(self) -> dict:
+        return {"status": "success", "index": self.index.stats()}
@@ -7,31 +7,41 @@ Requires:
 
 Configure:
   Copy .env.example → .env and fill in your API key.
+
+Transcription backends are pluggable: MUJAZ_TRANSCRIBER=fake swaps AssemblyAI
+for FakeTranscriber, which works offline (tests, load runs).
 """
 
+import hashlib
 import os
-import asyncio
-import assemblyai as aai
+import time
+from types import SimpleNamespace
 from dotenv import load_dotenv
 
-load_dotenv()
+from services.instrumentation import span
 
-# Set API key from environment — never hardcode secrets
-aai.settings.api_key = os.environ.get("ASSEMBLYAI_API_KEY", "")
+load_dotenv()
 
-if not aai.settings.api_key:
+if not os.environ.get("ASSEMBLYAI_API_KEY"):
     print("[Mujaz] WARNING: ASSEMBLYAI_API_KEY is not set. Transcription will fail.")
 
 
-class MujazService:
-    def __init__(self):
-        pass
+def _assemblyai():
+    """Import the AssemblyAI SDK on first transcription, not at server start."""
+    import assemblyai as aai
 
-    async def _transcribe_async(self, audio_source: str):
+    # Set API key from environment — never hardcode secrets
+    aai.settings.api_key = os.environ.get("ASSEMBLYAI_API_KEY", "")
+    return aai
+
+
+class AssemblyAITranscriber:
+    def transcribe(self, audio_source: str):
         """
         Transcribe audio using AssemblyAI with speaker diarization.
         Tune TranscriptionConfig parameters here as needed.
         """
+        aai = _assemblyai()
         from assemblyai.types import SpeakerOptions, LanguageDetectionOptions
 
         config = aai.TranscriptionConfig(
@@ -71,16 +81,91 @@ class MujazService:
         )
 
         transcriber = aai.Transcriber()
-        transcript = await asyncio.to_thread(
-            transcriber.transcribe, audio_source, config=config
-        )
+        transcript = transcriber.transcribe(audio_source, config=config)
 
         if transcript.status == aai.TranscriptStatus.error:
             raise Exception(f"Transcription failed: {transcript.error}")
 
         return transcript
 
-    def process_audio(self, file_path: str) -> dict:
+
+class FakeTranscriber:
+    """
+    Offline stand-in for AssemblyAI. Returns a canned transcript with the same
+    attributes process_audio reads, after an optional simulated delay.
+    """
+    def __init__(self, delay_seconds: float = 0.0):
+        self.delay_seconds = delay_seconds
+
+    def transcribe(self, audio_source: str):
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        utterances = [
+            SimpleNamespace(start=0, speaker="A", text="Let's review the facility renewal."),
+            SimpleNamespace(start=4200, speaker="B", text="The client will send audited financials by Sunday."),
+            SimpleNamespace(start=9800, speaker="A", text="Good. We need to update the risk rating after that."),
+        ]
+        return SimpleNamespace(
+            text=" ".join(u.text for u in utterances),
+            utterances=utterances,
+            summary="- The team reviewed the facility renewal.\n"
+                    "- The client will send audited financials by Sunday.\n"
+                    "- The RM needs to update the risk rating.",
+        )
+
+
+# Summary lines containing any of these are reported as action items
+ACTION_KEYWORDS = ["action", "todo", "task", "will", "need to", "must"]
+
+TRANSCRIBERS = {
+    "assemblyai": AssemblyAITranscriber,
+    "fake": lambda: FakeTranscriber(float(os.environ.get("MUJAZ_FAKE_DELAY", "0"))),
+}
+
+
+def _plain(value):
+    # SDK enums (sentiment, entity type) → their string value
+    value = getattr(value, "value", value)
+    return value if isinstance(value, (str, int, float)) or value is None else str(value)
+
+
+def transcript_to_dict(transcript) -> dict:
+    """Flatten an SDK (or fake) transcript into the raw form kept in TranscriptStore."""
+    return {
+        "text": transcript.text or "",
+        "summary": getattr(transcript, "summary", None) or "",
+        "utterances": [
+            {"start": u.start, "speaker": _plain(u.speaker), "text": u.text}
+            for u in (getattr(transcript, "utterances", None) or [])
+        ],
+        "sentiment": [
+            {"text": r.text, "sentiment": _plain(r.sentiment), "confidence": r.confidence,
+             "speaker": _plain(getattr(r, "speaker", None)), "start": r.start}
+            for r in (getattr(transcript, "sentiment_analysis", None) or [])
+        ],
+        "entities": [
+            {"type": _plain(e.entity_type), "text": e.text, "start": e.start}
+            for e in (getattr(transcript, "entities", None) or [])
+        ],
+    }
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MujazService:
+    def __init__(self, transcriber=None, store=None):
+        # Any object with transcribe(path) returning a transcript-like object
+        self.transcriber = transcriber or TRANSCRIBERS[os.environ.get("MUJAZ_TRANSCRIBER", "assemblyai")]()
+        # Optional TranscriptStore: raw transcripts keyed by audio SHA-256
+        self.store = store
+
+    def process_audio(self, file_path: str, content_hash: str = None) -> dict:
         """
         Entry point called by the API route.
         Returns a structured analysis dict or an error dict.
@@ -89,51 +174,80 @@ class MujazService:
             if not file_path or not os.path.exists(file_path):
                 return {"status": "error", "message": f"File not found: {file_path}"}
 
-            print(f"[Mujaz] Processing: {file_path}")
-            transcript = asyncio.run(self._transcribe_async(file_path))
-
-            # Build diarization segments
-            diarization = []
-            if transcript.utterances:
-                for u in transcript.utterances:
-                    start_sec = int(u.start / 1000)
-                    m, s = divmod(start_sec, 60)
-                    h, m = divmod(m, 60)
-                    timestamp = f"{h:02d}:{m:02d}:{s:02d}" if h > 0 else f"{m:02d}:{s:02d}"
-                    diarization.append({
-                        "speaker": f"Speaker {u.speaker}",
-                        "timestamp": timestamp,
-                        "text": u.text,
-                    })
-
-            # Parse summary into notes & action items
-            notes, action_items = [], []
-            if transcript.summary:
-                lines = [
-                    l.strip()
-                    for l in transcript.summary.replace(". ", ".\n").split("\n")
-                    if l.strip()
-                ]
-                for line in lines:
-                    clean = line.lstrip("*- ").strip()
-                    if not clean:
-                        continue
-                    if any(kw in clean.lower() for kw in ["action", "todo", "task", "will", "need to", "must"]):
-                        action_items.append(clean)
-                    else:
-                        notes.append(clean)
-
-            return {
-                "status": "success",
-                "message": "Transcription completed",
-                "analysis": {
-                    "transcript": transcript.text or "",
-                    "notes": notes or ["No summary available."],
-                    "actionItems": action_items or ["No explicit action items identified."],
-                    "diarization": diarization,
-                },
-            }
+            raw = None
+            if self.store is not None:
+                with span('mujaz.transcript_lookup'):
+                    content_hash = content_hash or file_sha256(file_path)
+                    raw = self.store.get(content_hash)
+
+            if raw is None:
+                print(f"[Mujaz] Processing: {file_path}")
+                with span('mujaz.transcription'):
+                    raw = transcript_to_dict(self.transcriber.transcribe(file_path))
+                if self.store is not None:
+                    self.store.put(content_hash, raw)
+            else:
+                print(f"[Mujaz] Reusing stored transcript {content_hash[:12]}")
+
+            with span('mujaz.post_processing'):
+                return self.analyze_transcript(raw)
 
         except Exception as e:
             print(f"[Mujaz] Error: {e}")
             return {"status": "error", "message": str(e)}
+
+    def reanalyze(self, content_hash: str) -> dict:
+        """Re-run post-processing on a stored transcript without transcribing again."""
+        raw = self.store.get(content_hash) if self.store is not None else None
+        if raw is None:
+            return {"status": "error", "message": f"No stored transcript for {content_hash}"}
+        return self.analyze_transcript(raw)
+
+    def analyze_transcript(self, raw: dict) -> dict:
+        """Post-processing stage: diarization formatting and action-item extraction."""
+        notes, action_items = self._split_summary(raw["summary"])
+        return {
+            "status": "success",
+            "message": "Transcription completed",
+            "analysis": {
+                "transcript": raw["text"],
+                "notes": notes or ["No summary available."],
+                "actionItems": action_items or ["No explicit action items identified."],
+                "diarization": self._diarization(raw["utterances"]),
+            },
+        }
+
+    @staticmethod
+    def _diarization(utterances):
+        # Build diarization segments
+        diarization = []
+        for u in utterances:
+            start_sec = int(u["start"] / 1000)
+            m, s = divmod(start_sec, 60)
+            h, m = divmod(m, 60)
+            timestamp = f"{h:02d}:{m:02d}:{s:02d}" if h > 0 else f"{m:02d}:{s:02d}"
+            diarization.append({
+                "speaker": f"Speaker {u['speaker']}",
+                "timestamp": timestamp,
+                "text": u["text"],
+            })
+        return diarization
+
+    @staticmethod
+    def _split_summary(summary):
+        # Parse summary into notes & action items
+        notes, action_items = [], []
+        lines = [
+            part.strip()
+            for part in summary.replace(". ", ".\n").split("\n")
+            if part.strip()
+        ]
+        for line in lines:
+            clean = line.lstrip("*- ").strip()
+            if not clean:
+                continue
+            if any(kw in clean.lower() for kw in ACTION_KEYWORDS):
+                action_items.append(clean)
+            else:
+                notes.append(clean)
+        return notes, action_items
@@ -0,0 +1,214 @@
+"""
+mujaz_jobs.py — Mujaz Background Job Queue
+───────────────────────────────────────────
+Runs MujazService.process_audio off the request thread. Submitting a file
+returns a job id at once; a bounded worker pool transcribes up to
+`max_workers` recordings at a time, and clients poll for the result.
+
+Jobs live in a small SQLite file, so queued or interrupted jobs are picked up
+again after a restart. Each job records the SHA-256 of its audio, so a
+recording that was already processed can be answered from the stored result.
+
+Job states: queued → running → done | failed
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class MujazJobQueue:
+    def __init__(self, service, db_path: str, max_workers: int = 2, max_pending: int = 100, on_finish=None):
+        """`on_finish(file_path)` runs after every job, e.g. to delete the spooled audio."""
+        self.service = service
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.on_finish = on_finish
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._finished = threading.Condition(self._lock)
+        self._watchers = {}  # job_id → [Future] resolved by _finish
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mujaz-job')
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                filename TEXT,
+                file_path TEXT,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL,
+                result TEXT,
+                error TEXT,
+                content_hash TEXT
+            )
+        """)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if 'content_hash' not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN content_hash TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_hash ON jobs (content_hash)")
+        self._db.commit()
+        self._recover()
+
+    def _recover(self):
+        """Re-queue jobs that were queued or mid-transcription when the server stopped."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+            self._db.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+            self._db.commit()
+            self._pending += len(rows)
+        for (job_id,) in rows:
+            self._pool.submit(self._run, job_id)
+        if rows:
+            print(f"[Mujaz] Resumed {len(rows)} unfinished job(s).")
+
+    def submit(self, file_path: str, filename: str = None, job_id: str = None, content_hash: str = None) -> str:
+        """Record a job for an already-saved file and queue it. Returns the job id."""
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f"Mujaz queue is full ({self.max_pending} jobs pending)")
+            self._pending += 1
+            self._db.execute(
+                "INSERT INTO jobs (id, status, filename, file_path, created_at, content_hash) "
+                "VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, filename or os.path.basename(file_path), file_path, time.time(), content_hash),
+            )
+            self._db.commit()
+        self._pool.submit(self._run, job_id)
+        return job_id
+
+    def _run(self, job_id):
+        row = None
+        try:
+            with self._lock:
+                row = self._db.execute("SELECT file_path, content_hash FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                self._db.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                                 (time.time(), job_id))
+                self._db.commit()
+
+            result = self.service.process_audio(row[0], content_hash=row[1])
+            if result.get("status") == "success":
+                self._finish(job_id, "done", result=result)
+            else:
+                self._finish(job_id, "failed", error=result.get("message", "Processing failed"))
+        except Exception as e:
+            print(f"[Mujaz] Job {job_id} crashed: {e}")
+            self._finish(job_id, "failed", error=str(e))
+        finally:
+            with self._lock:
+                self._pending -= 1
+            if self.on_finish and row:
+                self.on_finish(row[0])
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+                (status, time.time(), json.dumps(result) if result is not None else None, error, job_id),
+            )
+            self._db.commit()
+            self._finished.notify_all()
+            watchers = self._watchers.pop(job_id, [])
+        if watchers:
+            job = self.get(job_id)
+            for future in watchers:
+                future.set_result(job)
+
+    def update_result(self, job_id: str, result: dict):
+        """Replace a finished job's result, e.g. after re-running post-processing."""
+        with self._lock:
+            self._db.execute("UPDATE jobs SET result = ? WHERE id = ? AND status = 'done'",
+                             (json.dumps(result), job_id))
+            self._db.commit()
+
+    def find_by_hash(self, content_hash: str):
+        """Latest done or in-flight job for this audio content, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id FROM jobs WHERE content_hash = ? AND status IN ('done', 'queued', 'running') "
+                "ORDER BY status = 'done' DESC, created_at DESC LIMIT 1", (content_hash,)
+            ).fetchone()
+        return self.get(row[0]) if row else None
+
+    def wait(self, job_id: str, timeout: float = None):
+        """Block until the job is done or failed (or the timeout passes); returns the job."""
+        deadline = time.monotonic() + timeout if timeout else None
+        with self._finished:
+            while True:
+                row = self._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row is None or row[0] in ('done', 'failed'):
+                    break
+                remaining = deadline - time.monotonic() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    break
+                self._finished.wait(remaining)
+        return self.get(job_id)
+
+    def watch(self, job_id: str) -> Future:
+        """Future resolving to the job once it is done or failed (asyncio.wrap_future it to await)."""
+        future = Future()
+        with self._lock:
+            row = self._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None and row[0] not in ('done', 'failed'):
+                self._watchers.setdefault(job_id, []).append(future)
+                return future
+        future.set_result(self.get(job_id))
+        return future
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, status, filename, created_at, started_at, finished_at, result, error, content_hash "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._to_dict(row, with_result=True) if row else None
+
+    def list(self, limit: int = 50) -> list:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, status, filename, created_at, started_at, finished_at, NULL, error, content_hash "
+                "FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._to_dict(row, with_result=False) for row in rows]
+
+    @staticmethod
+    def _to_dict(row, with_result):
+        job = {
+            "job_id": row[0],
+            "status": row[1],
+            "filename": row[2],
+            "created_at": row[3],
+            "started_at": row[4],
+            "finished_at": row[5],
+            "error": row[7],
+            "content_hash": row[8],
+        }
+        if with_result and row[6]:
+            job["result"] = json.loads(row[6])
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            return {"max_workers": self.max_workers, "pending": self._pending,
+                    "max_pending": self.max_pending, "jobs": counts}
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """With cancel_pending, queued jobs stay 'queued' in the database and resume on the next start."""
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_pending)
@@ -0,0 +1,190 @@
+"""
+mujaz_uploads.py — Streaming Upload Spool for Mujaz
+────────────────────────────────────────────────────
+Writes recordings straight from the request stream to a spool file named by
+its SHA-256 plus a per-upload suffix, instead of buffering the whole upload
+and saving it under the client-supplied filename. Each upload owns its file,
+so deleting one job's input never touches another's.
+
+Two ingest paths:
+  - One-shot:  ingest(stream, filename) hashes while it writes; async callers
+               push chunks through open_upload(filename) → write()... → finish()
+  - Resumable: create_session() → append(offset, chunk)... → complete()
+               partial uploads live under <spool>/partial and survive restarts
+
+Every path enforces `max_bytes`. Spooled files are removed once their job
+finishes (see MujazJobQueue); stale partial uploads are swept on startup.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+
+from services.instrumentation import span
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+class UploadOffsetError(Exception):
+    def __init__(self, expected: int):
+        super().__init__(f"Upload offset mismatch; resume from byte {expected}")
+        self.expected = expected
+
+
+class SpooledFile:
+    def __init__(self, path: str, content_hash: str, size: int, filename: str):
+        self.path = path
+        self.content_hash = content_hash
+        self.size = size
+        self.filename = filename
+
+
+class SpoolWriter:
+    """One upload being written to the spool; write() enforces the size limit as bytes arrive."""
+
+    def __init__(self, spool, filename: str):
+        self.spool = spool
+        self.filename = filename
+        self.temp_path = os.path.join(spool.partial_dir, f"{uuid.uuid4().hex}.part")
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._out = open(self.temp_path, 'wb')
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.spool.max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds {self.spool.max_bytes} bytes")
+        self._digest.update(chunk)
+        self._out.write(chunk)
+
+    def finish(self) -> SpooledFile:
+        self._out.close()
+        return self.spool._promote(self.temp_path, self._digest.hexdigest(), self.size, self.filename)
+
+    def abort(self):
+        self._out.close()
+        try:
+            os.remove(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+
+class UploadSpool:
+    def __init__(self, spool_dir: str, max_bytes: int, partial_ttl_seconds: float = 24 * 3600):
+        self.spool_dir = spool_dir
+        self.partial_dir = os.path.join(spool_dir, 'partial')
+        self.max_bytes = max_bytes
+        os.makedirs(self.partial_dir, exist_ok=True)
+        self.sweep(partial_ttl_seconds)
+
+    # ── One-shot ───────────────────────────────────────────
+    def ingest(self, stream, filename: str) -> SpooledFile:
+        """Stream a whole upload to the spool, hashing as it goes."""
+        writer = self.open_upload(filename)
+        try:
+            with span('mujaz.upload_save'):
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    writer.write(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.finish()
+
+    def open_upload(self, filename: str) -> SpoolWriter:
+        return SpoolWriter(self, filename)
+
+    # ── Resumable ──────────────────────────────────────────
+    def create_session(self, filename: str, total_size: int = None) -> dict:
+        if total_size is not None and total_size > self.max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds {self.max_bytes} bytes")
+        upload_id = uuid.uuid4().hex
+        meta = {"upload_id": upload_id, "filename": filename, "total_size": total_size, "created_at": time.time()}
+        with open(self._meta_path(upload_id), 'w') as f:
+            json.dump(meta, f)
+        open(self._part_path(upload_id), 'wb').close()
+        return self.session(upload_id)
+
+    def session(self, upload_id: str):
+        """Current state of a resumable upload, or None if unknown."""
+        if not re.fullmatch(r'[0-9a-f]{32}', upload_id or ''):
+            return None
+        try:
+            with open(self._meta_path(upload_id)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        meta["offset"] = os.path.getsize(self._part_path(upload_id))
+        return meta
+
+    def append(self, upload_id: str, offset: int, stream) -> int:
+        """Append a chunk at `offset` (must equal the bytes received so far)."""
+        meta = self.session(upload_id)
+        if meta is None:
+            raise KeyError(upload_id)
+        if offset != meta["offset"]:
+            raise UploadOffsetError(meta["offset"])
+
+        limit = min(self.max_bytes, meta["total_size"] or self.max_bytes)
+        size = offset
+        with open(self._part_path(upload_id), 'ab') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    out.truncate(offset)
+                    raise UploadTooLargeError(f"Upload exceeds {limit} bytes")
+                out.write(chunk)
+        return size
+
+    def complete(self, upload_id: str) -> SpooledFile:
+        meta = self.session(upload_id)
+        if meta is None:
+            raise KeyError(upload_id)
+        if meta["total_size"] is not None and meta["offset"] != meta["total_size"]:
+            raise UploadOffsetError(meta["offset"])
+
+        part_path = self._part_path(upload_id)
+        digest = hashlib.sha256()
+        with open(part_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        os.remove(self._meta_path(upload_id))
+        return self._promote(part_path, digest.hexdigest(), meta["offset"], meta["filename"])
+
+    # ── Housekeeping ───────────────────────────────────────
+    def _promote(self, temp_path, content_hash, size, filename) -> SpooledFile:
+        ext = os.path.splitext(filename or '')[1].lower()
+        ext = ext if re.fullmatch(r'\.[a-z0-9]{1,8}', ext) else ''
+        final_path = os.path.join(self.spool_dir, f"{content_hash}_{uuid.uuid4().hex[:8]}{ext}")
+        os.replace(temp_path, final_path)
+        return SpooledFile(final_path, content_hash, size, filename)
+
+    def discard(self, path: str):
+        """Remove a spooled file, if it belongs to this spool."""
+        if path and os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.spool_dir):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def sweep(self, max_age_seconds: float):
+        cutoff = time.time() - max_age_seconds
+        for name in os.listdir(self.partial_dir):
+            path = os.path.join(self.partial_dir, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+
+    def _part_path(self, upload_id):
+        return os.path.join(self.partial_dir, f"{upload_id}.part")
+
+    def _meta_path(self, upload_id):
+        return os.path.join(self.partial_dir, f"{upload_id}.json")
@@ -0,0 +1,471 @@
+"""
+near_duplicates.py — Document Fingerprints & Near-Duplicate Index
+──────────────────────────────────────────────────────────────────
+Finds re-used, altered or duplicated supporting documents for MudaQQiQ.
+
+Fingerprints (per document's text):
+  - content_hash      SHA-256 of the text as given (exact copies)
+  - normalized_hash   of the lower-cased word sequence (re-typed / re-formatted
+                      copies)
+  - MinHash           `num_perm` minima over the hashed word `shingle_words`-grams;
+                      the share of equal minima estimates Jaccard similarity
+  - SimHash           64-bit sign of the summed shingle hash bits; Hamming
+                      distance is a second, cheap similarity
+
+Shingles are hashed for a whole batch of documents at once (polynomial rolling
+hash over one byte buffer), so ingest is a few NumPy passes per batch.
+
+Index (an index directory):
+  - index.json          parameters; reopening with different ones is an error
+  - minhash.u32         signatures, append-only, memory-mapped
+  - simhash.u64         SimHash per row, append-only
+  - documents.sqlite    one row per fingerprint: doc_id, application_id,
+                        title, hashes, deleted
+  - lsh.npz             LSH band tables: per band, the band keys sorted, with
+                        their rows
+
+MinHash is cut into `bands` bands; two documents are candidates when any band
+matches, so a query is one binary search per band (sub-linear) plus scoring the
+few candidates. New rows go to a small sorted delta table, which is merged into
+the main tables (and lsh.npz rewritten) once it passes `delta_max_rows`.
+On open, rows the saved tables do not cover are re-banded from minhash.u32.
+Deletes are tombstones.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+FORMAT_VERSION = 1
+BATCH_BYTES = 1 << 20
+PERM_BLOCK = 16
+EMPTY_MINHASH = np.uint32(0xFFFFFFFF)
+
+_WORD = re.compile(r'\w+')
+_P = np.uint64(0x100000001B3)                       # odd, so invertible mod 2**64
+_P_INV = np.uint64(pow(0x100000001B3, -1, 1 << 64))
+_COMBINE = np.uint64(0x9E3779B97F4A7C15)
+
+
+def normalize_text(text: str) -> str:
+    """Lower-cased words, single-spaced; punctuation and layout dropped."""
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def _mix64(x):
+    """splitmix64 finaliser: spreads rolling-hash values over all 64 bits."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _popcount64(x):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(x)
+    return np.unpackbits(np.ascontiguousarray(x).view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class Fingerprinter:
+    def __init__(self, num_perm: int = 64, shingle_words: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_words = shingle_words
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+        self._power_table = (np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint64))
+
+    def _powers(self, length):
+        """(P^i, P^-i) for i in 0..length, grown as needed and reused across batches."""
+        if len(self._power_table[0]) <= length:
+            size = max(length + 1, BATCH_BYTES + 4096)
+            with np.errstate(over='ignore'):
+                self._power_table = tuple(
+                    np.concatenate([[np.uint64(1)], np.cumprod(np.full(size - 1, base, dtype=np.uint64))])
+                    for base in (_P, _P_INV))
+        return self._power_table
+
+    def fingerprint(self, texts: list) -> dict:
+        """
+        content_hash / normalized_hash (lists), minhash (n × num_perm uint32),
+        simhash (n uint64) and words (n) for a list of texts.
+        """
+        n = len(texts)
+        result = {
+            "content_hash": [hashlib.sha256(t.encode()).hexdigest() for t in texts],
+            "normalized_hash": [],
+            "minhash": np.full((n, self.num_perm), EMPTY_MINHASH, dtype=np.uint32),
+            "simhash": np.zeros(n, dtype=np.uint64),
+            "words": np.zeros(n, dtype=np.int64),
+        }
+        start = 0
+        while start < n:
+            # Batches of about BATCH_BYTES bytes keep the intermediate arrays small
+            encoded, size = [], 0
+            while start + len(encoded) < n and (not encoded or size < BATCH_BYTES):
+                encoded.append(normalize_text(texts[start + len(encoded)]).encode())
+                size += len(encoded[-1]) + 1
+            result["normalized_hash"] += [hashlib.blake2b(e, digest_size=16).hexdigest() for e in encoded]
+            self._fingerprint_batch(encoded, start, result)
+            start += len(encoded)
+        return result
+
+    def _fingerprint_batch(self, encoded, offset, result):
+        blob = np.frombuffer(b" ".join(encoded), dtype=np.uint8)
+        if not len(blob):
+            return
+        with np.errstate(over='ignore'):
+            # Words: the runs between spaces, each hashed as (H[end] - H[start]) * P^-start
+            spaces = np.flatnonzero(blob == 32)
+            starts = np.concatenate([[0], spaces + 1])
+            ends = np.concatenate([spaces, [len(blob)]])
+            keep = ends > starts
+            starts, ends = starts[keep], ends[keep]
+            doc_starts = np.cumsum([0] + [len(e) + 1 for e in encoded[:-1]])
+            word_doc = np.searchsorted(doc_starts, starts, side='right') - 1
+
+            powers, inverse = self._powers(len(blob))
+            prefix = np.concatenate([[np.uint64(0)], np.cumsum(blob * powers[1:len(blob) + 1])])
+            words = _mix64((prefix[ends] - prefix[starts]) * inverse[starts])
+
+            # Shingles: word k-grams inside one document; documents shorter than k use their words
+            k = self.shingle_words
+            counts = np.bincount(word_doc, minlength=len(encoded))
+            result["words"][offset:offset + len(encoded)] = counts
+            m = max(len(words) - k + 1, 0)
+            grams = words[:m].copy()
+            for j in range(1, k):
+                grams = grams * _COMBINE + words[j:m + j]
+            inside = word_doc[:m] == word_doc[k - 1:m + k - 1] if m else np.zeros(0, dtype=bool)
+            short = counts[word_doc] < k
+            shingles = np.concatenate([_mix64(grams[inside]), words[short]])
+            shingle_doc = np.concatenate([word_doc[:m][inside], word_doc[short]])
+            if not len(shingles):
+                return
+            order = np.argsort(shingle_doc, kind='stable')
+            shingles, shingle_doc = shingles[order], shingle_doc[order]
+            segments = np.flatnonzero(np.r_[True, shingle_doc[1:] != shingle_doc[:-1]])
+            rows = offset + shingle_doc[segments]
+
+            for p in range(0, self.num_perm, PERM_BLOCK):
+                hashed = self._a[p:p + PERM_BLOCK, None] * shingles[None, :] + self._b[p:p + PERM_BLOCK, None]
+                # The high 32 bits are monotone in the value, so take the minimum first and shift after
+                minima = np.minimum.reduceat(hashed, segments, axis=1)
+                result["minhash"][rows, p:p + PERM_BLOCK] = (minima.T >> np.uint64(32)).astype(np.uint32)
+
+            # SimHash: per bit position, set when more than half of the document's shingles have it set
+            lengths = np.diff(np.r_[segments, len(shingles)])
+            bits = np.unpackbits(shingles.view(np.uint8).reshape(-1, 8), axis=1)
+            ones = np.add.reduceat(bits, segments, axis=0, dtype=np.int32)
+            result["simhash"][rows] = np.packbits(2 * ones > lengths[:, None], axis=1).view(np.uint64)[:, 0]
+
+
+def _text_field(document: dict, name: str):
+    """A document's metadata field as stored: None, or text (numbers are accepted and converted)."""
+    value = document.get(name)
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise ValueError(f"{name} must be a string")
+
+
+class NearDuplicateIndex:
+    def __init__(self, index_dir: str, num_perm: int = 64, bands: int = 16, shingle_words: int = 3,
+                 seed: int = 1, delta_max_rows: int = 65536):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.index_dir = index_dir
+        self.num_perm = num_perm
+        self.bands = bands
+        self.band_rows = num_perm // bands
+        self.delta_max_rows = delta_max_rows
+        self.fingerprinter = Fingerprinter(num_perm, shingle_words, seed)
+        self._lock = threading.RLock()
+        os.makedirs(index_dir, exist_ok=True)
+
+        params = {"num_perm": num_perm, "bands": bands, "shingle_words": shingle_words, "seed": seed,
+                  "format": FORMAT_VERSION}
+        info_path = self._path('index.json')
+        if os.path.exists(info_path):
+            with open(info_path) as f:
+                stored = json.load(f)
+            if stored != params:
+                raise ValueError(f"Index at {index_dir} was built with {stored}, not {params}")
+        else:
+            with open(info_path, 'w') as f:
+                json.dump(params, f)
+
+        self._db = sqlite3.connect(self._path('documents.sqlite'), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                row INTEGER PRIMARY KEY,
+                doc_id TEXT NOT NULL,
+                application_id TEXT,
+                title TEXT,
+                content_hash TEXT NOT NULL,
+                normalized_hash TEXT NOT NULL,
+                words INTEGER,
+                created_at REAL,
+                deleted INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_documents_doc ON documents (doc_id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_documents_content ON documents (content_hash)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_documents_normalized ON documents (normalized_hash)")
+        self._db.commit()
+        self._open()
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    # ── Loading ────────────────────────────────────────────
+    def _open(self):
+        n_rows = self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM documents").fetchone()[0]
+        # Signatures are written before their metadata commits; drop any torn tail
+        for name, row_bytes in (('minhash.u32', 4 * self.num_perm), ('simhash.u64', 8)):
+            path = self._path(name)
+            if not os.path.exists(path):
+                open(path, 'wb').close()
+            if os.path.getsize(path) > n_rows * row_bytes:
+                os.truncate(path, n_rows * row_bytes)
+            elif os.path.getsize(path) < n_rows * row_bytes:
+                raise ValueError(f"{name} in {self.index_dir} is shorter than its metadata")
+
+        self._n_rows = n_rows
+        self._remap()
+        self._alive = np.ones(n_rows, dtype=bool)
+        deleted = [r for (r,) in self._db.execute("SELECT row FROM documents WHERE deleted = 1")]
+        self._alive[deleted] = False
+
+        self._main_keys = np.zeros((self.bands, 0), dtype=np.uint32)
+        self._main_rows = np.zeros((self.bands, 0), dtype=np.uint32)
+        covered = 0
+        if os.path.exists(self._path('lsh.npz')):
+            with np.load(self._path('lsh.npz')) as lsh:
+                if int(lsh["covered_rows"]) <= n_rows:
+                    self._main_keys, self._main_rows = lsh["keys"], lsh["rows"]
+                    covered = int(lsh["covered_rows"])
+        self._covered = covered
+        self._delta_keys = np.zeros((self.bands, 0), dtype=np.uint32)
+        self._delta_rows = np.zeros((self.bands, 0), dtype=np.uint32)
+        if covered < n_rows:
+            self._insert_delta(self.band_keys(self._minhash[covered:]), np.arange(covered, n_rows))
+
+    def _remap(self):
+        if self._n_rows:
+            self._minhash = np.memmap(self._path('minhash.u32'), dtype=np.uint32, mode='r',
+                                      shape=(self._n_rows, self.num_perm))
+            self._simhash = np.memmap(self._path('simhash.u64'), dtype=np.uint64, mode='r', shape=(self._n_rows,))
+        else:
+            self._minhash = np.zeros((0, self.num_perm), dtype=np.uint32)
+            self._simhash = np.zeros(0, dtype=np.uint64)
+
+    # ── LSH tables ─────────────────────────────────────────
+    def band_keys(self, minhash) -> np.ndarray:
+        """(bands × n) uint32 key of each band of each signature."""
+        signatures = np.asarray(minhash, dtype=np.uint64).reshape(-1, self.bands, self.band_rows)
+        with np.errstate(over='ignore'):
+            acc = signatures[:, :, 0].copy()
+            for j in range(1, self.band_rows):
+                acc = acc * _COMBINE + signatures[:, :, j]
+            return (_mix64(acc) >> np.uint64(32)).astype(np.uint32).T
+
+    @staticmethod
+    def _merge_sorted(keys, rows, new_keys, new_rows):
+        merged_keys = np.empty((keys.shape[0], keys.shape[1] + new_keys.shape[1]), dtype=np.uint32)
+        merged_rows = np.empty_like(merged_keys)
+        for band in range(keys.shape[0]):
+            order = np.argsort(new_keys[band], kind='stable')
+            k, r = new_keys[band][order], new_rows[band][order]
+            at = np.searchsorted(keys[band], k, side='right')
+            merged_keys[band] = np.insert(keys[band], at, k)
+            merged_rows[band] = np.insert(rows[band], at, r)
+        return merged_keys, merged_rows
+
+    def _insert_delta(self, keys, rows):
+        rows = np.broadcast_to(np.asarray(rows, dtype=np.uint32), keys.shape)
+        self._delta_keys, self._delta_rows = self._merge_sorted(self._delta_keys, self._delta_rows, keys, rows)
+        if self._delta_keys.shape[1] >= self.delta_max_rows:
+            self._flush_delta()
+
+    def _flush_delta(self):
+        self._main_keys, self._main_rows = self._merge_sorted(
+            self._main_keys, self._main_rows, self._delta_keys, self._delta_rows)
+        self._delta_keys = np.zeros((self.bands, 0), dtype=np.uint32)
+        self._delta_rows = np.zeros((self.bands, 0), dtype=np.uint32)
+        self._covered = self._n_rows
+        tmp = self._path('lsh.npz.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez(f, keys=self._main_keys, rows=self._main_rows, covered_rows=self._covered)
+        os.replace(tmp, self._path('lsh.npz'))
+
+    def flush(self):
+        """Merge the delta tables into the main ones and persist them (also done automatically)."""
+        with self._lock:
+            if self._delta_keys.shape[1]:
+                self._flush_delta()
+
+    def _candidates(self, keys) -> np.ndarray:
+        found = []
+        for table_keys, table_rows in ((self._main_keys, self._main_rows), (self._delta_keys, self._delta_rows)):
+            for band in range(self.bands):
+                lo = np.searchsorted(table_keys[band], keys[band], side='left')
+                hi = np.searchsorted(table_keys[band], keys[band], side='right')
+                if hi > lo:
+                    found.append(table_rows[band, lo:hi])
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.uint32)
+
+    # ── Writes ─────────────────────────────────────────────
+    def add(self, documents: list) -> list:
+        """
+        Fingerprint and index [{doc_id, text, application_id?, title?}]; a
+        doc_id already in the index is replaced. Returns the new rows.
+        """
+        metadata = []
+        for d in documents:
+            if not d.get("doc_id") or not isinstance(d.get("text"), str):
+                raise ValueError("each document needs a doc_id and text")
+            metadata.append(tuple(_text_field(d, name) for name in ("doc_id", "application_id", "title")))
+        if not documents:
+            return []
+        fingerprints = self.fingerprinter.fingerprint([d["text"] for d in documents])
+        with self._lock:
+            replaced = self._db.execute(
+                f"SELECT row FROM documents WHERE deleted = 0 AND doc_id IN ({','.join('?' * len(documents))})",
+                [doc_id for doc_id, _, _ in metadata]).fetchall()
+            start = self._n_rows
+            signature_files = (('minhash.u32', 4 * self.num_perm, np.ascontiguousarray(fingerprints["minhash"])),
+                               ('simhash.u64', 8, fingerprints["simhash"]))
+            try:
+                # Written at the row offset, not appended, so a file can never run ahead of the metadata
+                for name, row_bytes, signatures in signature_files:
+                    with open(self._path(name), 'r+b') as f:
+                        f.seek(start * row_bytes)
+                        f.write(signatures.tobytes())
+                now = time.time()
+                if replaced:
+                    self._db.executemany("UPDATE documents SET deleted = 1 WHERE row = ?", replaced)
+                self._db.executemany(
+                    "INSERT INTO documents (row, doc_id, application_id, title, content_hash, normalized_hash, "
+                    "words, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(start + i, *metadata[i], fingerprints["content_hash"][i], fingerprints["normalized_hash"][i],
+                      int(fingerprints["words"][i]), now) for i in range(len(documents))],
+                )
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                for name, row_bytes, _ in signature_files:
+                    os.truncate(self._path(name), start * row_bytes)
+                raise
+
+            self._n_rows += len(documents)
+            self._remap()
+            alive = np.concatenate([self._alive, np.ones(len(documents), dtype=bool)])
+            alive[[r for (r,) in replaced]] = False
+            # A doc_id repeated within the batch: the last one wins
+            last = {doc_id: i for i, (doc_id, _, _) in enumerate(metadata)}
+            alive[[start + i for i, (doc_id, _, _) in enumerate(metadata) if last[doc_id] != i]] = False
+            self._alive = alive
+            self._insert_delta(self.band_keys(fingerprints["minhash"]), np.arange(start, self._n_rows))
+            return list(range(start, self._n_rows))
+
+    def delete(self, doc_id: str) -> int:
+        """Tombstone a document. Returns the number of rows removed."""
+        with self._lock:
+            rows = [r for (r,) in self._db.execute(
+                "SELECT row FROM documents WHERE doc_id = ? AND deleted = 0", (doc_id,))]
+            if rows:
+                self._db.execute("UPDATE documents SET deleted = 1 WHERE doc_id = ?", (doc_id,))
+                self._db.commit()
+                alive = self._alive.copy()
+                alive[rows] = False
+                self._alive = alive
+            return len(rows)
+
+    # ── Queries ────────────────────────────────────────────
+    def lookup(self, doc_id: str):
+        """The live row of `doc_id` with its record, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT row FROM documents WHERE doc_id = ? AND deleted = 0 ORDER BY row DESC LIMIT 1",
+                (doc_id,)).fetchone()
+            return self.records([row[0]])[0] if row else None
+
+    def similar(self, minhash, simhash, content_hash: str = None, normalized_hash: str = None, k: int = 10,
+                min_similarity: float = 0.5, exclude_row: int = None) -> list:
+        """
+        Top `k` live documents by estimated Jaccard similarity (LSH
+        candidates plus exact hash matches), as records with "similarity",
+        "simhash_similarity" and "match" (exact | normalized | near).
+        """
+        minhash = np.asarray(minhash, dtype=np.uint32).reshape(self.num_perm)
+        with self._lock:
+            candidates = self._candidates(self.band_keys(minhash[None, :])[:, 0]).astype(np.int64)
+            exact = {}
+            for column, value, match in (("normalized_hash", normalized_hash, "normalized"),
+                                         ("content_hash", content_hash, "exact")):
+                if value:
+                    for (row,) in self._db.execute(f"SELECT row FROM documents WHERE {column} = ? AND deleted = 0",
+                                                   (value,)):
+                        exact[row] = match
+            rows = np.union1d(candidates, np.fromiter(exact, dtype=np.int64, count=len(exact)))
+            rows = rows[self._alive[rows]] if len(rows) else rows
+            if exclude_row is not None:
+                rows = rows[rows != exclude_row]
+            if not len(rows):
+                return []
+            similarity = (self._minhash[rows] == minhash[None, :]).mean(axis=1)
+            simhash_similarity = 1.0 - _popcount64(self._simhash[rows] ^ np.uint64(simhash)) / 64.0
+        for row, match in exact.items():
+            similarity[rows == row] = 1.0
+        keep = similarity >= min_similarity
+        rows, similarity, simhash_similarity = rows[keep], similarity[keep], simhash_similarity[keep]
+        top = np.argsort(-similarity, kind='stable')[:k]
+        return [
+            {**record, "similarity": round(float(similarity[i]), 4),
+             "simhash_similarity": round(float(simhash_similarity[i]), 4),
+             "match": exact.get(int(rows[i]), "near")}
+            for i, record in zip(top, self.records(rows[top].tolist())) if record is not None
+        ]
+
+    def signature(self, row: int):
+        """(minhash, simhash) stored for a row."""
+        with self._lock:
+            return np.array(self._minhash[row]), int(self._simhash[row])
+
+    def records(self, rows) -> list:
+        """Document metadata for row ids, in the given order; None for unknown rows."""
+        rows = [int(r) for r in rows]
+        if not rows:
+            return []
+        with self._lock:
+            found = {
+                r[0]: {"row": r[0], "doc_id": r[1], "application_id": r[2], "title": r[3], "content_hash": r[4],
+                       "normalized_hash": r[5], "words": r[6], "created_at": r[7]}
+                for r in self._db.execute(
+                    f"SELECT row, doc_id, application_id, title, content_hash, normalized_hash, words, created_at "
+                    f"FROM documents WHERE row IN ({','.join('?' * len(rows))})", rows)
+            }
+        return [found.get(r) for r in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            live = int(self._alive.sum())
+            return {
+                "rows": self._n_rows,
+                "live_rows": live,
+                "deleted_rows": self._n_rows - live,
+                "num_perm": self.num_perm,
+                "bands": self.bands,
+                "lsh_main_rows": int(self._main_keys.shape[1]),
+                "lsh_delta_rows": int(self._delta_keys.shape[1]),
+            }
@@ -0,0 +1,169 @@
+"""
+prediction_cache.py — Content-Addressed Prediction Cache
+─────────────────────────────────────────────────────────
+Caches one prediction result per feature vector. Keys are a hash of the
+vector after alignment to features_info, salted with the model fingerprint,
+so a retrained model never serves stale results.
+
+  - In-memory tier: bounded LRU with optional TTL
+  - Disk tier (optional): SQLite file, survives restarts; every PRUNE_EVERY
+    writes, expired rows are deleted and rows beyond disk_max_entries are
+    evicted, least recently written or read from disk first
+
+Both tiers hold serialized JSON, so every hit is a fresh copy that callers
+may modify freely.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DISK_MAX_ENTRIES = 1_000_000
+PRUNE_EVERY = 1000
+
+_NULL = '\x00null'
+_ABSENT = float('nan')
+
+
+def _canonical_value(value, numeric: bool):
+    # Absent keys and NaN are both imputed by the pipeline; an explicit None in
+    # a categorical column is an unknown category, so it must hash differently.
+    if value is None:
+        return None if numeric else _NULL
+    if isinstance(value, float) and value != value:
+        return None
+    if numeric:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return str(value)
+    return value if isinstance(value, str) else repr(value)
+
+
+def model_fingerprint(path: str) -> str:
+    """Cheap identity of a model file: changes whenever it is rewritten."""
+    stat = os.stat(path)
+    return hashlib.sha1(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+
+
+class PredictionCache:
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = None, disk_path: str = None,
+                 disk_max_entries: int = DISK_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self._writes_since_prune = 0
+        self.ttl = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0,
+                         "disk_evictions": 0}
+
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, value TEXT, expires REAL, used REAL)"
+            )
+            if 'used' not in {row[1] for row in self._db.execute("PRAGMA table_info(predictions)")}:
+                self._db.execute("ALTER TABLE predictions ADD COLUMN used REAL")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_predictions_used ON predictions (used)")
+            with self._lock:
+                self._prune()
+
+    @staticmethod
+    def make_key(fingerprint: str, record: dict, numeric_features, categorical_features) -> str:
+        """Hash a raw record as it will look after alignment to features_info."""
+        vector = [_canonical_value(record.get(c, _ABSENT), True) for c in numeric_features]
+        vector += [_canonical_value(record.get(c, _ABSENT), False) for c in categorical_features]
+        payload = json.dumps([fingerprint, vector], separators=(',', ':'))
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires, text = entry
+                if expires is None or expires >= now:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return json.loads(text)
+                del self._memory[key]
+                self.counters["expired"] += 1
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, expires FROM predictions WHERE key = ?", (key,)).fetchone()
+                if row and (row[1] is None or row[1] >= now):
+                    self._db.execute("UPDATE predictions SET used = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    self._store(key, row[1], row[0])
+                    self.counters["disk_hits"] += 1
+                    return json.loads(row[0])
+
+            self.counters["misses"] += 1
+            return None
+
+    def put_many(self, items):
+        """Store (key, result) pairs; the disk tier is written in one transaction."""
+        now = time.time()
+        expires = now + self.ttl if self.ttl else None
+        items = [(key, json.dumps(value)) for key, value in items]
+        with self._lock:
+            for key, text in items:
+                self._store(key, expires, text)
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO predictions (key, value, expires, used) VALUES (?, ?, ?, ?)",
+                    [(key, text, expires, now) for key, text in items],
+                )
+                self._writes_since_prune += len(items)
+                if self._writes_since_prune >= PRUNE_EVERY:
+                    self._prune()
+                else:
+                    self._db.commit()
+
+    def _prune(self):
+        # Caller holds the lock
+        self._writes_since_prune = 0
+        self._db.execute("DELETE FROM predictions WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+        excess = self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] - self.disk_max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM predictions WHERE key IN (SELECT key FROM predictions ORDER BY used LIMIT ?)", (excess,))
+            self.counters["disk_evictions"] += excess
+        self._db.commit()
+
+    def _store(self, key, expires, text):
+        self._memory[key] = (expires, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            hits = lookups - self.counters["misses"]
+            return {
+                **self.counters,
+                "hits": hits,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "disk": self._db is not None,
+                "disk_max_entries": self.disk_max_entries if self._db is not None else None,
+            }
@@ -1,22 +1,244 @@
 """
 rafeeq.py — RafeeQ Conversational Document Service
 ────────────────────────────────────────────────────
-Plug in your RAG pipeline / LLM chat logic here.
+Document Q&A over indexed credit files.
+
+  - add_document() chunks a document, embeds the chunks and adds them to the
+    on-disk vector index (re-adding a doc_id replaces it)
+  - chat() retrieves the closest chunks and answers from them, returning
+    the chunks it used as `sources`
+  - chat_stream() does the same but yields the answer token by token
+    (start → token… → done events), for SSE / NDJSON responses
+
+With a session_id, history lives on the server (services/chat_sessions.py)
+and clients send only the new message; without one, `context` is used as
+before.
+
+The embedder is pluggable (see services/embeddings.py); the default is a
+deterministic local hashing embedder, so nothing is downloaded or sent out.
+Answer backends are pluggable too (RAFEEQ_LLM):
+  extractive  the retrieved passages themselves (default, no LLM)
+  llm         the shared LLM gateway, streamed
+  fake        canned reply with simulated latency (tests, benchmarks)
 """
 
+import os
+import re
+import time
+
+from services.chat_sessions import ChatSessionStore
+from services.embeddings import HashingEmbedder, chunk_text
+from services.instrumentation import METRICS, span
+from services.vector_index import VectorIndex
+
+CHAT_SYSTEM_PROMPT = """You are RafeeQ, an assistant for relationship managers reviewing credit files.
+Answer only from the document excerpts provided with the question; if they do not contain the
+answer, say so. Be concise, and cite excerpts by their [number]."""
+
+NO_SOURCES_REPLY = "I couldn't find anything relevant to that in the indexed documents."
+_TOKEN = re.compile(r'\S+\s*')
+
+
+def _tokens(text: str):
+    """Word-sized pieces (with trailing whitespace), so joining them restores `text`."""
+    return _TOKEN.findall(text)
+
+
+# ── Answer backends ────────────────────────────────────────
+# Any object with stream(messages, sources) -> iterator of text deltas.
+class ExtractiveChatBackend:
+    """Answers with the top retrieved passages, as RafeeQ always has."""
+
+    def stream(self, messages, sources):
+        if not sources:
+            return iter(_tokens(NO_SOURCES_REPLY))
+        return iter(_tokens("\n\n".join(
+            f"From {s['title'] or s['doc_id']}: {s['text']}" for s in sources[:2]
+        )))
+
+
+class FakeChatBackend:
+    """Offline stand-in for an LLM: a canned reply after a first-token delay, one word per token delay."""
+
+    def __init__(self, first_token_delay: float = 0.0, token_delay: float = 0.0):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+
+    def stream(self, messages, sources):
+        reply = (f"Based on {len(sources)} excerpt(s) and {len(messages) - 2} earlier message(s): "
+                 f"this is a simulated answer to \"{messages[-1]['content'][-80:]}\".")
+        if self.first_token_delay:
+            time.sleep(self.first_token_delay)
+        for i, token in enumerate(_tokens(reply)):
+            if i and self.token_delay:
+                time.sleep(self.token_delay)
+            yield token
+
+
+class LLMChatBackend:
+    """Streams from the shared LLMGateway."""
+
+    def __init__(self, gateway, temperature: float = 0.2):
+        self.gateway = gateway
+        self.temperature = temperature
+
+    def stream(self, messages, sources):
+        return self.gateway.stream(messages, temperature=self.temperature)
+
+
+def chat_backend_from_env(gateway=None):
+    name = os.environ.get("RAFEEQ_LLM", "extractive")
+    if name == "llm":
+        if gateway is None:
+            raise ValueError("RAFEEQ_LLM=llm needs an LLM gateway")
+        return LLMChatBackend(gateway)
+    if name == "fake":
+        return FakeChatBackend(float(os.environ.get("RAFEEQ_FAKE_FIRST_TOKEN_MS", "0")) / 1000,
+                               float(os.environ.get("RAFEEQ_FAKE_TOKEN_MS", "0")) / 1000)
+    if name == "extractive":
+        return ExtractiveChatBackend()
+    raise ValueError(f"Unknown RAFEEQ_LLM backend: {name}")
+
+
 class RafeeqService:
-    def __init__(self):
-        pass
-        # TODO: initialize your vector store / LLM client here
+    def __init__(self, index_dir: str = 'data/rafeeq_index', embedder=None, top_k: int = 4,
+                 min_score: float = 0.05, chat_backend=None, sessions=None):
+        self.embedder = embedder or HashingEmbedder()
+        self.index = VectorIndex(index_dir, dim=self.embedder.dim)
+        self.top_k = top_k
+        self.min_score = min_score
+        self.chat_backend = chat_backend or ExtractiveChatBackend()
+        self.sessions = sessions or ChatSessionStore()
+
+    # ── Documents ──────────────────────────────────────────
+    def add_document(self, doc_id: str, text: str, title: str = None) -> dict:
+        chunks = chunk_text(text)
+        if not chunks:
+            return {"status": "error", "message": "Document has no text"}
+        replaced = self.index.delete(doc_id)
+        self.index.add(
+            self.embedder.embed(chunks),
+            [{"doc_id": doc_id, "chunk_no": i, "title": title, "text": chunk} for i, chunk in enumerate(chunks)],
+        )
+        return {"status": "success", "doc_id": doc_id, "chunks": len(chunks), "replaced": replaced > 0}
 
-    def chat(self, message: str, context=None) -> dict:
+    def delete_document(self, doc_id: str) -> dict:
+        removed = self.index.delete(doc_id)
+        if not removed:
+            return {"status": "error", "message": f"Unknown document: {doc_id}"}
+        return {"status": "success", "doc_id": doc_id, "chunks_removed": removed}
+
+    def search(self, query: str, k: int = None) -> list:
+        rows, scores = self.index.search(self.embedder.embed([query])[0], k=k or self.top_k)
+        return [
+            {**record, "score": round(float(score), 4)}
+            for record, score in zip(self.index.records(rows), scores)
+            if record is not None and score >= self.min_score
+        ]
+
+    # ── Chat ───────────────────────────────────────────────
+    def chat(self, message: str, context=None, session_id: str = None) -> dict:
+        """
+        Respond to a user message using document context. With `session_id`
+        the server keeps the history; otherwise `context` (prior chat turns,
+        sent by the client) is used.
         """
-        Respond to a user message using document context.
-        `context` may contain retrieved document chunks.
+        if not message or not message.strip():
+            return {"status": "error", "message": "Message is empty"}
+
+        result = {"status": "success"}
+        for event in self.chat_stream(message, session_id=session_id, context=context):
+            if event["event"] == "start":
+                result["sources"] = event["sources"]
+            elif event["event"] == "done":
+                result["reply"] = event["reply"]
+            elif event["event"] == "error":
+                return {"status": "error", "message": event["message"]}
+        if session_id is not None:
+            result["session_id"] = session_id
+        return result
+
+    def chat_stream(self, message: str, session_id: str = None, context=None, history_turns: int = 0):
         """
-        # TODO: implement RAG or chat completion logic
-        return {
-            "status": "success",
-            "reply": f"[Stub] Received: {message}",
-            "sources": [],
-        }
+        Yield {"event": "start", session_id, created, sources}, then
+        {"event": "token", text} per delta, then {"event": "done", reply,
+        ...timings} — or {"event": "error", message} if the backend fails. The
+        exchange is added to the session once the reply is complete.
+
+        `created` is true when the server had no history for `session_id`
+        (new chat, restart, expiry or eviction). `history_turns` is how many
+        earlier turns the client holds: if the session is empty, it has some
+        and sent no `context`, the start event carries "context_required" and
+        the stream ends there, with nothing generated or stored. The client
+        then resends with its turns as `context`, which seed the session first.
+        """
+        start = time.perf_counter()
+        if isinstance(history_turns, bool) or not isinstance(history_turns, int) or history_turns < 0:
+            raise ValueError("history_turns must be a non-negative integer")
+        context = [
+            {"role": t["role"], "content": str(t["content"])} for t in (context or [])
+            if isinstance(t, dict) and t.get("role") in ("user", "assistant") and t.get("content")
+        ]
+        session = self.sessions.get(session_id) if session_id is not None else None
+        created = False
+        if session is not None:
+            summary, turns = self.sessions.history(session)
+            created = not summary and not turns
+            if created and context:
+                self.sessions.append(session, *context)
+                summary, turns = self.sessions.history(session)
+            elif created and history_turns:
+                yield {"event": "start", "session_id": session.session_id, "created": True,
+                       "context_required": True, "sources": []}
+                return
+        else:
+            summary, turns = "", context[-self.sessions.keep_turns:]
+
+        with span('rafeeq.retrieve'):
+            sources = self.search(message)
+        yield {"event": "start", "session_id": session.session_id if session else None, "created": created,
+               "sources": sources}
+
+        parts, first_token_ms = [], None
+        try:
+            for delta in self.chat_backend.stream(self._messages(message, summary, turns, sources), sources):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - start) * 1000
+                    METRICS.observe('rafeeq_time_to_first_token_seconds', first_token_ms / 1000)
+                parts.append(delta)
+                yield {"event": "token", "text": delta}
+        except Exception as e:
+            print(f"[RafeeQ] Chat backend failed: {e}")
+            yield {"event": "error", "message": f"Answer generation failed: {e}"}
+            return
+
+        reply = "".join(parts)
+        if session is not None:
+            self.sessions.append(session, {"role": "user", "content": message},
+                                 {"role": "assistant", "content": reply})
+        yield {"event": "done", "reply": reply, "tokens": len(parts),
+               "first_token_ms": round(first_token_ms, 2) if first_token_ms is not None else None,
+               "total_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+    @staticmethod
+    def _messages(message, summary, turns, sources) -> list:
+        messages = [{"role": "system", "content": CHAT_SYSTEM_PROMPT}]
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+        messages.extend(turns)
+        excerpts = "\n\n".join(
+            f"[{i}] {s['title'] or s['doc_id']}: {s['text']}" for i, s in enumerate(sources, 1)
+        ) or "(no relevant excerpts found)"
+        messages.append({"role": "user", "content": f"Document excerpts:\n{excerpts}\n\nQuestion: {message}"})
+        return messages
+
+    def get_session(self, session_id: str):
+        session = self.sessions.get(session_id, create=False)
+        return session.to_dict() if session else None
+
+    def delete_session(self, session_id: str) -> bool:
+        return self.sessions.delete(session_id)
+
+    def get_status(self) -> dict:
+        return {"status": "success", "index": self.index.stats(), "chat_backend": type(self.chat_backend).__name__,
+                "sessions": self.sessions.stats()}
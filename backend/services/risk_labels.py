@@ -0,0 +1,10 @@
+"""
+risk_labels.py — Shared Miqyas Label Constants
+───────────────────────────────────────────────
+Class labels that services outside the model (dashboard, bulk analysis)
+read from predictions. Kept dependency-free so importing them does not pull
+in the model service.
+"""
+
+# Risk scores throughout are 1 - P(Approved).
+APPROVED_LABEL = "Approved"
@@ -0,0 +1,122 @@
+"""
+scoring_pool.py — Miqyas Scoring Process Pool
+──────────────────────────────────────────────
+Runs forest scoring in worker processes so CPU-bound predict_proba calls do
+not hold the async server's GIL or stall its event loop.
+
+Each worker keeps one LoadedModel and reloads it when the caller passes a
+different model directory or fingerprint, so hot-swaps in the serving process
+(promote / rollback) reach the workers on their next request. A reload that
+finds a different model on disk than the caller expects fails the request
+rather than serving a model the serving process has not swapped to. Workers
+score single-threaded; the pool itself is the parallelism. Given the serving
+model up front, each worker loads and warms it in its initializer as it
+starts, and warm_up() waits until every worker has reported in.
+
+Workers are spawned rather than forked: the serving process already runs
+threads (warm-up, dashboard writer, LLM loop) that must not be copied.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+class ScoringQueueFull(Exception):
+    pass
+
+
+class ScoringPool:
+    def __init__(self, workers: int = None, max_pending: int = 256, use_compiled: bool = True,
+                 model_dir: str = None, fingerprint: str = None):
+        """`model_dir` / `fingerprint`: the serving model, loaded by each worker as it starts."""
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.use_compiled = use_compiled
+        self._pending = 0
+        self._lock = threading.Lock()
+        context = multiprocessing.get_context('spawn')
+        self._ready = context.Queue()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_init_worker,
+                                         initargs=(model_dir, fingerprint, use_compiled, self._ready))
+        print(f"[Scoring] Process pool with {self.workers} worker(s), max {max_pending} pending.")
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def score(self, model_dir: str, fingerprint: str, records: list, dense: bool = False):
+        """
+        predict() results for `records`, or (labels, probabilities) when `dense`.
+        Raises ScoringQueueFull past max_pending.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise ScoringQueueFull(f"Scoring queue is full ({self.max_pending} requests pending)")
+            self._pending += 1
+        try:
+            future = self._pool.submit(_score, model_dir, fingerprint, self.use_compiled, records, dense)
+            return await asyncio.wrap_future(future)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def warm_up(self, timeout: float = 120.0):
+        """Start every worker and wait for its initializer to load the model, before traffic arrives."""
+        # Each submit finds no idle worker yet, so the executor spawns one process per call
+        futures = [self._pool.submit(os.getpid) for _ in range(self.workers)]
+        try:
+            pids = {self._ready.get(timeout=timeout) for _ in range(self.workers)}
+        except queue.Empty:
+            pids = set()
+        for future in futures:
+            future.result()
+        print(f"[Scoring] {len(pids)} of {self.workers} worker(s) ready.")
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "pending": self._pending, "max_pending": self.max_pending}
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+# ── Worker side ────────────────────────────────────────────
+_model = None
+
+
+def _load(model_dir, fingerprint, use_compiled):
+    global _model
+    if _model is None or _model.model_dir != model_dir or _model.fingerprint != fingerprint:
+        from services.miqyas import LoadedModel
+        model = LoadedModel(model_dir, use_compiled)
+        if not model.loaded:
+            raise RuntimeError(f"No loadable model in {model_dir}")
+        if model.fingerprint != fingerprint:
+            # The artifact was rewritten without a swap in the serving process
+            raise RuntimeError(f"Model in {model_dir} changed on disk: expected fingerprint {fingerprint}, "
+                               f"found {model.fingerprint}")
+        # One thread per worker; sklearn forests default to n_jobs=-1 here
+        if hasattr(model.model, 'get_params'):
+            model.model.set_params(**{k: 1 for k in model.model.get_params() if k.endswith('n_jobs')})
+        _model = model
+    return _model
+
+
+def _init_worker(model_dir, fingerprint, use_compiled, ready):
+    if model_dir:
+        try:
+            _load(model_dir, fingerprint, use_compiled).warm_up()
+        except Exception as e:
+            # An exception here would break the whole pool; requests retry the load and report the error
+            print(f"[Scoring] Worker {os.getpid()} could not preload the model: {e}")
+    ready.put(os.getpid())
+
+
+def _score(model_dir, fingerprint, use_compiled, records, dense=False):
+    import pandas as pd
+    model = _load(model_dir, fingerprint, use_compiled)
+    frame = pd.DataFrame(records)
+    return model.score_matrix(frame) if dense else model.score_frame(frame)
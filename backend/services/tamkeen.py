@@ -1,25 +1,122 @@
 """
 tamkeen.py — Tamkeen RMs Assistant Service
 ──────────────────────────────────────────
-Plug in your contract analysis / LLM logic here.
+Contract analysis over a case's documents.
+
+  - parse_contract() ingests every PDF / DOCX / TXT in a case folder (see
+    services/document_ingest.py: parallel extraction, per-file cache) and
+    returns the merged project details, obligations and cash-flow terms
+  - analyze_contract() returns the same in the structured analysis shape,
+    with deterministic cash-flow checks, facility table and payment schedule
+    from services/cashflow_engine.py
+  - analyze_portfolio() runs the cash-flow engine over many cases (or
+    already-extracted terms) at once
+  - run_checks() runs the RMs Assistant's contract checks over the case
+    documents (see services/tamkeen_checks.py: shared chunked context,
+    per-check retrieval, bounded LLM fan-out, per-document-set result cache)
+
+Case folders must live under `cases_dir`; paths are resolved against it and
+anything that escapes it is rejected.
 """
 
+import os
+
+from services.cashflow_engine import case_report, portfolio_report, terms_from_case
+from services.tamkeen_checks import validate_checks
+
+
 class TamkeenService:
-    def __init__(self):
-        pass
-        # TODO: initialize your LLM client / document parser here
+    def __init__(self, ingestor=None, cases_dir: str = 'cases', checks=None):
+        # DocumentIngestor; built on first use with a local cache if omitted
+        self.ingestor = ingestor
+        self.cases_dir = os.path.realpath(cases_dir)
+        # CheckRunner (needs the LLM gateway); run_checks() is unavailable without one
+        self.checks = checks
+
+    def _ingestor(self):
+        if self.ingestor is None:
+            from services.document_ingest import DocumentIngestor
+            self.ingestor = DocumentIngestor(os.path.join('data', 'tamkeen_documents.sqlite'))
+        return self.ingestor
+
+    def resolve_folder(self, folder_path: str) -> str:
+        """Absolute case folder for `folder_path` (absolute, or relative to cases_dir)."""
+        if not folder_path or not isinstance(folder_path, str):
+            raise ValueError("folderPath is required")
+        folder = os.path.realpath(os.path.join(self.cases_dir, folder_path))
+        if os.path.commonpath([folder, self.cases_dir]) != self.cases_dir:
+            raise ValueError("folderPath must be inside the cases directory")
+        if not os.path.isdir(folder):
+            raise FileNotFoundError(f"Case folder not found: {folder_path}")
+        return folder
+
+    def parse_contract(self, folder_path: str) -> dict:
+        """Project details, obligations and cash-flow terms from a case folder. Raises ValueError / FileNotFoundError."""
+        result = self._ingestor().ingest_folder(self.resolve_folder(folder_path))
+        return {
+            "status": "success",
+            "folderPath": os.path.relpath(result["folder"], self.cases_dir),
+            "details": result["details"],
+            "obligations": result["obligations"],
+            "cashflow_terms": result["cashflow_terms"],
+            "files": result["files"],
+            "stats": result["stats"],
+        }
 
     def analyze_contract(self, data: dict) -> dict:
         """
-        Analyze a contract document and return structured results.
-        `data` typically contains: { "case_id": str, "check_type": str, "documents": list }
+        Analyze a case's contract documents and return structured results.
+        `data` contains { "case_id": str, "folderPath": str, ... }.
         """
-        # TODO: implement contract analysis logic
-        return {
-            "status": "success",
-            "analysis": {
-                "project_details": {},
-                "obligations": [],
-                "cashflow_checks": [],
+        analysis = {"project_details": {}, "obligations": [], "cashflow_checks": []}
+        if data.get("folderPath"):
+            try:
+                parsed = self.parse_contract(data["folderPath"])
+            except (ValueError, FileNotFoundError) as e:
+                return {"status": "error", "message": str(e)}
+            try:
+                cashflow = case_report(terms_from_case(parsed), data.get("policy"))
+            except ValueError as e:
+                return {"status": "error", "message": str(e)}
+            analysis = {
+                "project_details": parsed["details"],
+                "obligations": parsed["obligations"],
+                "cashflow_checks": cashflow["checks"],
+                "cashflow": cashflow,
             }
-        }
+        return {"status": "success", "analysis": analysis}
+
+    def analyze_portfolio(self, folder_paths: list = None, contracts: list = None, policy: dict = None) -> dict:
+        """
+        Cash-flow checks for every case in `folder_paths` and every term dict
+        in `contracts` (see cashflow_engine.TERM_COLUMNS), in one vectorised
+        pass. Raises ValueError / FileNotFoundError.
+        """
+        folder_paths, contracts = folder_paths or [], contracts or []
+        if not isinstance(folder_paths, list) or not isinstance(contracts, list) or \
+                not all(isinstance(c, dict) for c in contracts):
+            raise ValueError("'folderPaths' must be a list of paths and 'contracts' a list of objects")
+        if not folder_paths and not contracts:
+            raise ValueError("'folderPaths' or 'contracts' is required")
+        terms = [terms_from_case(self.parse_contract(path)) for path in folder_paths] + contracts
+        report = portfolio_report(terms, policy)
+        for contract, path in zip(report["contracts"], folder_paths):
+            contract["folderPath"] = path
+        return {"status": "success", **report}
+
+    def run_checks(self, folder_path: str, checks: list, max_concurrency: int = None):
+        """
+        Event iterator for the contract checks on a case folder (see
+        CheckRunner.run). The folder and checks are validated, and the case
+        context built, before this returns: ValueError / FileNotFoundError.
+        """
+        if self.checks is None:
+            raise ValueError("Contract checks are not configured")
+        validate_checks(checks)
+        context = self.checks.context(self._ingestor(), self.resolve_folder(folder_path))
+        return self.checks.run(context, checks, max_concurrency)
+
+    def get_status(self) -> dict:
+        return {"status": "success", "cases_dir": self.cases_dir,
+                "ingest": self.ingestor.stats() if self.ingestor is not None else None,
+                "checks": self.checks.stats() if self.checks is not None else None}
@@ -0,0 +1,208 @@
+"""
+tamkeen_checks.py — Tamkeen Contract Check Runner
+──────────────────────────────────────────────────
+Runs a list of contract checks (query + system prompt each, as defined in
+RmsAssistant.jsx) against one case's documents:
+
+  - Shared context:   the case documents are ingested (document_ingest.py),
+                      chunked and embedded once per document set; the
+                      context is kept in memory for later runs
+  - Retrieval:        each check gets only its `top_k` most relevant chunks,
+                      not the whole case file
+  - Fan-out:          checks run concurrently through the shared LLM gateway,
+                      at most `max_concurrency` at a time, and are yielded in
+                      completion order
+  - Status:           the closing "STATUS: GREEN|YELLOW|RED" line is parsed
+                      into `status`
+  - Result cache:     keyed by (document-set hash, check id, prompt hash), so
+                      re-running an unchanged check on unchanged documents
+                      makes no LLM call and no retrieval
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import numpy as np
+
+from services.embeddings import HashingEmbedder, chunk_text
+from services.prediction_cache import PredictionCache
+
+CHECK_PROMPT_VERSION = "tamkeen-check/1"
+_STATUS = re.compile(r'STATUS:\s*\W*\s*(GREEN|YELLOW|RED)\b', re.I)
+
+
+def validate_checks(checks) -> list:
+    """Check definitions {"id", "query", "systemPrompt"}; anything malformed is a ValueError."""
+    if not isinstance(checks, list) or not checks:
+        raise ValueError("'checks' must be a non-empty list")
+    ids = set()
+    for check in checks:
+        if not isinstance(check, dict) or not isinstance(check.get("id"), str) or not check["id"]:
+            raise ValueError("each check needs a string 'id'")
+        if not isinstance(check.get("query"), str) or not check["query"].strip():
+            raise ValueError(f"check '{check['id']}' needs a 'query'")
+        if not isinstance(check.get("systemPrompt", ""), str):
+            raise ValueError(f"check '{check['id']}': 'systemPrompt' must be a string")
+        if check["id"] in ids:
+            raise ValueError(f"duplicate check id '{check['id']}'")
+        ids.add(check["id"])
+    return checks
+
+
+def parse_status(text: str):
+    """The last STATUS: GREEN|YELLOW|RED in `text`, lower-cased; None if there is none."""
+    matches = _STATUS.findall(text or "")
+    return matches[-1].lower() if matches else None
+
+
+class CaseContext:
+    """A case's documents, chunked and embedded once."""
+
+    def __init__(self, document_set: str, documents: list, embedder, details: dict = None, max_chars: int = 800):
+        self.document_set = document_set
+        self.details = details or {}
+        self.sources, self.chunks = [], []
+        for name, text in documents:
+            for chunk in chunk_text(text, max_chars=max_chars):
+                self.sources.append(name)
+                self.chunks.append(chunk)
+        self.embedder = embedder
+        self.vectors = embedder.embed(self.chunks) if self.chunks else np.zeros((0, embedder.dim), np.float32)
+        self.documents = len(documents)
+
+    def retrieve(self, query: str, k: int) -> list:
+        if not self.chunks:
+            return []
+        scores = self.vectors @ self.embedder.embed([query])[0]
+        top = np.argsort(-scores, kind='stable')[:k]
+        # Document order reads better to the model than score order
+        return [{"source": self.sources[i], "text": self.chunks[i]} for i in sorted(top)]
+
+
+class CheckRunner:
+    def __init__(self, llm, embedder=None, top_k: int = 6, max_concurrency: int = 4, cache_size: int = 2048,
+                 cache_path: str = None, max_contexts: int = 32):
+        self.llm = llm
+        self.embedder = embedder or HashingEmbedder()
+        self.top_k = top_k
+        self.max_concurrency = max_concurrency
+        self.cache = PredictionCache(cache_size, None, cache_path) if cache_size else None
+        self.max_contexts = max_contexts
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"runs": 0, "checks": 0, "cached": 0, "failed": 0, "contexts_built": 0}
+
+    # ── Context ────────────────────────────────────────────
+    @staticmethod
+    def document_set_hash(files: list) -> str:
+        digest = hashlib.sha256()
+        for f in sorted(files, key=lambda f: f["file"]):
+            digest.update(f"{f['file']}\0{f['content_hash']}\n".encode())
+        return digest.hexdigest()
+
+    def context(self, ingestor, folder: str) -> CaseContext:
+        """The folder's CaseContext; documents are re-read and re-embedded only when the set changed."""
+        result = ingestor.ingest_folder(folder)
+        document_set = self.document_set_hash([f for f in result["files"] if f["status"] != "error"])
+        with self._lock:
+            context = self._contexts.get(document_set)
+            if context is not None:
+                self._contexts.move_to_end(document_set)
+                return context
+        context = CaseContext(document_set, ingestor.document_texts(folder), self.embedder, result["details"])
+        with self._lock:
+            self._contexts[document_set] = context
+            self.counters["contexts_built"] += 1
+            while len(self._contexts) > self.max_contexts:
+                self._contexts.popitem(last=False)
+        return context
+
+    @staticmethod
+    def cache_key(document_set: str, check: dict) -> str:
+        prompt = f"{check.get('query', '')}\0{check.get('systemPrompt', '')}"
+        return hashlib.blake2b(
+            f"{CHECK_PROMPT_VERSION}\0{document_set}\0{check['id']}\0{prompt}".encode(), digest_size=16,
+        ).hexdigest()
+
+    # ── Run ────────────────────────────────────────────────
+    def run(self, context: CaseContext, checks: list, max_concurrency: int = None):
+        """
+        Yield {"type": "check", ...} per check as it finishes (cached ones
+        first), then a {"type": "report"}.
+        """
+        start = time.perf_counter()
+        self.counters["runs"] += 1
+        counts = {"completed": 0, "cached": 0, "failed": 0}
+
+        pending = []
+        for check in checks:
+            key = self.cache_key(context.document_set, check)
+            hit = self.cache.get(key) if self.cache is not None else None
+            if hit is not None:
+                counts["completed"] += 1
+                counts["cached"] += 1
+                yield {"type": "check", "id": check["id"], **hit, "cached": True, "latency_ms": 0.0}
+            else:
+                pending.append((check, key))
+
+        if pending and not self.llm.configured:
+            for check, _ in pending:
+                counts["failed"] += 1
+                yield {"type": "check", "id": check["id"], "error": "OpenAI API Key not configured in .env"}
+            pending = []
+
+        window = max(1, min(max_concurrency or self.max_concurrency, self.llm.max_concurrency))
+        queue = iter(pending)
+        running = {}
+
+        def submit_next():
+            item = next(queue, None)
+            if item is not None:
+                check, key = item
+                excerpts = context.retrieve(f"{check['query']} {check.get('name', '')}", self.top_k)
+                payload = {"query": check.get("query"), "project_details": context.details, "excerpts": excerpts}
+                future = self.llm.submit(check.get("systemPrompt") or "", payload, CHECK_PROMPT_VERSION,
+                                         temperature=0.2)
+                running[future] = (check, key, sorted({e["source"] for e in excerpts}))
+
+        for _ in range(window):
+            submit_next()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                check, key, sources = running.pop(future)
+                submit_next()
+                try:
+                    response = future.result()
+                except Exception as e:
+                    counts["failed"] += 1
+                    yield {"type": "check", "id": check["id"], "error": str(e)}
+                    continue
+                result = {"content": response["content"], "status": parse_status(response["content"]),
+                          "sources": sources}
+                if self.cache is not None:
+                    self.cache.put_many([(key, result)])
+                counts["completed"] += 1
+                yield {"type": "check", "id": check["id"], **result, "cached": False,
+                       "latency_ms": round(response["latency_ms"], 2)}
+
+        self.counters["checks"] += len(checks)
+        self.counters["cached"] += counts["cached"]
+        self.counters["failed"] += counts["failed"]
+        yield {
+            "type": "report",
+            "checks": len(checks),
+            **counts,
+            "document_set": context.document_set,
+            "documents": context.documents,
+            "chunks": len(context.chunks),
+            "total_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    def stats(self) -> dict:
+        return {**self.counters, "contexts_in_memory": len(self._contexts),
+                "cache": self.cache.stats() if self.cache else None}
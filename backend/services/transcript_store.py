@@ -0,0 +1,48 @@
+"""
+transcript_store.py — Raw Transcript Store for Mujaz
+─────────────────────────────────────────────────────
+Keeps every raw transcript (utterances, summary, sentiment, entities) keyed by
+the SHA-256 of its audio, as zlib-compressed JSON in a local SQLite file.
+Post-processing can then re-run on a stored transcript in milliseconds
+instead of paying for a new transcription.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class TranscriptStore:
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS transcripts (content_hash TEXT PRIMARY KEY, created_at REAL, data BLOB)"
+        )
+        self._db.commit()
+
+    def get(self, content_hash: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM transcripts WHERE content_hash = ?", (content_hash,)
+            ).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def put(self, content_hash: str, transcript: dict):
+        blob = zlib.compress(json.dumps(transcript, separators=(',', ':')).encode(), 6)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO transcripts (content_hash, created_at, data) VALUES (?, ?, ?)",
+                (content_hash, time.time(), blob),
+            )
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM transcripts").fetchone()
+        return {"transcripts": count, "stored_bytes": size}
@@ -0,0 +1,302 @@
+"""
+vector_index.py — On-Disk Vector Index
+───────────────────────────────────────
+NumPy-backed nearest-neighbour index over L2-normalised vectors (inner
+product = cosine similarity), used by RafeeQ for document retrieval.
+
+Layout of an index directory:
+  - index.json        dimension / format
+  - vectors.f32       raw float32 rows, append-only, memory-mapped for search
+  - chunks.sqlite     one row per vector: doc_id, chunk_no, title, text, deleted
+  - ivf.npz           IVF centroids (once the index is large enough)
+  - ivf_assign.i32    IVF list of every row, append-only
+
+Search modes:
+  - exact  blockwise scan of every live row
+  - ivf    scan only the `nprobe` inverted lists closest to the query
+  - auto   ivf once trained and the index has >= ivf_min_rows rows
+
+Adds append to the files; deletes are tombstones until compact() rewrites
+the vectors without them. The IVF is retrained as the index grows 4x.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import numpy as np
+
+SCAN_BLOCK_ROWS = 65536
+
+
+class VectorIndex:
+    def __init__(self, index_dir: str, dim: int, ivf_min_rows: int = 4096, nprobe: int = 16):
+        self.index_dir = index_dir
+        self.dim = dim
+        self.ivf_min_rows = ivf_min_rows
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        os.makedirs(index_dir, exist_ok=True)
+
+        info_path = self._path('index.json')
+        if os.path.exists(info_path):
+            with open(info_path) as f:
+                stored_dim = json.load(f)["dim"]
+            if stored_dim != dim:
+                raise ValueError(f"Index at {index_dir} has dim {stored_dim}, embedder has dim {dim}")
+        else:
+            with open(info_path, 'w') as f:
+                json.dump({"dim": dim, "format": 1}, f)
+
+        self._db = sqlite3.connect(self._path('chunks.sqlite'), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                row INTEGER PRIMARY KEY,
+                doc_id TEXT NOT NULL,
+                chunk_no INTEGER,
+                title TEXT,
+                text TEXT,
+                deleted INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_chunks_doc ON chunks (doc_id)")
+        self._db.commit()
+        self._open()
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    # ── Loading ────────────────────────────────────────────
+    def _open(self):
+        n_rows = self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM chunks").fetchone()[0]
+        row_bytes = 4 * self.dim
+        vectors_path = self._path('vectors.f32')
+        if not os.path.exists(vectors_path):
+            open(vectors_path, 'wb').close()
+        # Vectors are written before their metadata commits; drop any torn tail
+        if os.path.getsize(vectors_path) > n_rows * row_bytes:
+            os.truncate(vectors_path, n_rows * row_bytes)
+        elif os.path.getsize(vectors_path) < n_rows * row_bytes:
+            raise ValueError(f"Vector file in {self.index_dir} is shorter than its metadata")
+
+        self._n_rows = n_rows
+        self._remap()
+        self._alive = np.ones(n_rows, dtype=bool)
+        deleted = [r for (r,) in self._db.execute("SELECT row FROM chunks WHERE deleted = 1")]
+        self._alive[deleted] = False
+
+        self._centroids, self._assign, self._lists = None, None, None
+        self._trained_rows = 0
+        if os.path.exists(self._path('ivf.npz')):
+            with np.load(self._path('ivf.npz')) as ivf:
+                self._centroids = ivf["centroids"]
+                self._trained_rows = int(ivf["trained_rows"])
+            assign = np.fromfile(self._path('ivf_assign.i32'), dtype=np.int32)[:n_rows]
+            missing = self._assign_rows(self._vectors[len(assign):])
+            self._assign = np.concatenate([assign, missing])
+            self._write_array('ivf_assign.i32', self._assign)
+
+    def _remap(self):
+        if self._n_rows:
+            self._vectors = np.memmap(self._path('vectors.f32'), dtype=np.float32, mode='r',
+                                      shape=(self._n_rows, self.dim))
+        else:
+            self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+
+    def _write_array(self, name, array):
+        tmp = self._path(name + '.tmp')
+        array.tofile(tmp)
+        os.replace(tmp, self._path(name))
+
+    # ── Writes ─────────────────────────────────────────────
+    def add(self, vectors, records) -> list:
+        """Append vectors with their chunk records ({doc_id, chunk_no, title, text}). Returns row ids."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if len(vectors) != len(records):
+            raise ValueError("vectors and records must have the same length")
+        with self._lock:
+            start = self._n_rows
+            with open(self._path('vectors.f32'), 'ab') as f:
+                f.write(vectors.tobytes())
+            self._db.executemany(
+                "INSERT INTO chunks (row, doc_id, chunk_no, title, text) VALUES (?, ?, ?, ?, ?)",
+                [(start + i, r["doc_id"], r.get("chunk_no"), r.get("title"), r.get("text"))
+                 for i, r in enumerate(records)],
+            )
+            self._db.commit()
+
+            self._n_rows += len(vectors)
+            self._remap()
+            self._alive = np.concatenate([self._alive, np.ones(len(vectors), dtype=bool)])
+
+            if self._centroids is not None:
+                assign = self._assign_rows(vectors)
+                with open(self._path('ivf_assign.i32'), 'ab') as f:
+                    f.write(assign.tobytes())
+                self._assign = np.concatenate([self._assign, assign])
+                self._lists = None
+
+            live = int(self._alive.sum())
+            if live >= self.ivf_min_rows and (self._centroids is None or live > 4 * self._trained_rows):
+                self.build_ivf()
+            return list(range(start, self._n_rows))
+
+    def delete(self, doc_id: str) -> int:
+        """Tombstone every chunk of a document. Returns the number of rows removed."""
+        with self._lock:
+            rows = [r for (r,) in self._db.execute(
+                "SELECT row FROM chunks WHERE doc_id = ? AND deleted = 0", (doc_id,))]
+            if rows:
+                self._db.execute("UPDATE chunks SET deleted = 1 WHERE doc_id = ?", (doc_id,))
+                self._db.commit()
+                alive = self._alive.copy()
+                alive[rows] = False
+                self._alive = alive
+            return len(rows)
+
+    def compact(self) -> int:
+        """Rewrite the index without deleted rows. Returns the number of rows reclaimed."""
+        with self._lock:
+            keep = np.flatnonzero(self._alive)
+            reclaimed = self._n_rows - len(keep)
+            if not reclaimed:
+                return 0
+            self._write_array('vectors.f32', np.ascontiguousarray(self._vectors[keep]))
+            self._db.execute("DELETE FROM chunks WHERE deleted = 1")
+            # Ascending order: each new row id is <= its old id and already free
+            self._db.executemany("UPDATE chunks SET row = ? WHERE row = ?",
+                                 [(new, int(old)) for new, old in enumerate(keep) if new != old])
+            self._db.commit()
+            if self._assign is not None:
+                self._assign = self._assign[keep]
+                self._write_array('ivf_assign.i32', self._assign)
+                self._lists = None
+            self._n_rows = len(keep)
+            self._alive = np.ones(self._n_rows, dtype=bool)
+            self._remap()
+            return reclaimed
+
+    # ── IVF ────────────────────────────────────────────────
+    def build_ivf(self, nlist: int = None, iterations: int = 10, sample_size: int = 65536, seed: int = 0):
+        """Train IVF centroids with spherical k-means on a sample of live rows."""
+        with self._lock:
+            live = np.flatnonzero(self._alive)
+            if not len(live):
+                return
+            nlist = min(nlist or max(1, int(np.sqrt(len(live)))), len(live))
+            rng = np.random.default_rng(seed)
+            sample = np.sort(rng.choice(live, min(sample_size, len(live)), replace=False))
+            x = np.asarray(self._vectors[sample])
+            centroids = x[rng.choice(len(x), nlist, replace=False)].copy()
+
+            for _ in range(iterations):
+                assign = self._nearest(x, centroids)
+                order = np.argsort(assign, kind='stable')
+                ids, starts = np.unique(assign[order], return_index=True)
+                sums = np.add.reduceat(x[order], starts, axis=0)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                # Empty lists keep their previous centroid
+                centroids[ids] = sums / np.where(norms == 0, 1.0, norms)
+
+            self._centroids = centroids.astype(np.float32)
+            self._trained_rows = len(live)
+            self._assign = self._assign_rows(self._vectors)
+            self._lists = None
+            tmp = self._path('ivf.tmp.npz')
+            np.savez(tmp, centroids=self._centroids, trained_rows=self._trained_rows)
+            os.replace(tmp, self._path('ivf.npz'))
+            self._write_array('ivf_assign.i32', self._assign)
+            print(f"[RafeeQ] Built IVF index: {nlist} lists over {len(live)} rows.")
+
+    @staticmethod
+    def _nearest(x, centroids):
+        out = np.empty(len(x), dtype=np.int32)
+        for start in range(0, len(x), 4096):
+            out[start:start + 4096] = np.argmax(x[start:start + 4096] @ centroids.T, axis=1)
+        return out
+
+    def _assign_rows(self, vectors):
+        if not len(vectors):
+            return np.empty(0, dtype=np.int32)
+        out = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), SCAN_BLOCK_ROWS):
+            out[start:start + SCAN_BLOCK_ROWS] = self._nearest(
+                np.asarray(vectors[start:start + SCAN_BLOCK_ROWS]), self._centroids)
+        return out
+
+    def _inverted_lists(self):
+        """(rows sorted by list, offsets) — rebuilt lazily after adds."""
+        if self._lists is None:
+            order = np.argsort(self._assign, kind='stable').astype(np.int64)
+            offsets = np.searchsorted(self._assign[order], np.arange(len(self._centroids) + 1))
+            self._lists = (order, offsets)
+        return self._lists
+
+    # ── Search ─────────────────────────────────────────────
+    def search(self, query, k: int = 5, mode: str = 'auto', nprobe: int = None):
+        """Top-k (rows, scores) by inner product, best first."""
+        q = np.asarray(query, dtype=np.float32).ravel()
+        with self._lock:
+            vectors, alive, centroids = self._vectors, self._alive, self._centroids
+            lists = self._inverted_lists() if centroids is not None else None
+        if mode == 'auto':
+            mode = 'ivf' if centroids is not None and len(vectors) >= self.ivf_min_rows else 'exact'
+
+        if mode == 'ivf' and centroids is not None:
+            nprobe = min(nprobe or self.nprobe, len(centroids))
+            probe = np.argpartition(-(centroids @ q), nprobe - 1)[:nprobe]
+            order, offsets = lists
+            candidates = np.sort(np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probe]))
+            candidates = candidates[alive[candidates]]
+            return self._top_k(candidates, np.asarray(vectors[candidates]) @ q, k)
+
+        best_rows, best_scores = [], []
+        for start in range(0, len(vectors), SCAN_BLOCK_ROWS):
+            scores = np.asarray(vectors[start:start + SCAN_BLOCK_ROWS]) @ q
+            scores[~alive[start:start + SCAN_BLOCK_ROWS]] = -np.inf
+            rows, scores = self._top_k(np.arange(start, start + len(scores)), scores, k)
+            best_rows.append(rows)
+            best_scores.append(scores)
+        if not best_rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        rows, scores = self._top_k(np.concatenate(best_rows), np.concatenate(best_scores), k)
+        keep = np.isfinite(scores)
+        return rows[keep], scores[keep]
+
+    @staticmethod
+    def _top_k(rows, scores, k):
+        if len(scores) > k:
+            part = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[part], scores[part]
+        order = np.argsort(-scores, kind='stable')
+        return rows[order], scores[order]
+
+    def records(self, rows) -> list:
+        """Chunk metadata for row ids, in the given order; None for rows deleted meanwhile."""
+        rows = [int(r) for r in rows]
+        if not rows:
+            return []
+        with self._lock:
+            found = {
+                r[0]: {"doc_id": r[1], "chunk_no": r[2], "title": r[3], "text": r[4]}
+                for r in self._db.execute(
+                    f"SELECT row, doc_id, chunk_no, title, text FROM chunks "
+                    f"WHERE deleted = 0 AND row IN ({','.join('?' * len(rows))})",
+                    rows,
+                )
+            }
+        return [found.get(r) for r in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            live = int(self._alive.sum())
+            return {
+                "rows": self._n_rows,
+                "live_rows": live,
+                "deleted_rows": self._n_rows - live,
+                "documents": self._db.execute(
+                    "SELECT COUNT(DISTINCT doc_id) FROM chunks WHERE deleted = 0").fetchone()[0],
+                "dim": self.dim,
+                "ivf_lists": len(self._centroids) if self._centroids is not None else 0,
+            }
@@ -94,63 +94,80 @@ const RmsAssistant = ({ activeScenario, setActiveScenario, selectedCase, onUpdat
         }
     ];
 
-    const runAnalysis = async (check) => {
-        setActiveCheck(check.id);
-        setLoadingStates(prev => ({ ...prev, [check.id]: true }));
-
-        try {
-            const response = await fetch('http://localhost:5000/api/chat', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    query: check.query,
-                    history: [{ role: 'system', content: check.systemPrompt }]
-                })
-            });
+    const obligationCheck = {
+        id: 'financing_obligations',
+        query: "From contract financing document, extract and present financing facilities in a structured table with the following columns: 1- Facility Type. 2- Percentage (%). 3- Amount (SAR). 4- Linked To (Contract / Receivables / Procurement). 5-Trigger / Dependency - Validity / Duration - Purpose. Facilities to look for: - Advance Payment Guarantee - Performance Bond - Letters of Credit (LC) - LCR / Receivables Financing If any field is missing, clearly state \"Not specified\".",
+        systemPrompt: `You are a credit and contract analysis expert.
+Your task is to extract financing facilities from contract annexes or credit documents and normalize them into a structured table.
 
-            if (!response.ok) throw new Error('Failed to fetch analysis');
-            const data = await response.json();
-            const resultText = data.response;
+Rules:
+- Only extract information explicitly stated in the document.
+- Always link percentages to the contract value if available.
+- Output must be a single table in markdown format.`
+    };
 
-            setAnalysisResults(prev => ({ ...prev, [check.id]: resultText }));
+    // Runs checks on the server against the case documents; results stream back as each check finishes
+    const streamChecks = async (checks, onResult) => {
+        const response = await fetch('http://localhost:5000/api/tamkeen/checks', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'Accept': 'application/x-ndjson' },
+            body: JSON.stringify({
+                folderPath: selectedCase.folderPath,
+                checks: checks.map(({ id, query, systemPrompt }) => ({ id, query, systemPrompt }))
+            })
+        });
+        if (!response.ok || !response.body) throw new Error('Failed to run checks');
 
-            // Parse color from response
-            const colorMatch = resultText.match(/STATUS:\s*(GREEN|YELLOW|RED)/i);
-            if (colorMatch) {
-                setIndicatorColors(prev => ({ ...prev, [check.id]: colorMatch[1].toLowerCase() }));
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = '';
+        for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffered += decoder.decode(value, { stream: true });
+            const lines = buffered.split('\n');
+            buffered = lines.pop();
+            for (const line of lines) {
+                if (!line.trim()) continue;
+                const event = JSON.parse(line);
+                if (event.type === 'check') onResult(event);
+                else if (event.type === 'error') throw new Error(event.error);
             }
+        }
+    };
+
+    const runAnalysis = async (checks) => {
+        setActiveCheck(prev => (checks.length === 1 || !prev ? checks[0].id : prev));
+        setLoadingStates(prev => ({ ...prev, ...Object.fromEntries(checks.map(c => [c.id, true])) }));
+
+        const received = new Set();
+        try {
+            await streamChecks(checks, (result) => {
+                received.add(result.id);
+                setAnalysisResults(prev => ({ ...prev, [result.id]: result.error ? `Error: ${result.error}` : result.content }));
+                if (result.status) {
+                    setIndicatorColors(prev => ({ ...prev, [result.id]: result.status }));
+                }
+                setLoadingStates(prev => ({ ...prev, [result.id]: false }));
+            });
         } catch (error) {
             console.error('Analysis Error:', error);
-            setAnalysisResults(prev => ({ ...prev, [check.id]: "Error: Could not retrieve analysis. Please ensure the backend is running." }));
+            setAnalysisResults(prev => ({
+                ...prev,
+                ...Object.fromEntries(checks.filter(c => !received.has(c.id)).map(c => [c.id, "Error: Could not retrieve analysis. Please ensure the backend is running."]))
+            }));
         } finally {
-            setLoadingStates(prev => ({ ...prev, [check.id]: false }));
+            setLoadingStates(prev => ({ ...prev, ...Object.fromEntries(checks.map(c => [c.id, false])) }));
         }
     };
 
     const handleFetchObligations = async () => {
         setIsObligationLoading(true);
         try {
-            const response = await fetch('http://localhost:5000/api/chat', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    query: "From contract financing document, extract and present financing facilities in a structured table with the following columns: 1- Facility Type. 2- Percentage (%). 3- Amount (SAR). 4- Linked To (Contract / Receivables / Procurement). 5-Trigger / Dependency - Validity / Duration - Purpose. Facilities to look for: - Advance Payment Guarantee - Performance Bond - Letters of Credit (LC) - LCR / Receivables Financing If any field is missing, clearly state \"Not specified\".",
-                    history: [{
-                        role: 'system',
-                        content: `You are a credit and contract analysis expert.
-Your task is to extract financing facilities from contract annexes or credit documents and normalize them into a structured table.
-
-Rules:
-- Only extract information explicitly stated in the document.
-- Always link percentages to the contract value if available.
-- Output must be a single table in markdown format.`
-                    }]
-                })
+            await streamChecks([obligationCheck], (result) => {
+                if (result.error) throw new Error(result.error);
+                setObligationResult(result.content);
             });
-
-            if (!response.ok) throw new Error('Failed to fetch obligations');
-            const data = await response.json();
-            setObligationResult(data.response);
         } catch (error) {
             console.error('Obligation Fetch Error:', error);
             setObligationResult("Error: Could not retrieve obligations. Please ensure the backend is running.");
@@ -305,6 +322,13 @@ Rules:
                     <div className="cashflow-analysis-view fade-in">
                         <div className="analysis-sidebar">
                             <h3 className="sidebar-title">Indicators & Checks</h3>
+                            <button
+                                className={`analysis-trigger-btn ${cashflowChecks.some(c => loadingStates[c.id]) ? 'loading' : ''}`}
+                                onClick={() => runAnalysis(cashflowChecks)}
+                                disabled={cashflowChecks.some(c => loadingStates[c.id])}
+                            >
+                                Analyze All
+                            </button>
                             <div className="checks-list">
                                 {cashflowChecks.map((check) => (
                                     <div
@@ -318,7 +342,7 @@ Rules:
                                         </div>
                                         <button
                                             className={`analysis-trigger-btn ${loadingStates[check.id] ? 'loading' : ''}`}
-                                            onClick={(e) => { e.stopPropagation(); runAnalysis(check); }}
+                                            onClick={(e) => { e.stopPropagation(); runAnalysis([check]); }}
                                             disabled={loadingStates[check.id]}
                                         >
                                             {loadingStates[check.id] ? <Zap className="spinning" size={14} /> : 'Analyze'}
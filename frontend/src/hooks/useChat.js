@@ -37,22 +37,74 @@ export function useChat(language, t) {
         setChatInput('');
         setIsThinking(true);
 
+        const aiMsgId = Date.now() + 1;
+        const updateReply = (update) => setChatSessions(prev => prev.map(c => c.id === currentChatId
+            ? { ...c, messages: c.messages.map(m => m.id === aiMsgId ? update(m) : m) }
+            : c));
+
+        // Earlier turns of this chat: their count goes with every message, the turns
+        // themselves only if the server no longer has them
+        const history = currentMessages.slice(0, -1)
+            .filter(m => m.content)
+            .map(({ role, content }) => ({ role, content }));
+
         try {
-            const history = currentMessages.slice(0, -1).map(m => ({ role: m.role, content: m.content }));
-            const response = await fetch('http://localhost:5000/api/rafeeq/chat', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ message: queryText, context: history })
-            });
+            // The server keeps the conversation (keyed by the chat id), so only the new message is sent
+            let context = null;
+            for (;;) {
+                const response = await fetch('http://localhost:5000/api/rafeeq/chat/stream', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json', 'Accept': 'application/x-ndjson' },
+                    body: JSON.stringify({
+                        message: queryText, session_id: currentChatId, history_turns: history.length,
+                        ...(context && { context })
+                    })
+                });
+
+                if (!response.ok || !response.body) throw new Error('Failed to fetch from assistant');
+                if (!context) {
+                    const aiMsg = { id: aiMsgId, role: 'assistant', content: '' };
+                    setChatSessions(prev => prev.map(c => c.id === currentChatId ? { ...c, messages: [...c.messages, aiMsg] } : c));
+                }
 
-            if (!response.ok) throw new Error('Failed to fetch from assistant');
-            const data = await response.json();
-            const aiMsg = { id: Date.now() + 1, role: 'assistant', content: data.reply };
-            setChatSessions(prev => prev.map(c => c.id === currentChatId ? { ...c, messages: [...c.messages, aiMsg] } : c));
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffered = '';
+                let resend = false;
+                read: for (;;) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffered += decoder.decode(value, { stream: true });
+                    const lines = buffered.split('\n');
+                    buffered = lines.pop();
+                    for (const line of lines) {
+                        if (!line.trim()) continue;
+                        const event = JSON.parse(line);
+                        if (event.event === 'start' && event.context_required && !context) {
+                            // Server restarted or the session expired; it stopped before answering,
+                            // so send the message once more with the history
+                            resend = true;
+                            await reader.cancel();
+                            break read;
+                        } else if (event.event === 'token') {
+                            setIsThinking(false);
+                            updateReply(m => ({ ...m, content: m.content + event.text }));
+                        } else if (event.event === 'done') {
+                            updateReply(m => ({ ...m, content: event.reply }));
+                        } else if (event.event === 'error') {
+                            throw new Error(event.message);
+                        }
+                    }
+                }
+                if (!resend) break;
+                context = history;
+            }
         } catch (error) {
             console.error('Chat Error:', error);
-            const errorMsg = { id: Date.now() + 1, role: 'assistant', content: 'Connection error. Please ensure the backend is running.' };
-            setChatSessions(prev => prev.map(c => c.id === currentChatId ? { ...c, messages: [...c.messages, errorMsg] } : c));
+            const errorMsg = { id: aiMsgId, role: 'assistant', content: 'Connection error. Please ensure the backend is running.' };
+            setChatSessions(prev => prev.map(c => c.id === currentChatId
+                ? { ...c, messages: [...c.messages.filter(m => m.id !== aiMsgId), errorMsg] }
+                : c));
         } finally {
             setIsThinking(false);
         }
@@ -1,4 +1,4 @@
-import React, { useState, useRef } from 'react';
+import React, { useState, useRef, useEffect } from 'react';
 import {
     FileCheck,
     Upload,
@@ -16,6 +16,9 @@ import {
 } from 'lucide-react';
 import { getTranslation } from '../i18n/translations';
 
+const MUJAZ_API = 'http://localhost:5001/api/mujaz';
+const POLL_INTERVAL_MS = 1500;
+
 const getSpeakerColor = (speakerName) => {
     const palette = ['#310046', '#7E0035', '#F0E07F', '#B8861D', '#A90000'];
     let hash = 0;
@@ -35,6 +38,9 @@ const MujazPage = ({ language, onReportReady }) => {
     const [analysisResult, setAnalysisResult] = useState(null);
     const [errorMessage, setErrorMessage] = useState(null);
     const fileInputRef = useRef(null);
+    const mountedRef = useRef(true);
+
+    useEffect(() => () => { mountedRef.current = false; }, []);
 
     const handleFileChange = (e) => {
         const file = e.target.files[0];
@@ -79,11 +85,19 @@ const MujazPage = ({ language, onReportReady }) => {
             const formData = new FormData();
             formData.append('file', audioFile);
 
-            const response = await fetch('http://localhost:5001/api/mujaz/process', {
+            // Queue the recording, then poll the job until transcription finishes
+            const response = await fetch(`${MUJAZ_API}/jobs`, {
                 method: 'POST',
                 body: formData,
             });
-            const result = await response.json();
+            let job = await response.json();
+            while (response.ok && (job.status === 'queued' || job.status === 'running')) {
+                await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS));
+                if (!mountedRef.current) return;
+                job = await (await fetch(`${MUJAZ_API}/jobs/${job.job_id}`)).json();
+            }
+            if (!mountedRef.current) return;
+            const result = job.status === 'done' ? job.result : job;
             if (result.status === 'success') {
                 setAnalysisResult(result.analysis);
                 if (onReportReady) onReportReady(result.analysis, metadata);